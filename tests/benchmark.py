@@ -0,0 +1,199 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+#
+# benchmarks.
+#
+
+import gc
+import os
+import sys
+import time
+import resource
+import tempfile
+import cPickle as pickle
+
+from tests.fixtures import reply, wsdl, xsd
+from tests.fixtures import load, connect
+from txsuds.sax.parser import Parser
+from txsuds.snapshot import Snapshot
+
+
+def rss():
+    """ the resident set size (KB) """
+    try:
+        fp = open('/proc/self/statm')
+        try:
+            pages = int(fp.read().split()[1])
+        finally:
+            fp.close()
+        return pages * (resource.getpagesize() / 1024)
+    except IOError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def memory(n=100000):
+    """ memory used by the parsed tree of a large reply """
+    xml = reply(n)
+    gc.collect()
+    before = rss()
+    t = time.time()
+    document = Parser().parse(string=xml)
+    elapsed = time.time()-t
+    gc.collect()
+    used = rss()-before
+    nodes = len(document.root().branch())
+    print 'memory: %d nodes, %d (KB), %d (bytes/node), parsed in %.2f (s)' % \
+        (nodes, used, used*1024/nodes, elapsed)
+    return document
+
+
+def snapshot(n=400, repeat=5):
+    """ load time of cached definitions: pickle vs snapshot """
+    definitions = connect(n).wsdl
+    pickled = pickle.dumps(definitions, 2)
+    snapped = Snapshot().dumps(definitions)
+    for name, loads, bfr in (
+            ('pickle', pickle.loads, pickled),
+            ('snapshot', lambda b: Snapshot().loads(b), snapped)):
+        best = None
+        for i in range(repeat):
+            gc.collect()
+            t = time.time()
+            loads(bfr)
+            elapsed = time.time()-t
+            if best is None or elapsed < best:
+                best = elapsed
+        print 'snapshot: %d operations, %s %d (KB), loaded in %.3f (s)' % \
+            (n, name, len(bfr)/1024, best)
+
+
+def lazy(n=400, repeat=5):
+    """
+    connect() time and memory: eager vs lazy schema dereferencing, with
+    the types inline and imported from an xsd
+    """
+    fd, path = tempfile.mkstemp(suffix='.xsd')
+    os.write(fd, xsd(n))
+    os.close(fd)
+    try:
+        for location in (None, 'file://%s' % path):
+            text = wsdl(n, location)
+            for lazyschema in (False, True):
+                pid = os.fork()
+                if pid:
+                    os.waitpid(pid, 0)
+                    continue
+                gc.collect()
+                before = rss()
+                client = load(text, lazyschema=lazyschema)
+                gc.collect()
+                used = rss()-before
+                schema = client.wsdl.schema
+                top = schema.types.values()+schema.elements.values()
+                pending = [x for x in top if x.pending is not None]
+                best = None
+                for i in range(repeat):
+                    gc.collect()
+                    t = time.time()
+                    load(text, lazyschema=lazyschema)
+                    elapsed = time.time()-t
+                    if best is None or elapsed < best:
+                        best = elapsed
+                print 'lazy: %d operations, imported=%s, lazyschema=%s, %d (KB), %d/%d pending, connected in %.3f (s)' % \
+                    (n, location is not None, lazyschema, used, len(pending),
+                     len(top), best)
+                sys.stdout.flush()
+                os._exit(0)
+    finally:
+        os.remove(path)
+
+
+def unmarshal(n=50000, repeat=3):
+    """ unmarshalling of a reply with (n) repeated elements """
+    client = connect(1)
+    xml = reply(n)
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        t = time.time()
+        result = client.service.Get0(__inject=dict(reply=xml))
+        elapsed = time.time()-t
+        if best is None or elapsed < best:
+            best = elapsed
+    print 'unmarshal: %d elements, %d objects, unmarshalled in %.2f (s)' % \
+        (n, len(result), best)
+
+
+def direct(n=100000):
+    """ unmarshalling time and memory: reply document vs direct """
+    xml = reply(n)
+    for directreply in (False, True):
+        pid = os.fork()
+        if pid:
+            os.waitpid(pid, 0)
+            continue
+        client = connect(1, directreply=directreply)
+        gc.collect()
+        before = rss()
+        t = time.time()
+        result = client.service.Get0(__inject=dict(reply=xml))
+        elapsed = time.time()-t
+        used = rss()-before
+        print 'direct: %d elements, directreply=%s, %d (KB), unmarshalled in %.2f (s)' % \
+            (n, directreply, used, elapsed)
+        sys.stdout.flush()
+        os._exit(0)
+
+
+def stream(n=100000, chunk=8192):
+    """ streamed (fed) reply memory: document vs item consumer """
+    xml = reply(n)
+    for consumer in (None, lambda item: None):
+        pid = os.fork()
+        if pid:
+            os.waitpid(pid, 0)
+            continue
+        client = connect(1)
+        method = client.wsdl.services[0].ports[0].methods['Get0']
+        binding = method.binding.input
+        gc.collect()
+        before = rss()
+        t = time.time()
+        feeder = binding.feeder(method, consumer)
+        for i in range(0, len(xml), chunk):
+            feeder.feed(xml[i:i+chunk])
+        binding.get_reply(method, feeder.close())
+        elapsed = time.time()-t
+        used = rss()-before
+        print 'stream: %d elements, consumer=%s, %d (KB), unmarshalled in %.2f (s)' % \
+            (n, consumer is not None, used, elapsed)
+        sys.stdout.flush()
+        os._exit(0)
+
+
+if __name__ == '__main__':
+    benchmarks = dict(
+        memory=memory,
+        snapshot=snapshot,
+        lazy=lazy,
+        unmarshal=unmarshal,
+        direct=direct,
+        stream=stream)
+    name = 'memory'
+    if len(sys.argv) > 1:
+        name = sys.argv[1]
+    args = [int(a) for a in sys.argv[2:]]
+    benchmarks[name](*args)
@@ -0,0 +1,267 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Binding tests.
+#
+
+import sys
+sys.path.append('../')
+import unittest
+from unittest import TestCase
+from tests import *
+from tests.fixtures import reply, wsdl, load, connect, method, call
+from tests.fixtures import consume
+from txsuds.plugin import MessagePlugin
+from txsuds.umx.typed import Typed
+from txsuds.umx.compiled import Compiled
+from txsuds.sax.document import Document
+from txsuds.sax.parser import Parser
+
+setup_logging()
+
+
+class TemplatesTest(TestCase):
+
+    def envelope(self, client, *args):
+        context = []
+        client.service.Get0(*args).addCallback(context.append)
+        return context[0].envelope
+
+    def testEnvelope(self):
+        a = connect(1, nosend=True)
+        b = connect(1, nosend=True, templates=True)
+        for prefixes in (True, False):
+            for xstq in (True, False):
+                for client in (a, b):
+                    client.set_options(prefixes=prefixes, xstq=xstq)
+                self.assertEqual(self.envelope(a, 7), self.envelope(b, 7))
+        templates = method(b).binding.input.templates
+        self.assertEqual(len(templates), 4)
+
+    def testLastSent(self):
+        a = connect(1, nosend=True)
+        b = connect(1, nosend=True, templates=True)
+        self.envelope(a, 7)
+        self.envelope(b, 7)
+        self.assertTrue(isinstance(b.last_sent(), Document))
+        self.assertEqual(str(a.last_sent()), str(b.last_sent()))
+
+
+class CompiledTest(TestCase):
+
+    wsdl = '''<?xml version="1.0"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="urn:t"
+    targetNamespace="urn:t">
+<types><xs:schema targetNamespace="urn:t" elementFormDefault="qualified">
+<xs:attributeGroup name="AG">
+<xs:attribute name="a1" type="xs:string"/></xs:attributeGroup>
+<xs:group name="G"><xs:sequence>
+<xs:element name="g1" type="xs:int"/></xs:sequence></xs:group>
+<xs:complexType name="Base"><xs:sequence>
+<xs:element name="b" type="xs:string"/><xs:group ref="tns:G"/></xs:sequence>
+<xs:attributeGroup ref="tns:AG"/></xs:complexType>
+<xs:complexType name="Derived"><xs:complexContent>
+<xs:extension base="tns:Base"><xs:sequence>
+<xs:element name="d" type="tns:Color"/><xs:element ref="tns:Note"/>
+</xs:sequence></xs:extension></xs:complexContent></xs:complexType>
+<xs:simpleType name="Color"><xs:restriction base="xs:string">
+<xs:enumeration value="red"/></xs:restriction></xs:simpleType>
+<xs:element name="Note" type="xs:string"/>
+<xs:element name="Op"><xs:complexType><xs:sequence>
+<xs:element name="x" type="tns:Derived"/></xs:sequence></xs:complexType>
+</xs:element>
+<xs:element name="OpResponse"><xs:complexType><xs:sequence>
+<xs:element name="r" type="tns:Derived" maxOccurs="unbounded"/>
+</xs:sequence></xs:complexType></xs:element>
+</xs:schema></types>
+<message name="In"><part name="parameters" element="tns:Op"/></message>
+<message name="Out"><part name="parameters" element="tns:OpResponse"/></message>
+<portType name="P"><operation name="Op">
+<input message="tns:In"/><output message="tns:Out"/></operation></portType>
+<binding name="B" type="tns:P">
+<soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+<operation name="Op"><soap:operation soapAction="Op"/>
+<input><soap:body use="literal"/></input>
+<output><soap:body use="literal"/></output></operation></binding>
+<service name="S"><port name="p" binding="tns:B">
+<soap:address location="http://localhost/x"/></port></service>
+</definitions>'''
+
+    node = '<r xmlns="urn:t" xmlns:t="urn:t" ' \
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"%s>%s</r>'
+
+    cases = [
+        ('', '<b>x</b><g1>3</g1><d>red</d><Note>hi</Note>'),
+        (' a1="z" class="k"', '<b>x</b><b>y</b><b>z</b><g1>3</g1>'),
+        ('', '<b xsi:nil="true"/><g1></g1><d/>'),
+        (' xsi:type="t:Base"', '<b>q</b><g1>4</g1>'),
+        ('', '<b xml:lang="en">hi</b>'),
+        ('', '<b>mixed<d>red</d></b>'),
+        (' bogus="1"', '<b a1="v">t</b>'),
+        ('', ''),
+        ('', '<zz/>'),
+    ]
+
+    def setUp(self):
+        self.client = load(self.wsdl)
+        self.schema = self.client.wsdl.schema
+        m = method(self.client, 'Op')
+        returned = m.binding.output.returned_types(m)[0]
+        self.type = returned.resolve(nobuiltin=True)
+
+    def unmarshal(self, unmarshaller, node):
+        try:
+            return repr(unmarshaller.process(node, self.type))
+        except Exception, e:
+            return '%s: %s' % (e.__class__.__name__, e)
+
+    def testTyped(self):
+        plans = {}
+        for attributes, body in self.cases:
+            xml = self.node % (attributes, body)
+            node = Parser().parse(string=xml).root()
+            expected = self.unmarshal(Typed(self.schema), node)
+            for n in range(2):
+                compiled = Compiled(self.schema, plans)
+                self.assertEqual(self.unmarshal(compiled, node), expected)
+        self.assertTrue(len(plans) > 0)
+
+    def testReply(self):
+        xml = reply(3)
+        compiled = connect(3)
+        typed = connect(3)
+        binding = method(typed).binding.output
+        basic = binding.unmarshaller
+        def unmarshaller(typed=True):
+            if typed:
+                return Typed(binding.schema())
+            return basic(typed)
+        binding.unmarshaller = unmarshaller
+        self.assertEqual(str(call(compiled, xml)), str(call(typed, xml)))
+        self.assertEqual(binding.plans, None)
+
+
+class ReplyTest(TestCase):
+
+    xsi = 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+
+    enc = 'xmlns:enc="http://schemas.xmlsoap.org/soap/encoding/"'
+
+    fault = '<soap:Fault><faultcode>x</faultcode>' \
+        '<faultstring>boom</faultstring></soap:Fault>'
+
+    def cases(self):
+        xml = reply(3)
+        return [
+            reply(5),
+            reply(0),
+            reply(1),
+            xml.replace('<item id="1">', '<item href="#x">'),
+            xml.replace('<item id="2"><name>',
+                '<item id="2"><name href="#a">'),
+            xml.replace('<item id="1"><name>item 1</name>',
+                '<item id="1">mixed<name>item 1</name>'),
+            xml.replace('<name>item 2</name>', '<name>item 2</name>tail'),
+            xml.replace('<item id="1"><name>item 1</name>',
+                '<item id="1"><name>item 1<b>x</b></name>'),
+            xml.replace('</Get0Response>', '</Get0Response>' + self.fault),
+            xml.replace('</Get0Response>',
+                '</Get0Response><m id="a">zz</m>'),
+            xml.replace('<item id="0">',
+                '<item %s xsi:nil="true" id="0">' % self.xsi),
+            xml.replace('<Get0Response', self.fault + '<Get0Response'),
+            xml.replace('soap:Body', 'x:Body xmlns:x="urn:other"', 1)
+                .replace('/soap:Body', '/x:Body'),
+            xml.replace('<item id="2">',
+                '<item id="2" enc:root="1" %s>' % self.enc),
+        ]
+
+    def outcome(self, invoke, *args):
+        try:
+            return str(invoke(*args))
+        except Exception, e:
+            return '%s %s' % (e.__class__.__name__, e)
+
+
+class DirectTest(ReplyTest):
+
+    def compare(self, default, direct):
+        for xml in self.cases():
+            self.assertEqual(
+                self.outcome(call, direct, xml),
+                self.outcome(call, default, xml))
+
+    def testUnbounded(self):
+        self.compare(connect(3), connect(3, directreply=True))
+
+    def testBounded(self):
+        text = wsdl(2).replace(' maxOccurs="unbounded"', '')
+        self.compare(load(text), load(text, directreply=True))
+
+    def testLastReceived(self):
+        client = connect(3, directreply=True)
+        call(client, reply(3))
+        self.assertTrue(isinstance(client.last_received(), Document))
+
+
+class ConsumerTest(ReplyTest):
+
+    def fed(self, client, xml, consumer):
+        m = method(client)
+        binding = m.binding.input
+        feeder = binding.feeder(m, consumer)
+        for i in range(0, len(xml), 37):
+            feeder.feed(xml[i:i+37])
+        return binding.get_reply(m, feeder.close(), consumer)[1]
+
+    def compare(self, client, invoke):
+        default = connect(3)
+        for xml in self.cases():
+            items = []
+            expected = self.outcome(call, default, xml)
+            result = self.outcome(invoke, client, xml, items.append)
+            if expected.startswith('['):
+                self.assertEqual(str(items), expected)
+                self.assertEqual(result, str(len(items)))
+            else:
+                self.assertEqual(result, expected)
+
+    def testCall(self):
+        self.compare(connect(3), consume)
+
+    def testFed(self):
+        self.compare(connect(3), self.fed)
+
+    def testPlugins(self):
+        self.compare(connect(3, plugins=[MessagePlugin()]), consume)
+
+    def testBounded(self):
+        text = wsdl(2).replace(' maxOccurs="unbounded"', '')
+        items = []
+        self.assertEqual(
+            str(consume(load(text), reply(1), items.append)),
+            str(call(load(text), reply(1))))
+        self.assertEqual(items, [])
+
+    def testCallable(self):
+        self.assertRaises(TypeError, consume, connect(1), reply(1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
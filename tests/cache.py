@@ -0,0 +1,334 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Cache tests.
+#
+
+import os
+import sys
+sys.path.append('../')
+import time
+import pickle
+import shutil
+import tempfile
+import mimetools
+import urllib2
+import unittest
+from unittest import TestCase
+from tests import *
+from tests.fixtures import FileTest, result
+from tests.fixtures import reply, wsdl, connect, call
+from copy import deepcopy
+from cStringIO import StringIO
+import txsuds.transport
+from txsuds.transport import Reply, Request, TransportError
+from txsuds.transport.http import HttpTransport
+from txsuds.cache import DocumentCache
+from txsuds.cache import ObjectCache
+from txsuds.cache import LRUCache
+from txsuds.cache import TieredCache
+from txsuds.cache import SnapshotCache
+from txsuds.snapshot import Snapshot
+from txsuds.wsdl import Definitions
+from txsuds.options import Options
+from txsuds.reader import DefinitionsReader
+from txsuds.reader import DocumentReader
+from txsuds.xsd.doctor import ImportDoctor, Import
+from txsuds.sax.element import Element
+from txsuds.sax.parser import Parser
+from twisted.internet import defer
+from twisted.trial import unittest as trial
+
+setup_logging()
+
+
+class CacheKeyTest(TestCase):
+
+    def id(self, **kwargs):
+        reader = DefinitionsReader(Options(**kwargs), Definitions)
+        return reader.mangle('http://x/wsdl', 'wsdl')
+
+    def testDoctor(self):
+        a = ImportDoctor(Import('urn:a'))
+        b = ImportDoctor(Import('urn:b'))
+        located = ImportDoctor(Import('urn:a', 'a.xsd'))
+        self.assertEqual(self.id(doctor=a), self.id(doctor=deepcopy(a)))
+        self.assertNotEqual(self.id(doctor=a), self.id(doctor=b))
+        self.assertNotEqual(self.id(doctor=a), self.id(doctor=located))
+        self.assertNotEqual(self.id(doctor=a), self.id())
+        self.assertNotEqual(self.id(), self.id(operations=['Get0']))
+
+
+class RevalidateTest(FileTest):
+
+    url = 'http://example.com/a.xsd'
+
+    def setUp(self):
+        FileTest.setUp(self)
+        self.cache = DocumentCache(self.dir, seconds=60)
+        self.cache.threaded = False
+        self.origin = Origin('<a><b>1</b></a>', '"v1"')
+        options = Options(cache=self.cache, transport=self.origin)
+        self.reader = DocumentReader(options)
+
+    def expire(self):
+        past = time.time() - 120
+        for fn in os.listdir(self.dir):
+            os.utime(os.path.join(self.dir, fn), (past, past))
+
+    def testNotModified(self):
+        first = result(self.reader.open(self.url))
+        self.assertEqual(self.origin.requests, [{}])
+        self.assertEqual(result(self.reader.open(self.url)).str(), first.str())
+        self.assertEqual(len(self.origin.requests), 1)
+        self.expire()
+        second = result(self.reader.open(self.url))
+        self.assertEqual(second.str(), first.str())
+        self.assertEqual(self.origin.requests[1], {'If-None-Match': '"v1"'})
+        result(self.reader.open(self.url))
+        self.assertEqual(len(self.origin.requests), 2)
+
+    def testModified(self):
+        result(self.reader.open(self.url))
+        self.expire()
+        self.origin.content = '<a><b>2</b></a>'
+        self.origin.etag = '"v2"'
+        modified = result(self.reader.open(self.url))
+        self.assertEqual(modified.root().getChild('b').getText(), '2')
+        self.expire()
+        result(self.reader.open(self.url))
+        self.assertEqual(self.origin.requests[-1], {'If-None-Match': '"v2"'})
+
+    def testHttpTransport(self):
+        transport = HttpTransport()
+        transport.urlopener = urllib2.build_opener(OriginHandler(self.origin))
+        request = Request(self.url)
+        fp = transport.open(request)
+        self.assertEqual(fp.read(), self.origin.content)
+        self.assertEqual(request.reply.code, 200)
+        self.assertEqual(self.reader.validators(request), {'etag': '"v1"'})
+        request = Request(self.url)
+        self.reader.condition(request, dict(etag='"v1"'))
+        try:
+            transport.open(request)
+            self.fail('not raised')
+        except TransportError, e:
+            self.assertEqual(e.httpcode, 304)
+        self.assertEqual(request.reply.code, 304)
+
+
+class ThreadedCacheTest(trial.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ObjectCache(self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    @defer.inlineCallbacks
+    def testRoundTrip(self):
+        objects = [dict(n=n, items=range(n)) for n in range(20)]
+        yield defer.gatherResults(
+            [self.cache.aput('same', x) for x in objects] +
+            [self.cache.aput('x%d' % x['n'], x) for x in objects])
+        yield self.cache.aputmeta('same', dict(url='u'))
+        same = yield self.cache.aget('same')
+        self.assertTrue(same in objects)
+        for x in objects:
+            cached = yield self.cache.aget('x%d' % x['n'])
+            self.assertEqual(cached, x)
+        meta = yield self.cache.agetmeta('same')
+        self.assertEqual(meta['url'], 'u')
+        missing = yield self.cache.aget('missing')
+        self.assertEqual(missing, None)
+        tmp = [fn for fn in os.listdir(self.dir) if fn.endswith('.tmp')]
+        self.assertEqual(tmp, [])
+
+
+class LRUTest(FileTest):
+
+    def testEvict(self):
+        cache = LRUCache(maxentries=2)
+        for id in ('a', 'b'):
+            cache.put(id, [id])
+        self.assertEqual(cache.get('a'), ['a'])
+        cache.put('c', ['c'])
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), ['a'])
+        self.assertEqual(cache.get('c'), ['c'])
+        self.assertEqual(cache.evictions, 1)
+        small = LRUCache(maxbytes=len(pickle.dumps('x'*100, 2))+1)
+        small.put('a', 'x'*100)
+        small.put('b', 'y'*100)
+        self.assertEqual(small.get('a'), None)
+        self.assertEqual(small.get('b'), 'y'*100)
+        small.put('c', 'z'*1000)
+        self.assertEqual(small.get('c'), None)
+        self.assertEqual(small.get('b'), 'y'*100)
+
+    def testCopies(self):
+        cache = LRUCache()
+        x = dict(items=[1])
+        cache.put('x', x)
+        cached = cache.get('x')
+        cached['items'].append(2)
+        self.assertEqual(cache.get('x'), x)
+
+    def testExpired(self):
+        cache = LRUCache(seconds=60)
+        cache.put('plain', 1)
+        cache.put('tagged', 2)
+        cache.putmeta('tagged', dict(etag='"v1"'))
+        for id, entry in cache.entries.items():
+            cache.entries[id] = (entry[0], time.time()-1, entry[2])
+        self.assertEqual(cache.get('plain'), None)
+        self.assertEqual(cache.get('tagged'), None)
+        self.assertFalse('plain' in cache.entries)
+        self.assertEqual(cache.getmeta('tagged')['etag'], '"v1"')
+        cache.touch('tagged')
+        self.assertEqual(cache.get('tagged'), 2)
+
+    def testClient(self):
+        cache = LRUCache()
+        xml = reply(3)
+        expected = str(call(connect(3), xml))
+        url = self.write('items.wsdl', wsdl(3))
+        for n in range(2):
+            client = self.client(url, cache=cache, cachingpolicy=1)
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(str(call(client, xml)), expected)
+        self.assertEqual(cache.hits, 1)
+
+
+class TieredTest(trial.TestCase):
+
+    xml = '<a xmlns="urn:a"><b x="1">t</b><c/></a>'
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = TieredCache(LRUCache(), ObjectCache(self.dir))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    @defer.inlineCallbacks
+    def testWriteBehind(self):
+        x = dict(items=range(10))
+        yield self.cache.aput('x', x)
+        yield self.cache.aputmeta('x', dict(url='u'))
+        x['items'].append(10)
+        x['other'] = 1
+        yield self.cache.flush()
+        self.assertEqual(self.cache.pending, {})
+        fp = self.cache.disk.getf('x')
+        try:
+            self.assertEqual(fp.read(), self.cache.memory.entries['x'][0])
+        finally:
+            fp.close()
+        self.assertEqual(self.cache.disk.get('x'), dict(items=range(10)))
+        self.assertEqual(self.cache.disk.getmeta('x')['url'], 'u')
+        bfr = self.cache.memory.entries['x'][0]
+        self.cache.memory.clear()
+        self.cache.memory.dumps = lambda object: self.fail('pickled')
+        promoted = yield self.cache.aget('x')
+        self.assertEqual(promoted, dict(items=range(10)))
+        self.assertEqual(len(self.cache.memory), 1)
+        self.assertEqual(self.cache.memory.entries['x'][0], bfr)
+        self.assertEqual(self.cache.memory.getmeta('x')['url'], 'u')
+
+    @defer.inlineCallbacks
+    def testDocuments(self):
+        cache = TieredCache(LRUCache(), DocumentCache(self.dir))
+        document = Parser().parse(string=self.xml)
+        yield cache.aput('d', document)
+        expected = document.root().str()
+        document.root().append(Element('added'))
+        yield cache.flush()
+        self.assertEqual(cache.disk.get('d').root().str(), expected)
+        cache.memory.clear()
+        promoted = yield cache.aget('d')
+        self.assertEqual(promoted.root().str(), expected)
+        self.assertEqual(cache.memory.get('d').root().str(), expected)
+
+
+class SnapshotTest(FileTest):
+
+    def testClient(self):
+        xml = reply(3)
+        expected = str(call(connect(3), xml))
+        url = self.write('items.wsdl', wsdl(3))
+        cache = SnapshotCache(self.dir)
+        cache.threaded = False
+        for n in range(2):
+            client = self.client(url, cache=cache, cachingpolicy=1)
+            self.assertEqual(str(call(client, xml)), expected)
+        snaps = [fn for fn in os.listdir(self.dir) if fn.endswith('.snap')]
+        self.assertEqual(len(snaps), 1)
+
+    def testReleased(self):
+        definitions = connect(3).wsdl
+        snapshot = Snapshot()
+        loaded = snapshot.loads(Snapshot().dumps(definitions))
+        self.assertTrue(snapshot.strings is not None)
+        self.assertEqual(loaded.root.str(), definitions.root.str())
+        for t in range(len(snapshot.trees)):
+            snapshot.tree(t)
+        self.assertEqual(snapshot.strings, None)
+        self.assertEqual(set(snapshot.trees), set([None]))
+        schema = loaded.schema.children[0]
+        self.assertEqual(schema.root.str(),
+            definitions.schema.children[0].root.str())
+
+
+class Origin(txsuds.transport.Transport):
+
+    def __init__(self, content, etag):
+        txsuds.transport.Transport.__init__(self)
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def open(self, request):
+        self.requests.append(dict(request.headers))
+        if request.headers.get('If-None-Match') == self.etag:
+            return defer.fail(TransportError('not modified', 304))
+        request.reply = Reply(200, {'ETag': self.etag}, self.content)
+        return defer.succeed(self.content)
+
+
+class OriginHandler(urllib2.BaseHandler):
+
+    handler_order = 100
+
+    def __init__(self, origin):
+        self.origin = origin
+
+    def http_open(self, request):
+        headers = mimetools.Message(
+            StringIO('ETag: %s\r\n\r\n' % self.origin.etag))
+        code = 200
+        if request.get_header('If-none-match') == self.origin.etag:
+            code = 304
+        fp = urllib2.addinfourl(StringIO(self.origin.content), headers,
+            request.get_full_url(), code)
+        fp.msg = 'OK'
+        return fp
+
+
+if __name__ == '__main__':
+    unittest.main()
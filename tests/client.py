@@ -0,0 +1,65 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Client tests.
+#
+
+import sys
+sys.path.append('../')
+import unittest
+from unittest import TestCase
+from tests import *
+from tests.fixtures import reply, connect, call
+from txsuds import MethodNotFound
+
+setup_logging()
+
+
+class BatchTest(TestCase):
+
+    def testBatch(self):
+        client = connect(2)
+        xml = reply(3)
+        other = xml.replace('Get0', 'Get1')
+        calls = [
+            ('Get0', (1,), dict(__inject=dict(reply=xml))),
+            ('Nope', ()),
+            ('Get1', (2,), dict(__inject=dict(reply=other))),]
+        results = []
+        client.service.batch(calls).addCallback(results.extend)
+        self.assertEqual([r[0] for r in results], [True, False, True])
+        self.assertEqual(str(results[0][1]), str(call(client, xml)))
+        self.assertEqual(str(results[2][1]), str(call(client, other, 'Get1')))
+        self.assertTrue(results[1][1].check(MethodNotFound))
+
+
+class FactoryTest(TestCase):
+
+    def testPrototypes(self):
+        client = connect(2)
+        expected = str(connect(2).factory.create('Item0'))
+        first = client.factory.create('Item0')
+        first.name = 'changed'
+        first.next.qty = 3
+        self.assertEqual(str(client.factory.create('Item0')), expected)
+        self.assertEqual(str(client.factory.create('ns0:Item0')), expected)
+        qualified = '{http://example.com/items}Item0'
+        self.assertEqual(str(client.factory.create(qualified)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
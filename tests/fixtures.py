@@ -0,0 +1,179 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Fixtures shared by the tests and the benchmarks: a generated
+# document/literal WSDL, its replies and the clients connected to it.
+#
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from txsuds.client import Client
+from txsuds.cache import NoCache
+from twisted.python.failure import Failure
+
+
+REPLY = '''<?xml version="1.0" encoding="UTF-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+<soap:Body><Get0Response xmlns="http://example.com/items">
+%s
+</Get0Response></soap:Body></soap:Envelope>'''
+
+ITEM = '<item id="%d"><name>item %d</name><price>%d.50</price><qty>%d</qty></item>'
+
+
+WSDL = '''<?xml version="1.0"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="http://example.com/items" targetNamespace="http://example.com/items">
+<types>%s</types>
+%s
+<portType name="ItemsPort">%s</portType>
+<binding name="ItemsBinding" type="tns:ItemsPort">
+<soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+%s
+</binding>
+<service name="ItemsService"><port name="Items" binding="tns:ItemsBinding">
+<soap:address location="http://localhost/items"/></port></service>
+</definitions>'''
+
+SCHEMA = '''<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="http://example.com/items" targetNamespace="http://example.com/items"
+    elementFormDefault="qualified">
+%s
+</xs:schema>'''
+
+IMPORT = '''<xs:schema>
+<xs:import namespace="http://example.com/items" schemaLocation="%s"/>
+</xs:schema>'''
+
+TYPE = '''<xs:complexType name="Item%(i)d"><xs:sequence>
+<xs:element name="name" type="xs:string"/><xs:element name="price" type="xs:decimal"/>
+<xs:element name="qty" type="xs:int"/><xs:element name="next" type="tns:Item%(j)d" minOccurs="0"/>
+</xs:sequence><xs:attribute name="id" type="xs:int"/></xs:complexType>
+<xs:element name="Get%(i)d"><xs:complexType><xs:sequence>
+<xs:element name="id" type="xs:int"/></xs:sequence></xs:complexType></xs:element>
+<xs:element name="Get%(i)dResponse"><xs:complexType><xs:sequence>
+<xs:element name="item" type="tns:Item%(i)d" maxOccurs="unbounded"/></xs:sequence></xs:complexType></xs:element>'''
+
+MESSAGE = '''<message name="Get%(i)dRequest"><part name="parameters" element="tns:Get%(i)d"/></message>
+<message name="Get%(i)dReply"><part name="parameters" element="tns:Get%(i)dResponse"/></message>'''
+
+OPERATION = '''<operation name="Get%(i)d">
+<input message="tns:Get%(i)dRequest"/><output message="tns:Get%(i)dReply"/></operation>'''
+
+BINDING = '''<operation name="Get%(i)d"><soap:operation soapAction="Get%(i)d"/>
+<input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>'''
+
+
+def reply(n):
+    """ a Get0 reply with (n) items """
+    return REPLY % '\n'.join([ITEM % (i, i, i, i) for i in range(n)])
+
+
+def xsd(n):
+    """ the schema of the types of a wsdl with (n) operations """
+    d = [TYPE % dict(i=i, j=(i+1)%n) for i in range(n)]
+    return SCHEMA % '\n'.join(d)
+
+
+def wsdl(n, location=None):
+    """
+    a document/literal wsdl with (n) operations and types.  The types
+    are imported from the xsd at (location) when specified.
+    """
+    if location is None:
+        parts = [xsd(n)]
+    else:
+        parts = [IMPORT % location]
+    for template in (MESSAGE, OPERATION, BINDING):
+        d = [template % dict(i=i, j=(i+1)%n) for i in range(n)]
+        parts.append('\n'.join(d))
+    return WSDL % tuple(parts)
+
+
+def load(text, **options):
+    """ a client connected to the wsdl (text) """
+    fd, path = tempfile.mkstemp(suffix='.wsdl')
+    try:
+        os.write(fd, text)
+        os.close(fd)
+        options.setdefault('cache', NoCache())
+        client = Client('file://%s' % path, **options)
+        client.connect()
+    finally:
+        os.remove(path)
+    return client
+
+
+def connect(n, **options):
+    """ a client connected to a wsdl with (n) operations """
+    return load(wsdl(n), **options)
+
+
+def method(client, name='Get0'):
+    return client.wsdl.services[0].ports[0].methods[name]
+
+
+def call(client, xml, name='Get0'):
+    """ invoke (name) with (xml) injected as the reply """
+    return getattr(client.service, name)(__inject=dict(reply=xml))
+
+
+def consume(client, xml, consumer, name='Get0'):
+    """ invoke (name) passing the reply items to (consumer) """
+    return getattr(client.service, name)(
+        __inject=dict(reply=xml), __consumer=consumer)
+
+
+def result(d):
+    """ the result of a deferred that has already fired """
+    results = []
+    d.addBoth(results.append)
+    if isinstance(results[0], Failure):
+        results[0].raiseException()
+    return results[0]
+
+
+class FileTest(TestCase):
+    """
+    A test with a temporary directory of documents.
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, text):
+        """ write (text) as the document (name) and get its url """
+        fp = open(os.path.join(self.dir, name), 'w')
+        try:
+            fp.write(text)
+        finally:
+            fp.close()
+        return 'file://%s' % os.path.join(self.dir, name)
+
+    def client(self, url, **options):
+        """ a client connected to (url) """
+        options.setdefault('cache', NoCache())
+        client = Client(url, **options)
+        client.connect()
+        return client
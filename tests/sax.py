@@ -0,0 +1,136 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# sax tests.
+#
+
+import sys
+sys.path.append('../')
+import pickle
+import unittest
+from unittest import TestCase
+from tests import *
+from copy import deepcopy
+from txsuds.sax.element import Element
+from txsuds.sax.parser import Parser
+from txsuds.sax.writer import Writer
+
+setup_logging()
+
+
+class NamespaceTest(TestCase):
+
+    def tree(self):
+        root = Element('root')
+        root.addPrefix('a', 'urn:a')
+        for name in ('x', 'y'):
+            child = Element(name)
+            root.append(child)
+            child.append(Element('leaf'))
+        return root
+
+    def testResolve(self):
+        root = self.tree()
+        x, y = root.children
+        self.assertEqual(x.children[0].resolvePrefix('a'), ('a', 'urn:a'))
+        x.addPrefix('a', 'urn:b')
+        self.assertEqual(x.children[0].resolvePrefix('a'), ('a', 'urn:b'))
+        self.assertEqual(y.children[0].resolvePrefix('a'), ('a', 'urn:a'))
+        y.children[0].detach()
+        x.append(Element('b:leaf', ns=('b', 'urn:c')))
+        self.assertEqual(x.children[1].resolvePrefix('b'), ('b', 'urn:c'))
+        moved = x.children[0]
+        y.append(moved.detach())
+        self.assertEqual(moved.resolvePrefix('a'), ('a', 'urn:a'))
+        self.assertEqual(moved.resolvePrefix('b', None), None)
+
+    def testSubtree(self):
+        root = self.tree()
+        other = self.tree()
+        for tree in (root, other):
+            for child in tree.children:
+                child.children[0].resolvePrefix('a')
+        root.children[0].addPrefix('c', 'urn:c')
+        root.children[1].append(Element('z'))
+        self.assertTrue(root.children[0].children[0].nsscope is None)
+        self.assertTrue(root.children[1].children[0].nsscope is not None)
+        for child in other.children:
+            self.assertTrue(child.children[0].nsscope is not None)
+
+
+class WriterTest(TestCase):
+
+    xml = '<?xml version="1.0"?><a:env xmlns:a="urn:a" xmlns="urn:d">' \
+        '<b x="1&amp;2"><c>t &lt; u \xc3\xa9</c><d/></b><e>z</e></a:env>'
+
+    def testText(self):
+        document = Parser().parse(string=self.xml)
+        root = document.root()
+        plain = u'<a:env xmlns="urn:d" xmlns:a="urn:a"><b x="1&amp;2">' \
+            u'<c>t &lt; u \xe9</c><d/></b><e>z</e></a:env>'
+        pretty = u'<a:env xmlns="urn:d" xmlns:a="urn:a">\n' \
+            u'   <b x="1&amp;2">\n      <c>t &lt; u \xe9</c>\n' \
+            u'      <d/>\n   </b>\n   <e>z</e>\n</a:env>'
+        decl = u'<?xml version="1.0" encoding="UTF-8"?>'
+        self.assertEqual(root.plain(), plain)
+        self.assertEqual(root.str(), pretty)
+        self.assertEqual(document.plain(), decl+plain)
+        self.assertEqual(document.str(), decl+'\n'+pretty)
+        self.assertEqual(str(root), pretty.encode('utf-8'))
+        self.assertEqual(Writer().encode(root), plain.encode('utf-8'))
+
+    def testDeep(self):
+        depth = sys.getrecursionlimit()*2
+        root = node = Element('n')
+        for i in range(depth):
+            child = Element('n')
+            node.append(child)
+            node = child
+        text = root.plain()
+        self.assertEqual(text, '<n>'*depth+'<n/>'+'</n>'*depth)
+
+
+class SlotsTest(TestCase):
+
+    def testLazyTables(self):
+        document = Parser().parse(string=WriterTest.xml)
+        root = document.root()
+        b = root.getChild('b')
+        c = b.getChild('c')
+        self.assertTrue(c._attributes is None)
+        self.assertTrue(c._nsprefixes is None)
+        self.assertEqual(c.getAttributes(), ())
+        self.assertTrue(c._attributes is None)
+        self.assertEqual(b.get('x'), '1&2')
+        self.assertEqual(root.resolvePrefix('a'), ('a', 'urn:a'))
+        self.assertEqual(c.namespace(), (None, 'urn:d'))
+        c.set('y', '2')
+        self.assertEqual(len(c.attributes), 1)
+        self.assertRaises(AttributeError, setattr, c, 'other', 1)
+
+    def testPickle(self):
+        document = Parser().parse(string=WriterTest.xml)
+        root = document.root()
+        copied = pickle.loads(pickle.dumps(root, -1))
+        self.assertEqual(copied.plain(), root.plain())
+        c = copied.getChild('b').getChild('c')
+        self.assertEqual(c.namespace(), (None, 'urn:d'))
+        self.assertEqual(deepcopy(root).str(), root.str())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Request scheduler tests.
+#
+
+import sys
+sys.path.append('../')
+import unittest
+from unittest import TestCase
+from tests import *
+from txsuds.options import Options
+from txsuds.scheduler import Scheduler
+from twisted.internet import defer
+
+setup_logging()
+
+
+class SchedulerTest(TestCase):
+
+    def setUp(self):
+        self.options = Options()
+        self.scheduler = Scheduler(self.options)
+        self.sent = []
+        self.results = []
+
+    def send(self, name):
+        d = defer.Deferred()
+        self.sent.append(name)
+        setattr(self, name, d)
+        return d
+
+    def schedule(self, name, location, options=None):
+        if options is None:
+            options = self.options
+        d = self.scheduler.schedule(options, location, self.send, name)
+        d.addCallback(self.results.append)
+        return d
+
+    def testUnlimited(self):
+        self.schedule('a', 'http://x/a')
+        self.schedule('b', 'http://x/b')
+        self.assertEqual(self.sent, ['a', 'b'])
+        self.b.callback(2)
+        self.a.callback(1)
+        self.assertEqual(self.results, [2, 1])
+        self.assertEqual(self.scheduler.active, 0)
+
+    def testMaxPerEndpoint(self):
+        self.options.maxPerEndpoint = 1
+        self.schedule('a', 'http://x/a')
+        self.schedule('b', 'http://x/b')
+        self.schedule('c', 'http://y/c')
+        self.assertEqual(self.sent, ['a', 'c'])
+        self.a.callback(1)
+        self.assertEqual(self.sent, ['a', 'c', 'b'])
+        self.assertEqual(self.scheduler.depth(), 0)
+
+    def testPriority(self):
+        self.options.maxConcurrent = 1
+        self.schedule('a', 'http://x/a')
+        for name, priority in (('b', 5), ('c', 1), ('d', 3), ('e', 1)):
+            options = Options(priority=priority)
+            self.schedule(name, 'http://x/%s' % name, options)
+        self.assertEqual(self.sent, ['a'])
+        for name in ('a', 'c', 'e', 'd'):
+            getattr(self, name).callback(name)
+        self.assertEqual(self.sent, ['a', 'c', 'e', 'd', 'b'])
+        self.assertEqual(self.results, ['a', 'c', 'e', 'd'])
+
+    def testQueuedHoldsNoEndpointSlot(self):
+        self.options.maxConcurrent = 1
+        self.options.maxPerEndpoint = 1
+        self.schedule('a', 'http://x/a')
+        self.schedule('b', 'http://x/b')
+        self.schedule('c', 'http://y/c')
+        self.a.callback(1)
+        self.assertEqual(self.sent, ['a', 'b'])
+        self.b.callback(2)
+        self.assertEqual(self.sent, ['a', 'b', 'c'])
+
+    def testCloneLimits(self):
+        self.options.maxConcurrent = 1
+        clone = Options(maxConcurrent=5)
+        self.schedule('a', 'http://x/a', clone)
+        self.schedule('b', 'http://x/b', clone)
+        self.assertEqual(self.sent, ['a'])
+        self.a.callback(1)
+        self.assertEqual(self.sent, ['a', 'b'])
+
+    def testCancelQueued(self):
+        self.options.maxConcurrent = 1
+        self.schedule('a', 'http://x/a')
+        b = self.schedule('b', 'http://x/b')
+        self.schedule('c', 'http://x/c')
+        failures = []
+        b.addErrback(failures.append)
+        b.cancel()
+        self.assertTrue(failures[0].check(defer.CancelledError))
+        self.assertEqual(self.scheduler.depth(), 1)
+        self.assertEqual(self.scheduler.active, 1)
+        self.a.callback(1)
+        self.assertEqual(self.sent, ['a', 'c'])
+        self.c.callback(3)
+        self.assertEqual(self.results, [1, 3])
+        self.assertEqual(self.scheduler.active, 0)
+        self.assertEqual(self.scheduler.depth(), 0)
+        self.assertEqual(self.scheduler.endpoints, {})
+        self.assertEqual(self.scheduler.queues, {})
+
+    def testCancelSent(self):
+        self.options.maxConcurrent = 1
+        a = self.schedule('a', 'http://x/a')
+        self.schedule('b', 'http://x/b')
+        a.addErrback(lambda f: f.trap(defer.CancelledError))
+        a.cancel()
+        self.assertEqual(self.sent, ['a', 'b'])
+        self.b.callback(2)
+        self.assertEqual(self.results, [2])
+        self.assertEqual(self.scheduler.active, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
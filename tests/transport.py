@@ -0,0 +1,178 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Transport tests.
+#
+
+import sys
+sys.path.append('../')
+import unittest
+from unittest import TestCase
+from tests import *
+from tests.fixtures import reply, connect, method, call, result
+from copy import deepcopy
+from twisted.internet import defer
+from txsuds import transport
+from txsuds.plugin import MessagePlugin
+from txsuds.bindings.binding import Binding
+from txsuds.transport.twisted_transport import TwistedTransport
+from txsuds.transport.twisted_transport import StringResponseConsumer
+from txsuds.transport.twisted_transport import FeedingResponseConsumer
+
+setup_logging()
+
+
+class PoolTest(TestCase):
+
+    def testShared(self):
+        transport = TwistedTransport()
+        transport.options.maxPersistentPerHost = 4
+        pool = transport.pool
+        self.assertTrue(transport.pool is pool)
+        self.assertEqual(pool.maxPersistentPerHost, 4)
+        self.assertTrue(deepcopy(transport).pool is pool)
+
+    def testOptionsChanged(self):
+        transport = TwistedTransport()
+        pool = transport.pool
+        agent = transport._getAgent(None)
+        transport.options.timeout = 5
+        self.assertTrue(transport.pool is pool)
+        agent5 = transport._getAgent(None)
+        self.assertFalse(agent5 is agent)
+        self.assertTrue(transport._getAgent(None) is agent5)
+        transport.options.persistent = False
+        self.assertFalse(transport.pool is pool)
+        self.assertFalse(transport.pool.persistent)
+        self.assertFalse(transport._getAgent(None) is agent5)
+
+    def testCopiedOptions(self):
+        transport = TwistedTransport()
+        transport.options.proxy = dict(http='localhost:3128')
+        pool = transport.pool
+        clone = deepcopy(transport)
+        clone.options.proxy['https'] = 'localhost:3129'
+        self.assertEqual(transport.options.proxy.keys(), ['http'])
+        clone.options.maxPersistentPerHost = 8
+        self.assertFalse(clone.pool is pool)
+        self.assertEqual(pool.maxPersistentPerHost, 2)
+
+
+class BodyTest(TestCase):
+
+    def testChunks(self):
+        consumer = StringResponseConsumer()
+        for chunk in ('<a>', 'b', '</a>'):
+            consumer.dataReceived(chunk)
+        self.assertEqual(consumer.chunks, ['<a>', 'b', '</a>'])
+        self.assertEqual(consumer.getBody(), '<a>b</a>')
+        self.assertEqual(consumer.chunks, ['<a>b</a>'])
+
+    def testMaxBodySize(self):
+        consumer = StringResponseConsumer(maxBodySize=5)
+        consumer.transport = Transport()
+        consumer.dataReceived('<a>')
+        consumer.dataReceived('b</a>')
+        self.assertTrue(consumer.transport.stopped)
+        errors = []
+        consumer.getDeferred().addErrback(errors.append)
+        consumer.connectionLost(None)
+        self.assertEqual(errors[0].value.httpcode, 413)
+        self.assertEqual(consumer.getBody(), '')
+
+
+class StreamingTest(TestCase):
+
+    def testFed(self):
+        client = connect(1)
+        xml = reply(20)
+        m = method(client)
+        binding = m.binding.input
+        consumer = FeedingResponseConsumer(binding.feeder(m))
+        for i in range(0, len(xml), 100):
+            consumer.dataReceived(xml[i:i+100])
+        consumer.connectionLost(None)
+        self.assertEqual(consumer.chunks, [])
+        result = binding.get_reply(m, consumer.document)[1]
+        self.assertEqual(len(result), 20)
+        self.assertEqual(str(result), str(call(client, xml)))
+
+    def testMalformed(self):
+        client = connect(1)
+        m = method(client)
+        consumer = FeedingResponseConsumer(m.binding.input.feeder(m))
+        consumer.transport = Transport()
+        consumer.dataReceived(reply(2)[:300] + '</x>')
+        self.assertTrue(consumer.transport.stopped)
+        errors = []
+        consumer.getDeferred().addErrback(errors.append)
+        consumer.connectionLost(None)
+        self.assertEqual(len(errors), 1)
+
+    def testPlugins(self):
+        class Rewriter(MessagePlugin):
+            def received(self, context):
+                context.reply = reply(2)
+        client = connect(1, streaming=True)
+        replier = client.options.transport = Replier(reply(3))
+        self.assertEqual(len(result(client.service.Get0())), 3)
+        self.assertTrue(replier.fed)
+        client = connect(1, streaming=True, plugins=[Rewriter()])
+        replier = client.options.transport = Replier(reply(3))
+        self.assertEqual(len(result(client.service.Get0())), 2)
+        self.assertFalse(replier.fed)
+
+    def testReplyFilter(self):
+        client = connect(1, streaming=True)
+        replier = client.options.transport = Replier(reply(3))
+        replyfilter = Binding.__dict__['replyfilter']
+        Binding.replyfilter = (lambda s,r: reply(2))
+        try:
+            self.assertEqual(len(result(client.service.Get0())), 2)
+        finally:
+            Binding.replyfilter = replyfilter
+        self.assertFalse(replier.fed)
+
+
+class Replier(transport.Transport):
+    """ a transport that replies (xml), feeding it when requested """
+
+    fed = False
+
+    def __init__(self, xml):
+        transport.Transport.__init__(self)
+        self.xml = xml
+
+    def send(self, request):
+        reply = transport.Reply(200, {}, self.xml)
+        if request.feeder is not None:
+            self.fed = True
+            request.feeder.feed(self.xml)
+            reply.document = request.feeder.close()
+        return defer.succeed(reply)
+
+
+class Transport:
+
+    stopped = False
+
+    def stopProducing(self):
+        self.stopped = True
+
+
+if __name__ == '__main__':
+    unittest.main()
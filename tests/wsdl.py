@@ -0,0 +1,232 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# WSDL loading tests.
+#
+
+import sys
+sys.path.append('../')
+import unittest
+from tests import *
+from tests.fixtures import FileTest
+from tests.fixtures import reply, wsdl, xsd, call
+from tests.fixtures import load, connect, result
+from txsuds import MethodNotFound, TypeNotFound
+import txsuds.soaparray
+from txsuds.client import Client
+from txsuds.cache import NoCache
+from txsuds.wsdl import Definitions
+
+setup_logging()
+
+
+class ImportTest(FileTest):
+
+    xs = 'xmlns:xs="http://www.w3.org/2001/XMLSchema"'
+
+    files = {
+        'main.wsdl':
+            '<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" %(xs)s'
+            ' targetNamespace="urn:main">'
+            '<import namespace="urn:other" location="other.wsdl"/>'
+            '<types>'
+            '<xs:schema targetNamespace="urn:a" xmlns:c="urn:c">'
+            '<xs:import namespace="urn:c" schemaLocation="common.xsd"/>'
+            '<xs:complexType name="A"><xs:sequence>'
+            '<xs:element name="c" type="c:C"/>'
+            '</xs:sequence></xs:complexType></xs:schema>'
+            '<xs:schema targetNamespace="urn:b" xmlns:c="urn:c">'
+            '<xs:import namespace="urn:c" schemaLocation="common.xsd"/>'
+            '<xs:complexType name="B"><xs:sequence>'
+            '<xs:element name="c" type="c:C"/>'
+            '</xs:sequence></xs:complexType></xs:schema>'
+            '</types></definitions>',
+        'other.wsdl':
+            '<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" %(xs)s'
+            ' targetNamespace="urn:other"><types>'
+            '<xs:schema targetNamespace="urn:other">'
+            '<xs:complexType name="O"><xs:sequence>'
+            '<xs:element name="o" type="xs:string"/>'
+            '</xs:sequence></xs:complexType></xs:schema>'
+            '</types></definitions>',
+        'common.xsd':
+            '<xs:schema %(xs)s targetNamespace="urn:c">'
+            '<xs:complexType name="C"><xs:sequence>'
+            '<xs:element name="n" type="xs:int"/>'
+            '</xs:sequence></xs:complexType></xs:schema>',
+    }
+
+    def setUp(self):
+        FileTest.setUp(self)
+        for name, text in self.files.items():
+            self.write(name, text % dict(xs=self.xs))
+        self.downloads = []
+        self.download = Definitions.download
+        def download(definitions, url):
+            self.downloads.append((url, definitions.semaphore))
+            return self.download(definitions, url)
+        Definitions.download = download
+
+    def tearDown(self):
+        Definitions.download = self.download
+        FileTest.tearDown(self)
+
+    def testDownloadedOnce(self):
+        url = 'file://%s/main.wsdl' % self.dir
+        client = self.client(url, maxImports=2)
+        urls = sorted([u.split('/')[-1] for u, s in self.downloads])
+        self.assertEqual(urls, ['common.xsd', 'main.wsdl', 'other.wsdl'])
+        semaphores = set([s for u, s in self.downloads])
+        self.assertEqual(len(semaphores), 1)
+        self.assertEqual(semaphores.pop().limit, 2)
+        for name in ('{urn:a}A', '{urn:b}B'):
+            x = client.factory.create(name)
+            self.assertEqual(x.c.__class__.__name__, 'C')
+        client.factory.create('{urn:other}O')
+
+
+class SharedTest(FileTest):
+
+    def setUp(self):
+        FileTest.setUp(self)
+        self.url = self.write('items.wsdl', wsdl(3))
+
+    def testShared(self):
+        first = self.client(self.url, sharedwsdl=True)
+        second = self.client(self.url, sharedwsdl=True)
+        self.assertTrue(first.wsdl is second.wsdl)
+        xml = reply(3)
+        expected = str(call(self.client(self.url), xml))
+        self.assertEqual(str(call(second, xml)), expected)
+        clone = second.clone()
+        self.assertEqual(str(call(clone, xml)), expected)
+        registry = Client.registry
+        wsdl = first.wsdl
+        first.close()
+        second.close()
+        self.assertTrue(id(wsdl) in registry.keys)
+        clone.close()
+        self.assertFalse(id(wsdl) in registry.keys)
+        reopened = self.client(self.url, sharedwsdl=True)
+        self.assertTrue(reopened.wsdl is not wsdl)
+        reopened.close()
+
+    def testKeyed(self):
+        first = self.client(self.url, sharedwsdl=True)
+        for options in (dict(operations=['Get1']), dict(directreply=True)):
+            other = self.client(self.url, sharedwsdl=True, **options)
+            self.assertTrue(other.wsdl is not first.wsdl)
+            other.close()
+        first.close()
+
+
+class OperationsTest(FileTest):
+
+    encoded = '''<?xml version="1.0"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soapenc="http://schemas.xmlsoap.org/soap/encoding/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="urn:items" targetNamespace="urn:items">
+<types><xs:schema targetNamespace="urn:items">
+<xs:import namespace="http://schemas.xmlsoap.org/soap/encoding/"/>
+<xs:complexType name="Item"><xs:sequence>
+<xs:element name="name" type="xs:string"/></xs:sequence></xs:complexType>
+<xs:complexType name="ArrayOfItem"><xs:complexContent>
+<xs:restriction base="soapenc:Array">
+<xs:attribute ref="soapenc:arrayType" wsdl:arrayType="tns:Item[]"/>
+</xs:restriction></xs:complexContent></xs:complexType>
+<xs:complexType name="Other"><xs:sequence>
+<xs:element name="x" type="xs:string"/></xs:sequence></xs:complexType>
+</xs:schema></types>
+<message name="ListRequest"/>
+<message name="ListReply"><part name="items" type="tns:ArrayOfItem"/></message>
+<message name="OtherRequest"/>
+<message name="OtherReply"><part name="other" type="tns:Other"/></message>
+<portType name="ItemsPort">
+<operation name="List"><input message="tns:ListRequest"/><output message="tns:ListReply"/></operation>
+<operation name="Other"><input message="tns:OtherRequest"/><output message="tns:OtherReply"/></operation>
+</portType>
+<binding name="ItemsBinding" type="tns:ItemsPort">
+<soap:binding style="rpc" transport="http://schemas.xmlsoap.org/soap/http"/>
+<operation name="List"><soap:operation soapAction="List"/>
+<input><soap:body use="encoded" namespace="urn:items" encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"/></input>
+<output><soap:body use="encoded" namespace="urn:items" encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"/></output></operation>
+<operation name="Other"><soap:operation soapAction="Other"/>
+<input><soap:body use="encoded" namespace="urn:items" encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"/></input>
+<output><soap:body use="encoded" namespace="urn:items" encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"/></output></operation>
+</binding>
+<service name="ItemsService"><port name="Items" binding="tns:ItemsBinding">
+<soap:address location="http://localhost/items"/></port></service>
+</definitions>'''
+
+    encodedreply = '''<?xml version="1.0" encoding="UTF-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
+    xmlns:soapenc="http://schemas.xmlsoap.org/soap/encoding/"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<soap:Body><ns:ListResponse xmlns:ns="urn:items">
+<items soapenc:arrayType="ns:Item[2]" xsi:type="soapenc:Array">
+<item><name>a</name></item><item><name>b</name></item>
+</items></ns:ListResponse></soap:Body></soap:Envelope>'''
+
+    def testPruned(self):
+        xml = reply(3)
+        full = connect(4)
+        pruned = connect(4, operations=['Get1'])
+        self.assertEqual(str(call(pruned, xml, 'Get1')),
+            str(call(full, xml, 'Get1')))
+        self.assertEqual(str(pruned.factory.create('Item1')),
+            str(full.factory.create('Item1')))
+        self.assertEqual(str(pruned.factory.create('Item2')),
+            str(full.factory.create('Item2')))
+        self.assertRaises(MethodNotFound, getattr, pruned.service, 'Get0')
+        self.assertRaises(TypeNotFound, pruned.factory.create, 'Get0')
+        elements = pruned.wsdl.schema.elements.keys()
+        self.assertEqual(sorted([e[0] for e in elements]),
+            ['Get1', 'Get1Response'])
+        url = self.write('items.wsdl', wsdl(4))
+        client = Client(url, cache=NoCache(), operations=['Get1', 'Get9'])
+        self.assertRaises(MethodNotFound, result, client.connect())
+
+    def testImported(self):
+        xml = reply(3)
+        self.write('items.xsd', xsd(4))
+        url = self.write('items.wsdl', wsdl(4, 'items.xsd'))
+        full = self.client(url)
+        pruned = self.client(url, operations=['Get1'])
+        self.assertEqual(str(call(pruned, xml, 'Get1')),
+            str(call(full, xml, 'Get1')))
+        container = pruned.wsdl.schema.container
+        names = []
+        for schema in container.importCache.values():
+            names += [c.name for c in schema.children]
+        self.assertEqual(sorted([n for n in names if n.startswith('Get')]),
+            ['Get1', 'Get1Response'])
+
+    def testEncodedArray(self):
+        full = load(self.encoded)
+        pruned = load(self.encoded, operations=['List'])
+        types = pruned.wsdl.schema.types
+        self.assertTrue(('Item', 'urn:items') in types)
+        self.assertFalse(('Other', 'urn:items') in types)
+        self.assertEqual(str(call(pruned, self.encodedreply, 'List')),
+            str(call(full, self.encodedreply, 'List')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+
+#
+# Schema tests.
+#
+
+import sys
+sys.path.append('../')
+import pickle
+import unittest
+from unittest import TestCase
+from tests import *
+from tests.fixtures import reply, load, connect, call
+from tests.fixtures import FileTest
+from txsuds.snapshot import Snapshot
+from txsuds.options import Options
+from txsuds.xsd import sxbasic
+from txsuds.xsd.query import ElementQuery
+from txsuds.xsd.schema import Schema
+from txsuds.sax.parser import Parser
+
+setup_logging()
+
+
+class LazyTest(TestCase):
+
+    shapes = '''<?xml version="1.0"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="urn:shapes" targetNamespace="urn:shapes">
+<types><xs:schema targetNamespace="urn:shapes" elementFormDefault="qualified">
+<xs:complexType name="Square"><xs:complexContent><xs:extension base="tns:Rect">
+<xs:sequence><xs:element name="side" type="xs:int"/></xs:sequence>
+</xs:extension></xs:complexContent></xs:complexType>
+<xs:complexType name="Rect"><xs:complexContent><xs:extension base="tns:Shape">
+<xs:sequence><xs:element name="width" type="xs:int"/></xs:sequence>
+</xs:extension></xs:complexContent></xs:complexType>
+<xs:complexType name="Shape"><xs:sequence>
+<xs:element ref="tns:name"/></xs:sequence>
+<xs:attribute name="id" type="xs:int"/></xs:complexType>
+<xs:element name="name" type="xs:string"/>
+<xs:element name="Get"><xs:complexType><xs:sequence>
+<xs:element name="id" type="xs:int"/></xs:sequence></xs:complexType></xs:element>
+<xs:element name="GetResponse"><xs:complexType><xs:sequence>
+<xs:element name="shape" type="tns:Square"/></xs:sequence></xs:complexType></xs:element>
+</xs:schema></types>
+<message name="GetRequest"><part name="parameters" element="tns:Get"/></message>
+<message name="GetReply"><part name="parameters" element="tns:GetResponse"/></message>
+<portType name="ShapesPort"><operation name="Get">
+<input message="tns:GetRequest"/><output message="tns:GetReply"/></operation></portType>
+<binding name="ShapesBinding" type="tns:ShapesPort">
+<soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+<operation name="Get"><soap:operation soapAction="Get"/>
+<input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>
+</binding>
+<service name="ShapesService"><port name="Shapes" binding="tns:ShapesBinding">
+<soap:address location="http://localhost/shapes"/></port></service>
+</definitions>'''
+
+    shapesreply = '''<?xml version="1.0" encoding="UTF-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+<soap:Body><GetResponse xmlns="urn:shapes"><shape id="3"><name>sq</name>
+<width>2</width><side>2</side></shape></GetResponse></soap:Body></soap:Envelope>'''
+
+    def testPending(self):
+        client = connect(3, lazyschema=True)
+        types = client.wsdl.schema.types
+        item = types[('Item0', 'http://example.com/items')]
+        self.assertTrue(item.pending is not None)
+        client.factory.create('Item0')
+        self.assertTrue(item.pending is None)
+
+    def testDefault(self):
+        xml = reply(3)
+        eager = connect(3)
+        lazy = connect(3, lazyschema=True)
+        self.assertEqual(str(call(lazy, xml)), str(call(eager, xml)))
+        self.assertEqual(str(lazy.factory.create('Item2')),
+            str(eager.factory.create('Item2')))
+        self.assertEqual(str(lazy), str(eager))
+
+    def testExtension(self):
+        eager = load(self.shapes)
+        lazy = load(self.shapes, lazyschema=True)
+        square = lazy.wsdl.schema.types[('Square', 'urn:shapes')]
+        self.assertTrue(square.pending is not None)
+        self.assertEqual(str(call(lazy, self.shapesreply, 'Get')),
+            str(call(eager, self.shapesreply, 'Get')))
+        self.assertEqual(str(lazy.factory.create('Square')),
+            str(eager.factory.create('Square')))
+
+    def testPickle(self):
+        eager = load(self.shapes)
+        lazy = load(self.shapes, lazyschema=True)
+        for loads, dumps in (
+                (pickle.loads, lambda d: pickle.dumps(d, 2)),
+                (Snapshot().loads, Snapshot().dumps)):
+            definitions = loads(dumps(lazy.wsdl))
+            square = definitions.schema.types[('Square', 'urn:shapes')]
+            self.assertTrue(square.pending is not None)
+            self.assertEqual(
+                [c.name for c, a in square],
+                [c.name for c, a in eager.wsdl.schema.types[
+                    ('Square', 'urn:shapes')]])
+
+
+class SchemaTest(FileTest):
+
+    wsdl = '''<?xml version="1.0"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema" targetNamespace="urn:m">
+<types><xs:schema targetNamespace="urn:m">
+<xs:import namespace="urn:t" schemaLocation="t.xsd"/>
+</xs:schema></types></definitions>'''
+
+    xsd = '''<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="urn:t" xmlns:t="urn:t">
+<xs:complexType name="T"><xs:sequence>
+<xs:element name="a" type="xs:string"/>
+<xs:element name="b" type="xs:int"/>
+<xs:any/>
+<xs:element name="c" type="xs:int"/>
+</xs:sequence><xs:attribute name="x" type="xs:string"/></xs:complexType>
+<xs:complexType name="D"><xs:complexContent><xs:extension base="t:T">
+<xs:sequence><xs:element name="d" type="xs:int"/></xs:sequence>
+<xs:attribute name="y" type="xs:int"/>
+</xs:extension></xs:complexContent></xs:complexType>
+<xs:element name="E"><xs:complexType><xs:sequence>
+<xs:element name="a" type="t:D"/>
+</xs:sequence><xs:attribute name="z" type="xs:int"/></xs:complexType>
+</xs:element>
+</xs:schema>'''
+
+    def setUp(self):
+        FileTest.setUp(self)
+        self.write('t.xsd', self.xsd)
+        client = self.client(self.write('m.wsdl', self.wsdl))
+        self.merged = client.wsdl.schema
+
+
+class IndexTest(SchemaTest):
+
+    def child(self, x, name):
+        for child, ancestry in x.children():
+            if child.any() or child.name == name:
+                return (child, ancestry)
+        return (None, [])
+
+    def attribute(self, x, name):
+        for child, ancestry in x.attributes():
+            if child.name == name:
+                return (child, ancestry)
+        return (None, [])
+
+    def testChildren(self):
+        names = ('a', 'b', 'c', 'd', 'x', 'y', 'z', 'missing')
+        self.assertEqual(len(self.merged.all), 3)
+        for x in self.merged.all:
+            for name in names * 2:
+                self.assertEqual(x.get_child(name), self.child(x, name))
+                self.assertEqual(x.get_attribute(name),
+                    self.attribute(x, name))
+        d = self.merged.types[('D', 'urn:t')]
+        self.assertEqual(d.get_child('b')[0].name, 'b')
+        self.assertTrue(d.get_child('d')[0].any())
+        self.assertEqual(d.get_attribute('x')[0].name, 'x')
+
+    def testNested(self):
+        for cls in (sxbasic.Element, sxbasic.Attribute):
+            for name in ('a', 'b', 'c', 'x', 'z', 'missing'):
+                qref = (name, 'urn:t')
+                expected = []
+                for x in self.merged.all:
+                    found = x.find(qref, (cls,))
+                    if found is not None:
+                        expected.append(found)
+                self.assertEqual(list(self.merged.nested(qref, cls)),
+                    expected)
+        a = ElementQuery(('a', 'urn:t')).execute(self.merged)
+        self.assertEqual(a.name, 'a')
+        self.assertEqual(len(self.merged.nested(('a', 'urn:t'),
+            sxbasic.Element)), 3)
+
+    def testLazy(self):
+        client = self.client(self.write('m.wsdl', self.wsdl),
+            lazyschema=True)
+        schema = client.wsdl.schema
+        a = ElementQuery(('a', 'urn:t')).execute(schema)
+        self.assertEqual(a.name, 'a')
+        d = schema.types[('D', 'urn:t')]
+        self.assertTrue(d.pending is not None)
+        schema.nested(('a', 'urn:t'), sxbasic.Element)
+        self.assertTrue(d.pending is not None)
+        self.assertTrue(schema.index is not None)
+        d.dereference()
+        self.assertTrue(schema.index is None)
+        self.assertEqual([x.type for x in schema.nested(('a', 'urn:t'),
+            sxbasic.Element)], [x.type for x in self.merged.nested(
+            ('a', 'urn:t'), sxbasic.Element)])
+
+    def testBuilding(self):
+        schema = Schema(Parser().parse(string=self.xsd).root(),
+            'file:///t.xsd', Options())
+        schema.build()
+        t = schema.types[('T', 'urn:t')]
+        self.assertEqual([c[0].name for c in t], ['a', 'b', 'any', 'c', 'x'])
+        self.assertEqual(t.get_child('b')[0].name, 'b')
+        self.assertFalse('children' in t.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,7 @@ from txsuds.mx import Content
 from txsuds.mx.literal import Literal as MxLiteral
 from txsuds.umx.basic import Basic as UmxBasic
 from txsuds.umx.typed import Typed as UmxTyped
+from txsuds.umx.compiled import Compiled as UmxCompiled
 from txsuds.bindings.multiref import MultiRef
 from txsuds.xsd.query import TypeQuery, ElementQuery
 from txsuds.xsd.sxbasic import Element as SchemaElement
@@ -44,15 +45,27 @@ class Binding:
     soap messages per the WSDL port binding.
     @cvar replyfilter: The reply filter function.
     @type replyfilter: (lambda s,r: r)
+    @cvar unfiltered: The default (no-op) reply filter function.
+    @type unfiltered: (lambda s,r: r)
     @ivar wsdl: The wsdl.
     @type wsdl: L{suds.wsdl.Definitions}
     @ivar schema: The collective schema contained within the wsdl.
     @type schema: L{xsd.schema.Schema}
     @ivar options: A dictionary options.
     @type options: L{Options}
+    @ivar mx: The (cached) marshaller as: (I{xstq}, marshaller).
+    @type mx: tuple
+    @ivar templates: The (cached) compiled envelope templates.
+    @type templates: dict
+    @ivar plans: The (cached) compiled unmarshaller plans.
+    @type plans: dict
     """
 
     replyfilter = (lambda s,r: r)
+    unfiltered = replyfilter
+    mx = None
+    templates = None
+    plans = None
 
     def __init__(self, wsdl):
         """
@@ -68,20 +81,52 @@ class Binding:
     def options(self):
         return self.wsdl.options
 
+    def filtered(self):
+        """
+        Get whether a reply filter (other than the default) is set.
+        @return: True when replies are filtered before they are parsed.
+        @rtype: bool
+        """
+        f = getattr(self.replyfilter, 'im_func', self.replyfilter)
+        return f is not Binding.unfiltered.im_func
+
+    def __getstate__(self):
+        nopickle = ('mx', 'templates', 'plans')
+        state = self.__dict__.copy()
+        for k in nopickle:
+            if k in state:
+                del state[k]
+        return state
+
     def unmarshaller(self, typed=True):
         """
-        Get the appropriate XML decoder.
+        Get the appropriate XML decoder.  The typed decoder runs the
+        compiled plans that are cached (and reused) by the binding.
         @return: Either the (basic|typed) unmarshaller.
         @rtype: L{UmxTyped}
         """
         if typed:
-            return UmxTyped(self.schema())
+            if self.plans is None:
+                self.plans = {}
+            return UmxCompiled(self.schema(), self.plans)
         else:
             return UmxBasic()
 
     def marshaller(self):
         """
-        Get the appropriate XML encoder.
+        Get the appropriate XML encoder.  The encoder (and its schema
+        resolver) is built once and reused for every message.
+        @return: An L{MxLiteral} marshaller.
+        @rtype: L{MxLiteral}
+        """
+        xstq = self.options().xstq
+        if self.mx is None or self.mx[0] != xstq:
+            self.mx = (xstq, self.encoder())
+        return self.mx[1]
+
+    def encoder(self):
+        """
+        Build the appropriate XML encoder.
         @return: An L{MxLiteral} marshaller.
         @rtype: L{MxLiteral}
         """
@@ -124,22 +169,88 @@ class Binding:
             env.refitPrefixes()
         return Document(env)
 
-    def get_reply(self, method, reply):
+    def get_compiled_message(self, method, args, kwargs):
+        """
+        Get the (serialized) soap message for the specified method and args
+        using the compiled envelope template for the method.  Templates are
+        only used when the message has no soap headers.
+        @param method: The method being invoked.
+        @type method: I{service.Method}
+        @param args: A list of args for the method invoked.
+        @type args: list
+        @param kwargs: Named (keyword) args for the method invoked.
+        @type kwargs: dict
+        @return: The serialized soap envelope or None when the message
+            cannot be built from a template.
+        @rtype: unicode
+        """
+        options = self.options()
+        if options.wsse is not None or options.soapheaders:
+            return None
+        #
+        # The key includes the options used to build (and serialize)
+        # the envelope so that changing them compiles a new template.
+        #
+        key = (method.name, options.envns, options.prefixes, options.xstq)
+        if self.templates is None:
+            self.templates = {}
+        if key in self.templates:
+            template = self.templates[key]
+        else:
+            template = self.template(method)
+            self.templates[key] = template
+        if template is None:
+            return None
+        return template.render(args, kwargs)
+
+    def template(self, method):
+        """
+        Compile the envelope template for the specified method.
+        @param method: The method being invoked.
+        @type method: I{service.Method}
+        @return: The template or None when not supported.
+        @rtype: L{Template}
+        """
+        return None
+
+    def feeder(self, method, consumer=None):
+        """
+        Get an incremental parser for the reply of a method.
+        @param method: The name of the invoked method.
+        @type method: str
+        @param consumer: An (optional) callable that is passed each of the
+            items of an unbounded (list) reply.
+        @type consumer: I{function}
+        @return: An incremental parser.
+        @rtype: L{txsuds.sax.parser.Feeder}
+        """
+        return Parser().feeder()
+
+    def get_reply(self, method, reply, consumer=None):
         """
         Process the I{reply} for the specified I{method} by sax parsing the I{reply}
         and then unmarshalling into python object(s).
         @param method: The name of the invoked method.
         @type method: str
-        @param reply: The reply XML received after invoking the specified method.
-        @type reply: str
+        @param reply: The reply XML received after invoking the specified method
+            or the reply document when it has already been parsed.
+        @type reply: str|L{Document}
+        @param consumer: An (optional) callable that is passed each of the
+            items of an unbounded (list) reply instead of the items being
+            returned in a list.
+        @type consumer: I{function}
         @return: The unmarshalled reply.  The returned value is an L{Object} for a
             I{list} depending on whether the service returns a single object or a
-            collection.
+            collection.  The number of items passed to the I{consumer} is
+            returned instead of the I{list}.
         @rtype: tuple ( L{Element}, L{Object} )
         """
-        reply = self.replyfilter(reply)
-        sax = Parser()
-        replyroot = sax.parse(string=reply)
+        if isinstance(reply, Document):
+            replyroot = reply
+        else:
+            reply = self.replyfilter(reply)
+            sax = Parser()
+            replyroot = sax.parse(string=reply)
         plugins = PluginContainer(self.options().plugins)
         plugins.message.parsed(reply=replyroot)
         soapenv = replyroot.getChild('Envelope')
@@ -154,7 +265,7 @@ class Binding:
             return (replyroot, result)
         if len(rtypes) == 1:
             if rtypes[0].unbounded():
-                result = self.replylist(rtypes[0], nodes)
+                result = self.replylist(rtypes[0], nodes, consumer)
                 return (replyroot, result)
             if len(nodes):
                 unmarshaller = self.unmarshaller()
@@ -181,7 +292,7 @@ class Binding:
         return self
 
 
-    def replylist(self, rt, nodes):
+    def replylist(self, rt, nodes, consumer=None):
         """
         Construct a I{list} reply.  This mehod is called when it has been detected
         that the reply is a list.
@@ -189,16 +300,25 @@ class Binding:
         @type rt: L{suds.xsd.sxbase.SchemaObject}
         @param nodes: A collection of XML nodes.
         @type nodes: [L{Element},...]
-        @return: A list of I{unmarshalled} objects.
-        @rtype: [L{Object},...]
+        @param consumer: An (optional) callable that is passed each of the
+            I{unmarshalled} objects instead of them being kept.
+        @type consumer: I{function}
+        @return: A list of I{unmarshalled} objects (the number of objects
+            passed to the I{consumer}).
+        @rtype: [L{Object},...]|int
         """
         result = []
         resolved = rt.resolve(nobuiltin=True)
         unmarshaller = self.unmarshaller()
         for node in nodes:
             sobject = unmarshaller.process(node, resolved)
-            result.append(sobject)
-        return result
+            if consumer is None:
+                result.append(sobject)
+            else:
+                consumer(sobject)
+        if consumer is None:
+            return result
+        return len(nodes)
 
     def replycomposite(self, rtypes, nodes):
         """
@@ -0,0 +1,497 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+Provides classes for unmarshalling (document/literal) replies directly
+from the sax events.
+"""
+
+from logging import getLogger
+from txsuds import *
+from txsuds.sax import Namespace, splitPrefix
+from txsuds.sax.parser import Handler
+from txsuds.sax.document import Document
+from txsuds.sax.element import Element
+from txsuds.sax.attribute import Attribute
+from txsuds.sax.text import Text
+from txsuds.bindings.multiref import soapenc
+
+log = getLogger(__name__)
+
+
+class ReplyDocument(Document):
+    """
+    A reply document built by a L{ReplyHandler}.  When the reply content
+    has been unmarshalled directly, the content nodes are not in the
+    document.
+    @ivar handler: The handler that built the document.
+    @type handler: L{ReplyHandler}
+    """
+
+    def __init__(self, handler):
+        """
+        @param handler: The handler that builds the document.
+        @type handler: L{ReplyHandler}
+        """
+        Document.__init__(self)
+        self.handler = handler
+
+
+class Frame(object):
+    """
+    An open (or parsed) node of a content node being unmarshalled
+    directly.  A frame provides the parts of the L{Element} interface
+    used by the L{txsuds.umx.compiled.Compiled} unmarshaller and can be
+    expanded into an L{Element} when needed.
+    @ivar qn: The (raw) qualified name.
+    @type qn: unicode
+    @ivar prefix: The namespace prefix.
+    @type prefix: unicode
+    @ivar name: The (local) name.
+    @type name: unicode
+    @ivar expns: The explicit (default) namespace URI.
+    @type expns: unicode
+    @ivar nsprefixes: The declared prefix mappings, else None.
+    @type nsprefixes: dict
+    @ivar attributes: The (non namespace declaration) attributes.
+    @type attributes: [L{Attribute},...]
+    @ivar parent: The parent frame or element.
+    @type parent: L{Frame}|L{Element}
+    @ivar children: The child frames.
+    @type children: [L{Frame},...]
+    @ivar text: The text content (set when parsed).
+    @type text: L{Text}
+    @ivar plan: The unmarshalling plan, else None when not unmarshalled.
+    @type plan: L{txsuds.umx.compiled.Plan}
+    @ivar data: The (partially) unmarshalled data object.
+    @type data: L{Object}
+    @ivar attrlist: The attributes as passed to the unmarshaller.
+    @type attrlist: L{txsuds.umx.attrlist.AttrList}
+    """
+
+    __slots__ = (
+        'qn', 'prefix', 'name', 'expns', 'nsprefixes', 'attributes',
+        'parent', 'children', 'text', 'plan', 'data', 'attrlist',)
+
+    specialprefixes = Element.specialprefixes
+
+    def __init__(self, name, attrs, parent):
+        """
+        @param name: The (raw) qualified name.
+        @type name: unicode
+        @param attrs: The sax attributes.
+        @type attrs: I{xml.sax.xmlreader.AttributesImpl}
+        @param parent: The parent frame or element.
+        @type parent: L{Frame}|L{Element}
+        """
+        self.qn = name
+        self.prefix, self.name = splitPrefix(name)
+        self.expns = None
+        self.nsprefixes = None
+        self.parent = parent
+        self.children = []
+        self.text = None
+        self.plan = None
+        self.data = None
+        self.attrlist = None
+        attributes = []
+        for a in attrs.getNames():
+            attribute = Attribute(unicode(a), unicode(attrs.getValue(a)))
+            if attribute.name == 'xmlns':
+                if len(attribute.value):
+                    self.expns = unicode(attribute.value)
+                continue
+            if attribute.prefix == 'xmlns':
+                if self.nsprefixes is None:
+                    self.nsprefixes = {}
+                self.nsprefixes[attribute.name] = unicode(attribute.value)
+                continue
+            attribute.parent = self
+            attributes.append(attribute)
+        self.attributes = attributes
+
+    def qname(self):
+        return self.qn
+
+    def getAttributes(self):
+        return self.attributes
+
+    def getAttribute(self, name, ns=None, default=None):
+        for a in self.attributes:
+            if a.match(name, ns):
+                return a
+        return default
+
+    def get(self, name, ns=None, default=None):
+        attr = self.getAttribute(name, ns)
+        if attr is None or attr.value is None:
+            return default
+        return attr.getValue()
+
+    def resolvePrefix(self, prefix, default=Namespace.default):
+        if self.nsprefixes and prefix in self.nsprefixes:
+            return (prefix, self.nsprefixes[prefix])
+        if prefix in self.specialprefixes:
+            return (prefix, self.specialprefixes[prefix])
+        return self.parent.resolvePrefix(prefix, default)
+
+    def defaultNamespace(self):
+        if self.expns is not None:
+            return (None, self.expns)
+        return self.parent.defaultNamespace()
+
+    def namespace(self):
+        if self.prefix is None:
+            return self.defaultNamespace()
+        return self.resolvePrefix(self.prefix)
+
+    def hasText(self):
+        return ( self.text is not None and len(self.text) )
+
+    def getText(self, default=None):
+        if self.hasText():
+            return self.text
+        return default
+
+    def isnil(self):
+        nilattr = self.getAttribute('nil', ns=Namespace.xsins)
+        if nilattr is None:
+            return False
+        return ( nilattr.getValue().lower() == 'true' )
+
+    def close(self, buffer):
+        """
+        Set the text content (as L{Handler.endElement} does).
+        @param buffer: The character buffer.
+        @type buffer: [unicode,...]
+        """
+        if len(buffer):
+            self.text = Text(u''.join(buffer))
+        if len(self.children) and self.hasText():
+            self.text = self.text.trim()
+
+    def element(self, parent, elements):
+        """
+        Expand the frame (and its children) into an element.
+        @param parent: The parent element.
+        @type parent: L{Element}
+        @param elements: The expanded elements by frame (id).
+        @type elements: dict
+        @return: The element.
+        @rtype: L{Element}
+        """
+        node = Element(self.qn, parent=parent)
+        elements[id(self)] = node
+        if self.expns is not None:
+            node.expns = self.expns
+        if self.nsprefixes:
+            for p, u in self.nsprefixes.items():
+                node.addPrefix(p, u)
+        for a in self.attributes:
+            node.append(a)
+        node.text = self.text
+        parent.append(node)
+        for child in self.children:
+            child.element(node, elements)
+        return node
+
+
+class ReplyHandler(Handler):
+    """
+    A sax handler that unmarshals each of the reply content nodes while
+    it is parsed.  The content nodes are the children of the body or the
+    children of the wrapper (first body child) when I{wrapped}.  The
+    nodes of a content node are kept as light weight L{Frame}s (instead
+    of elements) until the content node has been unmarshalled and are
+    then dropped, so only the envelope, the body and the wrapper are
+    built as elements.  A content node that has mixed content is built
+    as elements and unmarshalled as usual.  The rest of the document is
+    built as elements (I{whole}) when the reply contains a fault or
+    multirefs so that it can be processed as usual.
+    @ivar envns: The soap envelope namespace.
+    @type envns: (I{prefix}, I{name})
+    @ivar wrapped: The content nodes are wrapped.
+    @type wrapped: bool
+    @ivar unmarshaller: The unmarshaller used for the content nodes.
+    @type unmarshaller: L{txsuds.umx.compiled.Compiled}
+    @ivar type: The returned type.
+    @type type: L{xsd.sxbase.SchemaObject}
+    @ivar resolved: The resolved returned type.
+    @type resolved: L{xsd.sxbase.SchemaObject}
+    @ivar unbounded: The returned type is unbounded.
+    @type unbounded: bool
+    @ivar consumer: An (optional) callable that is passed each of the
+        unmarshalled items of an unbounded type instead of keeping them.
+    @type consumer: I{function}
+    @ivar items: The unmarshalled items.
+    @type items: [L{Object},...]
+    @ivar count: The number of unmarshalled items.
+    @type count: int
+    @ivar body: The soap envelope body node.
+    @type body: L{Element}
+    @ivar content: The node that contains the content nodes.
+    @type content: L{Element}
+    @ivar expanded: The current content node is built as elements.
+    @type expanded: bool
+    @ivar whole: The rest of the document is built as elements.
+    @type whole: bool
+    """
+
+    def __init__(self, envns, wrapped, unmarshaller, type, consumer=None):
+        """
+        @param envns: The soap envelope namespace.
+        @type envns: (I{prefix}, I{name})
+        @param wrapped: The content nodes are wrapped.
+        @type wrapped: bool
+        @param unmarshaller: The unmarshaller used for the content nodes.
+        @type unmarshaller: L{txsuds.umx.compiled.Compiled}
+        @param type: The returned type.
+        @type type: L{xsd.sxbase.SchemaObject}
+        @param consumer: An (optional) callable that is passed each of the
+            unmarshalled items of an unbounded type.
+        @type consumer: I{function}
+        """
+        Handler.__init__(self)
+        self.nodes = [ReplyDocument(self)]
+        self.envns = envns
+        self.wrapped = wrapped
+        self.unmarshaller = unmarshaller
+        self.type = type
+        self.resolved = type.resolve(nobuiltin=True)
+        self.unbounded = type.unbounded()
+        if self.unbounded:
+            self.consumer = consumer
+        else:
+            self.consumer = None
+        self.items = []
+        self.count = 0
+        self.body = None
+        self.content = None
+        self.expanded = False
+        self.whole = False
+
+    def direct(self):
+        """
+        Get whether the reply content has been unmarshalled directly.
+        @return: True when directly unmarshalled.
+        @rtype: bool
+        """
+        return ( self.content is not None and not self.whole )
+
+    def add(self, item):
+        """
+        Add an unmarshalled item.  The item is passed to the I{consumer}
+        (when set) instead of being kept.
+        @param item: An unmarshalled content node.
+        @type item: L{Object}
+        """
+        self.count += 1
+        if self.consumer is None:
+            self.items.append(item)
+        else:
+            self.consumer(item)
+
+    def result(self):
+        """
+        Get the unmarshalled reply.
+        @return: The list of items (the number of items passed to the
+            I{consumer}) when unbounded, else the item or None.
+        @rtype: L{Object}|[L{Object},...]|int
+        """
+        if self.unbounded:
+            if self.consumer is None:
+                return self.items
+            return self.count
+        if len(self.items):
+            return self.items[0]
+        return None
+
+    def startElement(self, name, attrs):
+        top = self.top()
+        if self.whole or self.expanded:
+            Handler.startElement(self, name, attrs)
+            return
+        if top.__class__ is Frame:
+            self.frame(Frame(unicode(name), attrs, top))
+            return
+        if top is self.content:
+            self.item(Frame(unicode(name), attrs, top))
+            return
+        Handler.startElement(self, name, attrs)
+        node = self.top()
+        if node.getAttribute('href') is not None:
+            self.fallback('multiref')
+            return
+        depth = len(self.nodes)
+        if depth == 2:
+            if not node.match('Envelope', self.envns):
+                self.fallback('not a soap envelope')
+            return
+        if depth == 3:
+            if self.body is None and node.name == 'Body':
+                if not node.match('Body', self.envns):
+                    self.fallback('not a soap body')
+                    return
+                self.body = node
+                if not self.wrapped:
+                    self.content = node
+            return
+        if node.parent is self.body:
+            self.check(node)
+            if not self.whole and self.content is None:
+                self.content = node
+
+    def item(self, frame):
+        """
+        Start a content node.  Once a bounded returned type has been
+        unmarshalled, the content nodes that follow are skipped.
+        @param frame: The frame of the content node.
+        @type frame: L{Frame}
+        """
+        if self.content is self.body:
+            self.check(frame)
+            if self.whole:
+                self.expand(frame, True)
+                return
+        if self.count and not self.unbounded:
+            self.push(frame)
+            return
+        if frame.getAttribute('href') is not None:
+            self.fallback('multiref')
+            self.expand(frame, True)
+            return
+        frame.plan = self.unmarshaller.plan(frame, self.resolved)
+        if len(frame.attributes):
+            self.begin(frame)
+        self.push(frame)
+
+    def frame(self, frame):
+        """
+        Start a (nested) node of a content node.
+        @param frame: The frame of the node.
+        @type frame: L{Frame}
+        """
+        parent = frame.parent
+        parent.children.append(frame)
+        if parent.plan is None:
+            self.push(frame)
+            return
+        if frame.getAttribute('href') is not None:
+            self.fallback('multiref')
+            self.expand(frame, True)
+            return
+        if parent.data is None:
+            self.begin(parent)
+        frame.plan = self.unmarshaller.child(frame, parent.plan)
+        if len(frame.attributes):
+            self.begin(frame)
+        self.push(frame)
+
+    def begin(self, frame):
+        """
+        Begin unmarshalling a node of a content node.  The data object
+        is created once the node has attributes or its first child so
+        that none is created for the (many) simple leaf nodes.
+        @param frame: The frame of the node.
+        @type frame: L{Frame}
+        """
+        frame.data, frame.attrlist = \
+            self.unmarshaller.begin(frame, frame.plan)
+
+    def check(self, node):
+        """
+        Check a body child for a fault or multirefs.  Once a bounded
+        returned type has been unmarshalled, only a fault matters.
+        @param node: A body child.
+        @type node: L{Element}|L{Frame}
+        """
+        if node.match('Fault', self.envns):
+            self.fallback('fault')
+            return
+        if self.count and not self.unbounded:
+            return
+        if node.get('id') is not None or \
+            node.getAttribute('root', ns=soapenc) is not None:
+                self.fallback('multiref')
+
+    def endElement(self, name):
+        frame = self.top()
+        if frame.__class__ is not Frame:
+            Handler.endElement(self, name)
+            if self.expanded and frame.parent is self.content:
+                self.expanded = False
+                self.add(self.unmarshaller.process(frame, self.resolved))
+                self.content.children.pop()
+            return
+        frame.close(self.buffers[-1])
+        if name != frame.qn:
+            raise Exception('malformed document')
+        self.pop()
+        if frame.plan is None:
+            return
+        if len(frame.children) and frame.hasText():
+            self.expand(frame)
+            return
+        if frame.data is None:
+            value = self.unmarshaller.leaf(frame, frame.plan)
+        else:
+            value = self.unmarshaller.finish(
+                frame, frame.data, frame.plan, frame.attrlist)
+        parent = frame.parent
+        if parent.__class__ is Frame:
+            self.unmarshaller.add(parent.data, frame, frame.plan, value)
+        else:
+            self.add(value)
+
+    def expand(self, frame, started=False):
+        """
+        Expand the current content node (that contains the frame) into
+        elements.  The open frames are replaced by their elements.  When
+        the content node has been parsed, it is unmarshalled as usual.
+        @param frame: A frame of the current content node.
+        @type frame: L{Frame}
+        @param started: The frame has just been started (is not open).
+        @type started: bool
+        """
+        top = frame
+        while top.parent.__class__ is Frame:
+            top = top.parent
+        content = top.parent
+        elements = {}
+        node = top.element(content, elements)
+        for i in range(len(self.nodes)):
+            n = self.nodes[i]
+            if n.__class__ is Frame:
+                self.nodes[i] = elements[id(n)]
+        if started:
+            self.push(elements[id(frame)])
+        if self.whole:
+            return
+        if self.top() is content:
+            self.add(self.unmarshaller.process(node, self.resolved))
+            content.children.pop()
+        else:
+            self.expanded = True
+
+    def fallback(self, reason):
+        """
+        Build the rest of the document as elements (so it can be
+        processed as usual) instead of unmarshalling the content nodes
+        directly.
+        @param reason: The reason.
+        @type reason: str
+        """
+        log.debug('reply not unmarshalled directly: %s', reason)
+        self.whole = True
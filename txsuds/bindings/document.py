@@ -21,6 +21,9 @@ Provides classes for the (WS) SOAP I{document/literal}.
 from logging import getLogger
 from txsuds import *
 from txsuds.bindings.binding import Binding
+from txsuds.bindings.template import Template
+from txsuds.bindings.direct import ReplyDocument, ReplyHandler
+from txsuds.sax.parser import Parser
 from txsuds.sax.element import Attribute
 from txsuds.sax.element import Element
 
@@ -83,6 +86,112 @@ class Document(Binding):
             root.append(p)
         return root
 
+    def template(self, method):
+        return Template.compile(self, method)
+
+    def get_reply(self, method, reply, consumer=None):
+        """
+        Process the I{reply} for the specified I{method}.  When the
+        I{directreply} option (or a I{consumer}) is set, the reply content
+        is unmarshalled while it is parsed.  See: L{reply_handler}.
+        Otherwise (or for the rest of a reply that contains a fault or
+        multirefs) see: L{Binding.get_reply}.
+        @param method: The name of the invoked method.
+        @type method: str
+        @param reply: The reply XML received after invoking the specified method
+            or the reply document when it has already been parsed.
+        @type reply: str|L{sax.document.Document}
+        @param consumer: An (optional) callable that is passed each of the
+            items of an unbounded (list) reply.  Not used for a reply
+            document parsed by a L{ReplyHandler}, which has its own.
+        @type consumer: I{function}
+        @return: The reply document and the unmarshalled reply.
+        @rtype: tuple ( L{Element}, L{Object} )
+        """
+        if isinstance(reply, basestring):
+            handler = self.reply_handler(method, consumer)
+            if handler is None:
+                return Binding.get_reply(self, method, reply, consumer)
+            reply = self.replyfilter(reply)
+            Parser().parse(string=reply, handler=handler)
+            return (handler.nodes[0], self.reply_result(method, handler))
+        if isinstance(reply, ReplyDocument):
+            return (reply, self.reply_result(method, reply.handler))
+        return Binding.get_reply(self, method, reply, consumer)
+
+    def reply_result(self, method, handler):
+        """
+        Get the unmarshalled reply of a reply parsed by a L{ReplyHandler}.
+        The content nodes that were not unmarshalled directly (the reply
+        contains a fault or multirefs) are processed as usual and added
+        to the items that were.
+        @param method: The name of the invoked method.
+        @type method: str
+        @param handler: The handler that parsed the reply.
+        @type handler: L{ReplyHandler}
+        @return: The unmarshalled reply.
+        @rtype: L{Object}|[L{Object},...]
+        """
+        if handler.direct():
+            return handler.result()
+        replyroot = handler.nodes[0]
+        if handler.count and not handler.unbounded:
+            soapenv = replyroot.getChild('Envelope')
+            self.detect_fault(soapenv.getChild('Body'))
+            return handler.result()
+        replyroot, result = Binding.get_reply(self, method, replyroot)
+        if not handler.unbounded:
+            return result
+        for item in result:
+            handler.add(item)
+        return handler.result()
+
+    def reply_handler(self, method, consumer=None):
+        """
+        Get the sax handler that unmarshals the reply content of a method
+        with a single returned type while the reply is parsed.  Each
+        content node is unmarshalled while it is parsed and then dropped
+        so the reply document is never built as a whole.
+        @param method: The name of the invoked method.
+        @type method: str
+        @param consumer: An (optional) callable that is passed each of the
+            items of an unbounded (list) reply.  Implies I{directreply}.
+        @type consumer: I{function}
+        @return: The handler, else None when the I{directreply} option is
+            not set or the reply cannot be unmarshalled directly.
+        @rtype: L{ReplyHandler}
+        """
+        options = self.options()
+        if not options.directreply and consumer is None:
+            return None
+        if len(options.plugins):
+            return None
+        rtypes = self.returned_types(method)
+        if len(rtypes) != 1:
+            return None
+        wrapped = method.soap.output.body.wrapped
+        return ReplyHandler(
+            options.envns,
+            wrapped,
+            self.unmarshaller(),
+            rtypes[0],
+            consumer)
+
+    def feeder(self, method, consumer=None):
+        """
+        Get an incremental parser for the reply of a method.  The reply
+        content is unmarshalled as it is received when I{directreply} (or
+        a I{consumer}) is set.  See: L{reply_handler}.
+        @param method: The name of the invoked method.
+        @type method: str
+        @param consumer: An (optional) callable that is passed each of the
+            items of an unbounded (list) reply.
+        @type consumer: I{function}
+        @return: An incremental parser.
+        @rtype: L{txsuds.sax.parser.Feeder}
+        """
+        return Parser().feeder(self.reply_handler(method, consumer))
+
     def replycontent(self, method, body):
         wrapped = method.soap.output.body.wrapped
         if wrapped:
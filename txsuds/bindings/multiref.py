@@ -52,7 +52,8 @@ class MultiRef:
         self.catalog = {}
         self.build_catalog(body)
         self.update(body)
-        body.children = self.nodes
+        body.detachChildren()
+        body.append(self.nodes)
         return body
 
     def update(self, node):
@@ -87,7 +88,7 @@ class MultiRef:
             return
         node.append(ref.children)
         node.setText(ref.getText())
-        for a in ref.attributes:
+        for a in ref.getAttributes():
             if a.name != 'id':
                 node.append(a)
         node.remove(href)
@@ -85,7 +85,7 @@ class Encoded(RPC):
     RPC/Encoded (section 5)  binding style.
     """
 
-    def marshaller(self):
+    def encoder(self):
         return MxEncoded(self.schema())
 
     def unmarshaller(self, typed=True):
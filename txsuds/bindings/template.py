@@ -0,0 +1,116 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+Provides classes for compiled (pre-serialized) soap envelope templates.
+"""
+
+import re
+import datetime as dt
+from logging import getLogger
+from txsuds import *
+from txsuds.sax.text import Text
+
+log = getLogger(__name__)
+
+
+class Template:
+    """
+    A compiled soap envelope for a I{document/literal} method that has
+    only simple (builtin or enumerated) parameters.  The envelope is built
+    (once) by the binding with placeholder values and serialized.  The
+    serialized envelope is then split at the placeholders so that each
+    invocation only needs to escape and splice in the parameter values.
+    @cvar placeholder: The placeholder value format.
+    @type placeholder: unicode
+    @cvar pattern: Matches (and captures the number of) a placeholder.
+    @type pattern: I{re.RegexObject}
+    @cvar simple: The python types that may be spliced in.
+    @type simple: tuple
+    @ivar pdefs: The parameter definitions.
+    @type pdefs: [tuple,...]
+    @ivar parts: The serialized envelope fragments.
+    @type parts: [unicode,...]
+    """
+
+    placeholder = u'\x00%d\x00'
+    pattern = re.compile(u'\x00(\\d+)\x00')
+    simple = (basestring, int, long, float, dt.date, dt.time)
+
+    @classmethod
+    def compile(cls, binding, method):
+        """
+        Compile the envelope template for the specified method.
+        @param binding: The binding used to build the envelope.
+        @type binding: L{bindings.binding.Binding}
+        @param method: The method being invoked.
+        @type method: I{service.Method}
+        @return: The template or None when the method has parameters
+            that are not simple.
+        @rtype: L{Template}
+        """
+        pdefs = binding.param_defs(method)
+        for pd in pdefs:
+            if pd[1].isattr() or pd[1].any():
+                return None
+            resolved = pd[1].resolve()
+            if not ( resolved.builtin() or resolved.enum() ):
+                return None
+        args = [cls.placeholder % n for n in range(len(pdefs))]
+        soapenv = binding.get_message(method, args, {})
+        tokens = cls.pattern.split(soapenv.plain())
+        parts = tokens[0::2]
+        order = [int(n) for n in tokens[1::2]]
+        if order != range(len(pdefs)):
+            log.debug('method (%s) not compiled: %s', method.name, order)
+            return None
+        return Template(pdefs, parts)
+
+    def __init__(self, pdefs, parts):
+        """
+        @param pdefs: The parameter definitions.
+        @type pdefs: [tuple,...]
+        @param parts: The serialized envelope fragments.
+        @type parts: [unicode,...]
+        """
+        self.pdefs = pdefs
+        self.parts = parts
+
+    def render(self, args, kwargs):
+        """
+        Render the envelope for the specified arguments.
+        @param args: A list of args for the method invoked.
+        @type args: list
+        @param kwargs: Named (keyword) args for the method invoked.
+        @type kwargs: dict
+        @return: The serialized envelope or None when an argument value
+            is not simple (eg: None, a list or a suds object).
+        @rtype: unicode
+        """
+        result = [self.parts[0]]
+        n = 0
+        for pd in self.pdefs:
+            if n < len(args):
+                value = args[n]
+            else:
+                value = kwargs.get(pd[0])
+            n += 1
+            if isinstance(value, Text) or \
+                not isinstance(value, self.simple):
+                return None
+            value = pd[1].resolve().translate(value, False)
+            result.append(Text(tostr(value)).escape())
+            result.append(self.parts[n])
+        return u''.join(result)
@@ -20,13 +20,22 @@ The I{builder} module provides an wsdl/xsd defined types factory
 
 from logging import getLogger
 from txsuds import *
-from txsuds.sudsobject import Factory
+from txsuds.sudsobject import Factory, Object
+from copy import copy
 
 log = getLogger(__name__)
 
 
 class Builder:
-    """ Builder used to construct an object for types defined in the schema """
+    """
+    Builder used to construct an object for types defined in the schema.
+    The object built for a type is kept as a I{prototype} and later objects
+    for the type are copied from the prototype.
+    @ivar resolver: A schema object name resolver.
+    @type resolver: L{resolver.Resolver}
+    @ivar prototypes: The prototype objects keyed by schema type.
+    @type prototypes: dict
+    """
 
     def __init__(self, resolver):
         """
@@ -34,6 +43,7 @@ class Builder:
         @type resolver: L{resolver.Resolver}
         """
         self.resolver = resolver
+        self.prototypes = {}
 
     def build(self, name):
         """ build a an object for the specified typename as defined in the schema """
@@ -43,6 +53,32 @@ class Builder:
                 raise TypeNotFound(name)
         else:
             type = name
+        prototype = self.prototypes.get(type)
+        if prototype is None:
+            prototype = self.prototype(type)
+            self.prototypes[type] = prototype
+        return self.clone(prototype)
+
+    def clone(self, data):
+        """
+        Copy a (prototype) object.  The objects and lists are copied but
+        the schema types referenced by the metadata are shared.
+        """
+        if isinstance(data, list):
+            return [self.clone(x) for x in data]
+        if not isinstance(data, Object):
+            return data
+        result = copy(data)
+        md = copy(data.__metadata__)
+        md.__dict__['__keylist__'] = list(md.__keylist__)
+        result.__dict__['__metadata__'] = md
+        result.__dict__['__keylist__'] = list(data.__keylist__)
+        for k in data.__keylist__:
+            result.__dict__[k] = self.clone(data.__dict__[k])
+        return result
+
+    def prototype(self, type):
+        """ build the prototype object for the specified schema type """
         cls = type.name
         if type.mixed():
             data = Factory.property(cls)
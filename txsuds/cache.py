@@ -19,14 +19,22 @@ Contains basic caching classes.
 """
 
 import os
+import json
+import time
+import thread
+import threading
 import txsuds as suds
 from tempfile import gettempdir as tmp
 from txsuds.transport import *
 from txsuds.sax.parser import Parser
 from txsuds.sax.element import Element
+from txsuds.snapshot import Snapshot
 from datetime import datetime as dt
 from datetime import timedelta
+from collections import OrderedDict
+from cStringIO import StringIO
 from logging import getLogger
+from twisted.internet import defer, threads
 try:
     import cPickle as pickle
 except:
@@ -34,12 +42,20 @@ except:
 
 log = getLogger(__name__)
 
+lock = threading.RLock()
+
 
 class Cache:
     """
-    An object object cache.
+    An object object cache.  The I{a}-prefixed methods (L{aget}, L{aput},
+    ...) provide the same operations asynchronously and return deferreds.
+    @cvar threaded: Run the (blocking) operations of the asynchronous
+        methods in the reactor thread pool.
+    @type threaded: bool
     """
 
+    threaded = False
+
     def get(self, id):
         """
         Get a object from the cache by ID.
@@ -88,12 +104,111 @@ class Cache:
         """
         raise Exception('not-implemented')
 
+    def touch(self, id):
+        """
+        Refresh (restart the duration of) an object that has been
+        revalidated.
+        @param id: The object ID.
+        @type id: str
+        """
+        pass
+
+    def getmeta(self, id):
+        """
+        Get the metadata stored with an object.
+        @param id: The object ID.
+        @type id: str
+        @return: The metadata (url, etag, last-modified, size, ...),
+            else None.
+        @rtype: dict
+        """
+        return None
+
+    def putmeta(self, id, meta):
+        """
+        Store metadata with an object already in the cache.
+        @param id: The object ID.
+        @type id: str
+        @param meta: The metadata (url, etag, last-modified, ...).
+        @type meta: dict
+        """
+        pass
+
     def clear(self):
         """
         Clear all objects from the cache.
         """
         raise Exception('not-implemented')
 
+    def aget(self, id):
+        """
+        Get a object from the cache by ID (asynchronously).
+        @param id: The object ID.
+        @type id: str
+        @return: A deferred that fires with the object, else None.
+        @rtype: L{defer.Deferred}
+        """
+        return self.run(self.get, id)
+
+    def aput(self, id, object):
+        """
+        Put a object into the cache (asynchronously).
+        @param id: The object ID.
+        @type id: str
+        @param object: The object to add.
+        @type object: any
+        @return: A deferred that fires when the object has been added.
+        @rtype: L{defer.Deferred}
+        """
+        return self.run(self.put, id, object)
+
+    def atouch(self, id):
+        """
+        Refresh an object that has been revalidated (asynchronously).
+        @param id: The object ID.
+        @type id: str
+        @return: A deferred that fires when the object has been refreshed.
+        @rtype: L{defer.Deferred}
+        """
+        return self.run(self.touch, id)
+
+    def agetmeta(self, id):
+        """
+        Get the metadata stored with an object (asynchronously).
+        @param id: The object ID.
+        @type id: str
+        @return: A deferred that fires with the metadata, else None.
+        @rtype: L{defer.Deferred}
+        """
+        return self.run(self.getmeta, id)
+
+    def aputmeta(self, id, meta):
+        """
+        Store metadata with an object already in the cache (asynchronously).
+        @param id: The object ID.
+        @type id: str
+        @param meta: The metadata (url, etag, last-modified, ...).
+        @type meta: dict
+        @return: A deferred that fires when the metadata has been stored.
+        @rtype: L{defer.Deferred}
+        """
+        return self.run(self.putmeta, id, meta)
+
+    def run(self, fn, *args):
+        """
+        Run a (blocking) cache operation.  The operation is run in the
+        reactor thread pool when the cache is I{threaded}.
+        @param fn: The cache operation (method).
+        @type fn: callable
+        @param args: The operation arguments.
+        @type args: tuple
+        @return: A deferred that fires with the result.
+        @rtype: L{defer.Deferred}
+        """
+        if self.threaded:
+            return threads.deferToThread(fn, *args)
+        return defer.maybeDeferred(fn, *args)
+
 
 class NoCache(Cache):
     """
@@ -115,9 +230,20 @@ class NoCache(Cache):
 
 class FileCache(Cache):
     """
-    A file-based URL cache.
+    A file-based URL cache.  The metadata of an entry is stored (as JSON)
+    in a I{.meta} file next to the entry and includes the I{size} of the
+    entry and the time it was I{created}.  Expired entries that have
+    validators (an I{etag} or I{last-modified} in the metadata) are kept
+    so that they can be revalidated and refreshed using L{touch}.
+    Files are written to a temporary file and renamed so that readers
+    (including other processes) never see a partially written file.  The
+    asynchronous methods do the file I/O (and pickling) in the reactor
+    thread pool.  The cache I{version} of a location is checked (once) on
+    first use.
     @cvar fnprefix: The file name prefix.
     @type fnsuffix: str
+    @cvar checked: The locations with a checked version.
+    @type checked: set
     @ivar duration: The cached file duration which defines how
         long the file will be cached.
     @type duration: (unit, value)
@@ -126,6 +252,8 @@ class FileCache(Cache):
     """
     fnprefix = 'suds'
     units = ('months', 'weeks', 'days', 'hours', 'minutes', 'seconds')
+    threaded = True
+    checked = set()
 
     def __init__(self, location=None, **duration):
         """
@@ -141,7 +269,6 @@ class FileCache(Cache):
         self.location = location
         self.duration = (None, 0)
         self.setduration(**duration)
-        self.checkversion()
 
     def fnsuffix(self):
         """
@@ -186,12 +313,76 @@ class FileCache(Cache):
             log.debug(self.location, exc_info=1)
         return self
 
+    def ready(self):
+        """
+        Make sure the version of the I{location} has been checked.
+        """
+        if self.location in self.checked:
+            return
+        lock.acquire()
+        try:
+            if self.location not in self.checked:
+                self.mktmp()
+                self.checkversion()
+                self.checked.add(self.location)
+        finally:
+            lock.release()
+
+    def write(self, fn, bfr):
+        """
+        Write a cache file atomically.  The content is written to a
+        temporary file (unique to the process and thread) in the same
+        directory which is then renamed.
+        @param fn: The file name.
+        @type fn: str
+        @param bfr: The file content.
+        @type bfr: str
+        """
+        tmpfn = '%s.%d.%d.tmp' % (fn, os.getpid(), thread.get_ident())
+        f = self.open(tmpfn, 'wb')
+        try:
+            try:
+                f.write(bfr)
+            finally:
+                f.close()
+            if os.name == 'nt' and os.path.exists(fn):
+                os.remove(fn)
+            os.rename(tmpfn, fn)
+        except:
+            try:
+                os.remove(tmpfn)
+            except:
+                pass
+            raise
+
     def put(self, id, bfr):
+        return self.putb(id, bfr)
+
+    def dumps(self, object):
+        """
+        Get the content of a cache file for an object.
+        @param object: The object.
+        @type object: any
+        @return: The content, else None when the object is not cached.
+        @rtype: str
+        """
+        return object
+
+    def putb(self, id, bfr):
+        """
+        Write the content of a cache file (see: L{dumps}).
+        @param id: The object ID.
+        @type id: str
+        @param bfr: The content.
+        @type bfr: str
+        @return: The content.
+        @rtype: str
+        """
         try:
+            self.ready()
             fn = self.__fn(id)
-            f = self.open(fn, 'w')
-            f.write(bfr)
-            f.close()
+            self.__purgemeta(fn)
+            self.write(fn, bfr)
             return bfr
         except:
             log.debug(id, exc_info=1)
@@ -199,11 +390,13 @@ class FileCache(Cache):
 
     def putf(self, id, fp):
         try:
+            self.ready()
             fn = self.__fn(id)
-            f = self.open(fn, 'w')
-            f.write(fp.read())
-            fp.close()
-            f.close()
+            self.__purgemeta(fn)
+            try:
+                self.write(fn, fp.read())
+            finally:
+                fp.close()
             return open(fn)
         except:
             log.debug(id, exc_info=1)
@@ -220,26 +413,73 @@ class FileCache(Cache):
 
     def getf(self, id):
         try:
+            self.ready()
             fn = self.__fn(id)
-            self.validate(fn)
+            if not self.validate(fn):
+                return None
             return self.open(fn)
         except:
             pass
 
+    def touch(self, id):
+        try:
+            self.ready()
+            fn = self.__fn(id)
+            os.utime(fn, None)
+        except:
+            log.debug(id, exc_info=1)
+
+    def getmeta(self, id):
+        try:
+            self.ready()
+            fn = self.__fn(id)
+            if not os.path.exists(fn):
+                return None
+            f = self.open(self.__metafn(fn))
+            try:
+                return json.load(f)
+            finally:
+                f.close()
+        except:
+            return None
+
+    def putmeta(self, id, meta):
+        try:
+            self.ready()
+            fn = self.__fn(id)
+            if not os.path.exists(fn):
+                return
+            meta = dict(meta)
+            meta['size'] = os.path.getsize(fn)
+            meta['created'] = time.time()
+            self.write(self.__metafn(fn), json.dumps(meta))
+        except:
+            log.debug(id, exc_info=1)
+
     def validate(self, fn):
         """
-        Validate that the file has not expired based on the I{duration}.
+        Validate that the file has not expired based on the I{duration}
+        (since the file was written or refreshed).  Expired files are deleted
+        unless they can be revalidated.
         @param fn: The file name.
         @type fn: str
+        @return: True when the file has not expired.
+        @rtype: bool
         """
         if self.duration[1] < 1:
-            return
-        created = dt.fromtimestamp(os.path.getctime(fn))
+            return True
+        modified = dt.fromtimestamp(os.path.getmtime(fn))
         d = { self.duration[0]:self.duration[1] }
-        expired = created+timedelta(**d)
-        if expired < dt.now():
-            log.debug('%s expired, deleted', fn)
-            os.remove(fn)
+        expired = modified+timedelta(**d)
+        if expired >= dt.now():
+            return True
+        if self.__validators(fn):
+            log.debug('%s expired, kept for revalidation', fn)
+            return False
+        log.debug('%s expired, deleted', fn)
+        os.remove(fn)
+        self.__purgemeta(fn)
+        return False
 
     def clear(self):
         for fn in os.listdir(self.location):
@@ -256,6 +496,7 @@ class FileCache(Cache):
             os.remove(fn)
         except:
             pass
+        self.__purgemeta(fn)
 
     def open(self, fn, *args):
         """
@@ -275,9 +516,7 @@ class FileCache(Cache):
                 raise Exception()
         except:
             self.clear()
-            f = self.open(path, 'w')
-            f.write(suds.__version__)
-            f.close()
+            self.write(path, suds.__version__)
 
     def __fn(self, id):
         name = id
@@ -285,6 +524,26 @@ class FileCache(Cache):
         fn = '%s-%s.%s' % (self.fnprefix, name, suffix)
         return os.path.join(self.location, fn)
 
+    def __metafn(self, fn):
+        return '%s.meta' % fn
+
+    def __validators(self, fn):
+        try:
+            f = self.open(self.__metafn(fn))
+            try:
+                meta = json.load(f)
+            finally:
+                f.close()
+            return ( meta.get('etag') or meta.get('last-modified') )
+        except:
+            return None
+
+    def __purgemeta(self, fn):
+        try:
+            os.remove(self.__metafn(fn))
+        except:
+            pass
+
 
 class DocumentCache(FileCache):
     """
@@ -305,10 +564,15 @@ class DocumentCache(FileCache):
             FileCache.purge(self, id)
 
     def put(self, id, object):
-        if isinstance(object, Element):
-            FileCache.put(self, id, str(object))
+        bfr = self.dumps(object)
+        if bfr is not None:
+            self.putb(id, bfr)
         return object
 
+    def dumps(self, object):
+        if isinstance(object, Element):
+            return str(object)
+
 
 class ObjectCache(FileCache):
     """
@@ -332,6 +596,454 @@ class ObjectCache(FileCache):
             FileCache.purge(self, id)
 
     def put(self, id, object):
-        bfr = pickle.dumps(object, self.protocol)
-        FileCache.put(self, id, bfr)
+        self.putb(id, self.dumps(object))
+        return object
+
+    def dumps(self, object):
+        return pickle.dumps(object, self.protocol)
+
+
+class SnapshotCache(FileCache):
+    """
+    Provides object caching using compact L{Snapshot}s.  A snapshot of
+    (built) definitions loads much faster than a pickle because the XML
+    trees of the WSDL and schemas are stored as flat node tables and are
+    only materialized when needed.
+    @note: Loading is about 4 times faster than a pickle but still takes
+        about 100ms for a WSDL with 400 operations (see the I{snapshot}
+        benchmark) because of the (densely linked) schema object graph.
+    """
+
+    def fnsuffix(self):
+        return 'snap'
+
+    def get(self, id):
+        try:
+            fp = FileCache.getf(self, id)
+            if fp is None:
+                return None
+            try:
+                return Snapshot().loads(fp.read())
+            finally:
+                fp.close()
+        except:
+            FileCache.purge(self, id)
+
+    def put(self, id, object):
+        self.putb(id, self.dumps(object))
         return object
+
+    def dumps(self, object):
+        return Snapshot().dumps(object)
+
+
+class LRUCache(Cache):
+    """
+    A bounded, memory resident cache that evicts the least recently used
+    objects.  Objects are stored pickled so that the size of the cache is
+    known and every get() returns a private copy (the readers modify the
+    definitions they get).  It may be used for both caching policies.
+    Like the L{FileCache}, expired objects that have validators (an
+    I{etag} or I{last-modified} in the metadata) are kept so that they
+    can be revalidated and refreshed using L{touch}.
+    @cvar protocol: The pickling protocol.
+    @type protocol: int
+    @ivar maxentries: The maximum number of cached objects (0=unlimited).
+    @type maxentries: int
+    @ivar maxbytes: The maximum (pickled) size of the cached objects
+        in bytes (0=unlimited).
+    @type maxbytes: int
+    @ivar ttl: The time (seconds) an object is cached (0=forever).
+    @type ttl: float
+    @ivar entries: The cached (bfr, expires, meta) by object id in least
+        recently used order.
+    @type entries: I{OrderedDict}
+    @ivar size: The size (bytes) of the cached objects.
+    @type size: int
+    @ivar hits: The number of cache hits.
+    @type hits: int
+    @ivar misses: The number of cache misses (including expired objects).
+    @type misses: int
+    @ivar evictions: The number of objects evicted to make room.
+    @type evictions: int
+    """
+    protocol = 2
+    units = ('weeks', 'days', 'hours', 'minutes', 'seconds')
+
+    def __init__(self, maxentries=1000, maxbytes=64*1024*1024, **duration):
+        """
+        @param maxentries: The maximum number of cached objects (0=unlimited).
+        @type maxentries: int
+        @param maxbytes: The maximum (pickled) size of the cached objects
+            in bytes (0=unlimited).
+        @type maxbytes: int
+        @param duration: The duration which defines how long an object
+            will be cached.  A duration=0 (or none) means forever.
+            The duration may be: (weeks|days|hours|minutes|seconds).
+        @type duration: {unit:value}
+        """
+        for unit in duration:
+            if not unit in self.units:
+                raise Exception('must be: %s' % str(self.units))
+        self.maxentries = maxentries
+        self.maxbytes = maxbytes
+        self.ttl = timedelta(**duration).total_seconds()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, id):
+        bfr = self.getb(id)
+        if bfr is None:
+            return None
+        return pickle.loads(bfr)
+
+    def getf(self, id):
+        bfr = self.getb(id)
+        if bfr is None:
+            return None
+        return StringIO(bfr)
+
+    def put(self, id, object):
+        self.putb(id, self.dumps(object))
+        return object
+
+    def dumps(self, object):
+        """
+        Get the (pickled) content for an object.
+        @param object: The object.
+        @type object: any
+        @return: The content.
+        @rtype: str
+        """
+        return pickle.dumps(object, self.protocol)
+
+    def putf(self, id, fp):
+        try:
+            bfr = fp.read()
+        finally:
+            fp.close()
+        self.putb(id, bfr)
+        return StringIO(bfr)
+
+    def getb(self, id):
+        """
+        Get the (pickled) content of an object and mark it as the most
+        recently used.
+        @param id: The object ID.
+        @type id: str
+        @return: The content, else None.
+        @rtype: str
+        """
+        entry = self.entries.pop(id, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries[id] = entry
+        bfr, expires, meta = entry
+        if expires and expires < time.time():
+            self.misses += 1
+            if not ( meta.get('etag') or meta.get('last-modified') ):
+                self.purge(id)
+            return None
+        self.hits += 1
+        return bfr
+
+    def putb(self, id, bfr):
+        """
+        Put the (pickled) content of an object into the cache and evict
+        the least recently used objects as needed.  Objects larger than
+        I{maxbytes} are not cached.
+        @param id: The object ID.
+        @type id: str
+        @param bfr: The content.
+        @type bfr: str
+        """
+        self.purge(id)
+        if self.maxbytes and len(bfr) > self.maxbytes:
+            log.debug('(%s) %d bytes, not cached', id, len(bfr))
+            return
+        self.entries[id] = (bfr, self.expires(), {})
+        self.size += len(bfr)
+        while len(self.entries) > 1 and \
+            ( (self.maxentries and len(self.entries) > self.maxentries) or
+              (self.maxbytes and self.size > self.maxbytes) ):
+            evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted[1][0])
+            self.evictions += 1
+            log.debug('(%s) evicted', evicted[0])
+
+    def expires(self):
+        """
+        Get the expiration time for an object cached (or refreshed) now.
+        @return: The expiration time, else 0 (never).
+        @rtype: float
+        """
+        if self.ttl > 0:
+            return time.time()+self.ttl
+        return 0
+
+    def touch(self, id):
+        entry = self.entries.get(id)
+        if entry is not None:
+            self.entries[id] = (entry[0], self.expires(), entry[2])
+
+    def getmeta(self, id):
+        entry = self.entries.get(id)
+        if entry is not None:
+            return dict(entry[2])
+
+    def putmeta(self, id, meta):
+        entry = self.entries.get(id)
+        if entry is None:
+            return
+        meta = dict(meta)
+        meta['size'] = len(entry[0])
+        meta['created'] = time.time()
+        self.entries[id] = (entry[0], entry[1], meta)
+
+    def purge(self, id):
+        entry = self.entries.pop(id, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def __deepcopy__(self, memo):
+        # the cache is shared by cloned (options) clients.
+        return self
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return 'LRU cache: %d objects, %d bytes, hits=%d misses=%d evictions=%d' % \
+            (len(self.entries), self.size, self.hits, self.misses, self.evictions)
+
+
+class TieredCache(Cache):
+    """
+    A two tier cache with a (fast) memory cache in front of a (persistent)
+    disk cache.  Memory hits return immediately and disk hits are promoted
+    to memory.  The asynchronous writes (L{aput}, ...) update the memory
+    cache and return immediately while the disk cache is updated in the
+    background (write-behind).  The background writes of an object are
+    done in order.  The objects are serialized (pickled) in the calling
+    thread and only the content is written in the background, the
+    (live) objects are never used by the background writes.  The disk
+    hits are read (and pickled for the memory cache) by a single disk
+    cache operation, in the thread pool when I{threaded}.
+    @ivar memory: The memory cache.
+    @type memory: L{LRUCache}
+    @ivar disk: The disk cache.
+    @type disk: L{FileCache}
+    @ivar pending: The last background write by object id.
+    @type pending: {str: L{defer.Deferred}}
+    """
+
+    def __init__(self, memory=None, disk=None):
+        """
+        @param memory: The memory cache.
+        @type memory: L{LRUCache}
+        @param disk: The disk cache (must cache both documents and
+            definitions when used for both).
+        @type disk: L{FileCache}
+        """
+        if memory is None:
+            memory = LRUCache()
+        if disk is None:
+            disk = ObjectCache()
+        self.memory = memory
+        self.disk = disk
+        self.pending = {}
+
+    def get(self, id):
+        object = self.memory.get(id)
+        if object is None:
+            loaded = self.load(id)
+            if loaded is not None:
+                object, bfr = loaded
+                self.promote(id, bfr, self.disk.getmeta(id))
+        return object
+
+    def getf(self, id):
+        return self.disk.getf(id)
+
+    def put(self, id, object):
+        bfr = self.dumps(id, object)
+        if bfr is not None:
+            self.disk.putb(id, bfr)
+        return object
+
+    def putf(self, id, fp):
+        return self.disk.putf(id, fp)
+
+    def purge(self, id):
+        self.memory.purge(id)
+        self.disk.purge(id)
+
+    def touch(self, id):
+        self.memory.touch(id)
+        self.disk.touch(id)
+
+    def getmeta(self, id):
+        meta = self.memory.getmeta(id)
+        if meta is None:
+            meta = self.disk.getmeta(id)
+        return meta
+
+    def putmeta(self, id, meta):
+        self.memory.putmeta(id, meta)
+        self.disk.putmeta(id, meta)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    @defer.inlineCallbacks
+    def aget(self, id):
+        object = self.memory.get(id)
+        if object is None:
+            loaded = yield self.disk.run(self.load, id)
+            if loaded is not None:
+                object, bfr = loaded
+                meta = yield self.disk.agetmeta(id)
+                self.promote(id, bfr, meta)
+        defer.returnValue(object)
+
+    def aput(self, id, object):
+        bfr = self.dumps(id, object)
+        if bfr is not None:
+            self.behind(id, self.disk.putb, id, bfr)
+        return defer.succeed(object)
+
+    def atouch(self, id):
+        self.memory.touch(id)
+        self.behind(id, self.disk.touch, id)
+        return defer.succeed(None)
+
+    def agetmeta(self, id):
+        meta = self.memory.getmeta(id)
+        if meta is None:
+            return self.disk.agetmeta(id)
+        return defer.succeed(meta)
+
+    def aputmeta(self, id, meta):
+        self.memory.putmeta(id, meta)
+        self.behind(id, self.disk.putmeta, id, dict(meta))
+        return defer.succeed(None)
+
+    def dumps(self, id, object):
+        """
+        Put an object into the memory cache and get the content of the
+        disk cache file for it.  The pickle of the memory cache is used
+        when the disk cache stores the same pickles.
+        @param id: The object ID.
+        @type id: str
+        @param object: The object.
+        @type object: any
+        @return: The disk cache content, else None when not cached.
+        @rtype: str
+        """
+        bfr = self.memory.dumps(object)
+        self.memory.putb(id, bfr)
+        if self.samepickles():
+            return bfr
+        return self.disk.dumps(object)
+
+    def load(self, id):
+        """
+        Get an object from the disk cache and the content of the memory
+        cache for it.  The content read from disk is used when the disk
+        cache stores the same pickles.  This is a (blocking) disk cache
+        operation, see: L{Cache.run}.
+        @param id: The object ID.
+        @type id: str
+        @return: The object and the memory cache content, else None.
+        @rtype: (any, str)
+        """
+        if not self.samepickles():
+            object = self.disk.get(id)
+            if object is None:
+                return None
+            return (object, self.memory.dumps(object))
+        bfr = FileCache.get(self.disk, id)
+        if bfr is None:
+            return None
+        try:
+            return (pickle.loads(bfr), bfr)
+        except:
+            self.disk.purge(id)
+
+    def samepickles(self):
+        """
+        Get whether the disk cache stores the same pickles as the
+        memory cache.
+        @return: True when the pickles are the same.
+        @rtype: bool
+        """
+        return isinstance(self.disk, ObjectCache) and \
+            self.disk.protocol == self.memory.protocol
+
+    def promote(self, id, bfr, meta):
+        """
+        Promote an object (found on disk) to the memory cache.
+        @param id: The object ID.
+        @type id: str
+        @param bfr: The memory cache content (see: L{load}).
+        @type bfr: str
+        @param meta: The object metadata.
+        @type meta: dict
+        """
+        self.memory.putb(id, bfr)
+        if meta:
+            self.memory.putmeta(id, meta)
+
+    def behind(self, id, fn, *args):
+        """
+        Update the disk cache in the background.  The update is done after
+        the pending updates of the same object.
+        @param id: The object ID.
+        @type id: str
+        @param fn: The disk cache operation (method).
+        @type fn: callable
+        @param args: The operation arguments.
+        @type args: tuple
+        """
+        d = self.__write(id, self.pending.get(id), fn, args)
+        self.pending[id] = d
+        d.addCallback(self.__written, id, d)
+
+    def flush(self):
+        """
+        Wait for the pending background (disk) updates.
+        @return: A deferred that fires when the updates are done.
+        @rtype: L{defer.Deferred}
+        """
+        return defer.DeferredList(self.pending.values())
+
+    @defer.inlineCallbacks
+    def __write(self, id, previous, fn, args):
+        if previous is not None:
+            yield previous
+        try:
+            yield self.disk.run(fn, *args)
+        except Exception:
+            log.debug(id, exc_info=1)
+
+    def __written(self, result, id, d):
+        if self.pending.get(id) is d:
+            del self.pending[id]
+        return result
+
+    def __deepcopy__(self, memo):
+        # the cache is shared by cloned (options) clients.
+        return self
+
+    def __str__(self):
+        return 'tiered cache: %s, %d pending writes' % \
+            (self.memory, len(self.pending))
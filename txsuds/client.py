@@ -32,7 +32,11 @@ from txsuds.resolver import PathResolver
 from txsuds.builder import Builder
 from txsuds.wsdl import Definitions
 from txsuds.cache import ObjectCache
+from txsuds.scheduler import Scheduler
+from txsuds.registry import Registry
 from txsuds.sax.parser import Parser
+from txsuds.sax.document import Document
+from txsuds.sax.writer import Writer
 from txsuds.options import Options
 from txsuds.properties import Unskin
 from copy import deepcopy
@@ -42,6 +46,7 @@ from logging import getLogger
 log = getLogger(__name__)
 
 from twisted.internet import defer
+from twisted.python.failure import Failure
 
 
 class Client(object):
@@ -58,7 +63,14 @@ class Client(object):
     @type sd: L{ServiceDefinition}
     @ivar messages: The last sent/received messages.
     @type messages: str[2]
+    @ivar scheduler: Schedules the requests sent by the client (and its clones).
+    @type scheduler: L{Scheduler}
+    @cvar registry: The (process wide) registry of shared WSDLs.
+    @type registry: L{Registry}
     """
+
+    registry = Registry()
+
     @classmethod
     def items(cls, sobject):
         """
@@ -106,10 +118,12 @@ class Client(object):
         options.transport = TwistedTransport()
         self.options      = options
         options.cache     = ObjectCache(days = 1)
+        self.wsdl         = None
         self.factory      = None
         self.service      = None
         self.sd           = []
         self.messages     = dict(tx = None, rx = None)
+        self.scheduler    = Scheduler(options)
 
         self.set_options(**kwargs)
 
@@ -121,8 +135,12 @@ class Client(object):
         self.sd       = []
         self.messages = dict(tx = None, rx = None)
 
-        reader = DefinitionsReader(self.options, Definitions)
-        self.wsdl = yield reader.open(self.url)
+        self.close()
+        if self.options.sharedwsdl:
+            self.wsdl = yield self.registry.open(self.url, self.options)
+        else:
+            reader = DefinitionsReader(self.options, Definitions)
+            self.wsdl = yield reader.open(self.url)
         plugins = PluginContainer(self.options.plugins)
         plugins.init.initialized(wsdl=self.wsdl)
         self.factory = Factory(self.wsdl)
@@ -131,6 +149,15 @@ class Client(object):
             sd = ServiceDefinition(self.wsdl, s)
             self.sd.append(sd)
 
+    def close(self):
+        """
+        Release the WSDL.  A shared WSDL (see the I{sharedwsdl} option) is
+        dropped from the registry once it is no longer used by any client.
+        """
+        if self.wsdl is not None:
+            self.registry.release(self.wsdl)
+            self.wsdl = None
+
     def set_options(self, **kwargs):
         """
         Set options.
@@ -161,11 +188,16 @@ class Client(object):
 
     def last_sent(self):
         """
-        Get last sent I{soap} message.
+        Get last sent I{soap} message.  A message rendered from a compiled
+        template (see the I{templates} option) is parsed when requested.
         @return: The last sent I{soap} message.
         @rtype: L{Document}
         """
-        return self.messages.get('tx')
+        d = self.messages.get('tx')
+        if isinstance(d, basestring):
+            d = Parser().parse(string=d.encode('utf-8'))
+            self.messages['tx'] = d
+        return d
 
     def last_received(self):
         """
@@ -178,8 +210,9 @@ class Client(object):
     def clone(self):
         """
         Get a shallow clone of this object.
-        The clone only shares the WSDL.  All other attributes are
-        unique to the cloned object including options.
+        The clone only shares the WSDL, the request scheduler and the
+        transport's connection pool.  All other attributes are unique to
+        the cloned object including options.
         @return: A shallow clone.
         @rtype: L{Client}
         """
@@ -192,10 +225,12 @@ class Client(object):
         mp = Unskin(self.options)
         cp.update(deepcopy(mp))
         clone.wsdl = self.wsdl
+        self.registry.retain(self.wsdl)
         clone.factory = self.factory
         clone.service = ServiceSelector(clone, self.wsdl.services)
         clone.sd = self.sd
         clone.messages = dict(tx=None, rx=None)
+        clone.scheduler = self.scheduler
         return clone
 
     def __str__(self):
@@ -264,7 +299,7 @@ class Factory:
         @param ps: The new path separator.
         @type ps: char
         """
-        self.resolver = PathResolver(self.wsdl, ps)
+        self.resolver = PathResolver(self.wsdl, ps, self.resolver.cache)
 
 
 class ServiceSelector:
@@ -519,6 +554,40 @@ class MethodSelector:
             raise MethodNotFound, qn
         return Method(self.__client, m)
 
+    def batch(self, calls, limit=10):
+        """
+        Invoke a batch of methods.  The soap envelopes for all of the calls
+        are built first and then sent with at most I{limit} calls in progress
+        at once.  A method named I{batch} is still available as
+        I{service['batch']}.
+        @param calls: The calls as (I{name}, I{args}) or
+            (I{name}, I{args}, I{kwargs}) tuples.
+        @type calls: [tuple,...]
+        @param limit: The maximum number of calls in progress at once.
+        @type limit: int
+        @return: A deferred list that fires with a (I{success}, I{result})
+            tuple for each call, in the order the calls were given.  The
+            I{result} of a call that failed is the L{Failure}.
+        @rtype: L{defer.DeferredList}
+        """
+        prepared = []
+        for call in calls:
+            name = call[0]
+            args = (len(call) > 1 and call[1]) or ()
+            kwargs = (len(call) > 2 and call[2]) or {}
+            try:
+                prepared.append(self[name].prepare(args, kwargs))
+            except Exception:
+                prepared.append(Failure())
+        semaphore = defer.DeferredSemaphore(limit)
+        deferreds = []
+        for p in prepared:
+            if isinstance(p, Failure):
+                deferreds.append(defer.fail(p))
+            else:
+                deferreds.append(semaphore.run(p))
+        return defer.DeferredList(deferreds, consumeErrors=True)
+
 
 class Method:
     """
@@ -543,10 +612,15 @@ class Method:
     #       the client's invoke method.
     def __call__(self, *args, **kwargs):
         """
-        Invoke the method.
+        Invoke the method.  A callable passed as the I{__consumer} keyword
+        is passed each of the items of an unbounded (list) reply as soon
+        as it is unmarshalled (with I{streaming}, as the reply is received)
+        instead of the items being returned in a list.  The result is then
+        the number of items.
+        @raise TypeError: When the I{__consumer} is not callable.
         """
         clientclass = self.clientclass(kwargs)
-        client = clientclass(self.client, self.method)
+        client = clientclass(self.client, self.method, self.consumer(kwargs))
         if not self.faults():
             try:
                 return client.invoke(args, kwargs)
@@ -555,6 +629,22 @@ class Method:
         else:
             return client.invoke(args, kwargs)
 
+    def prepare(self, args, kwargs):
+        """
+        Prepare (but do not send) an invocation of the method.
+        @param args: A list of args for the method invoked.
+        @type args: list
+        @param kwargs: Named (keyword) args for the method invoked.
+        @type kwargs: dict
+        @return: A function that sends the invocation and returns
+            a deferred.
+        @rtype: callable
+        @raise TypeError: When the I{__consumer} is not callable.
+        """
+        clientclass = self.clientclass(kwargs)
+        client = clientclass(self.client, self.method, self.consumer(kwargs))
+        return client.prepare(args, kwargs)
+
     def faults(self):
         """ get faults option """
         return self.client.options.faults
@@ -566,6 +656,13 @@ class Method:
         else:
             return SoapClient
 
+    def consumer(self, kwargs):
+        """ get the (optional) reply item consumer """
+        consumer = kwargs.get(SoapClient.consumerkey)
+        if consumer is not None and not callable(consumer):
+            raise TypeError('%s must be callable' % SoapClient.consumerkey)
+        return consumer
+
 
 class SoapClient:
     """
@@ -578,19 +675,28 @@ class SoapClient:
     @type options: dict
     @ivar cookiejar: A cookie jar.
     @type cookiejar: libcookie.CookieJar
+    @ivar consumer: An (optional) callable that is passed each of the
+        items of an unbounded (list) reply.
+    @type consumer: I{function}
     """
 
-    def __init__(self, client, method):
+    consumerkey = '__consumer'
+
+    def __init__(self, client, method, consumer=None):
         """
         @param client: A suds client.
         @type client: L{Client}
         @param method: A target method.
         @type method: L{Method}
+        @param consumer: An (optional) callable that is passed each of the
+            items of an unbounded (list) reply.
+        @type consumer: I{function}
         """
         self.client = client
         self.method = method
         self.options = client.options
         self.cookiejar = CookieJar()
+        self.consumer = consumer
 
     @defer.inlineCallbacks
     def invoke(self, args, kwargs):
@@ -606,8 +712,7 @@ class SoapClient:
         timer = metrics.Timer()
         timer.start()
         result = None
-        binding = self.method.binding.input
-        soapenv = binding.get_message(self.method, args, kwargs)
+        soapenv = self.message(args, kwargs)
         timer.stop()
         metrics.log.debug(
                 "message for '%s' created: %s",
@@ -622,12 +727,46 @@ class SoapClient:
                 timer)
         defer.returnValue(result)
 
+    def prepare(self, args, kwargs):
+        """
+        Build the soap message used to invoke the specified method.
+        @param args: A list of args for the method invoked.
+        @type args: list
+        @param kwargs: Named (keyword) args for the method invoked.
+        @type kwargs: dict
+        @return: A function that sends the message and returns a deferred.
+        @rtype: callable
+        """
+        soapenv = self.message(args, kwargs)
+        return (lambda: self.send(soapenv))
+
+    def message(self, args, kwargs):
+        """
+        Build the soap message used to invoke the specified method.  When
+        the I{templates} option is set, the message is rendered from the
+        compiled envelope template (when possible).
+        @param args: A list of args for the method invoked.
+        @type args: list
+        @param kwargs: Named (keyword) args for the method invoked.
+        @type kwargs: dict
+        @return: The soap envelope or the (rendered) envelope text.
+        @rtype: L{Document}|unicode
+        """
+        binding = self.method.binding.input
+        if self.options.templates and not self.options.prettyxml:
+            plugins = PluginContainer(self.options.plugins)
+            if not len(plugins.message.plugins):
+                soapenv = binding.get_compiled_message(self.method, args, kwargs)
+                if soapenv is not None:
+                    return soapenv
+        return binding.get_message(self.method, args, kwargs)
+
     @defer.inlineCallbacks
     def send(self, soapenv):
         """
         Send soap message.
-        @param soapenv: A soap envelope to send.
-        @type soapenv: L{Document}
+        @param soapenv: A soap envelope (or the envelope text) to send.
+        @type soapenv: L{Document}|unicode
         @return: The reply to the sent message.
         @rtype: I{builtin} or I{subclass of} L{Object}
         """
@@ -643,12 +782,11 @@ class SoapClient:
         try:
             self.last_sent(soapenv)
             plugins = PluginContainer(self.options.plugins)
-            plugins.message.marshalled(envelope=soapenv.root())
-            if prettyxml:
-                soapenv = soapenv.str()
+            if isinstance(soapenv, Document):
+                plugins.message.marshalled(envelope=soapenv.root())
+                soapenv = Writer(prettyxml).encode(soapenv)
             else:
-                soapenv = soapenv.plain()
-            soapenv = soapenv.encode('utf-8')
+                soapenv = soapenv.encode('utf-8')
             ctx = plugins.message.sending(envelope=soapenv)
             soapenv = ctx.envelope
             if nosend:
@@ -656,18 +794,27 @@ class SoapClient:
 
             request = Request(location, soapenv)
             request.headers = self.headers()
+            if self.options.streaming and not retxml and \
+                    not len(plugins.message.plugins) and \
+                    not binding.filtered():
+                request.feeder = binding.feeder(self.method, self.consumer)
             #timer.start()
             #reply = transport.send(request)
             #timer.stop()
             #metrics.log.debug('waited %s on server reply', timer)
 
-            reply = yield transport.send(request)
+            scheduler = self.client.scheduler
+            reply = yield scheduler.schedule(self.options, location,
+                                             transport.send, request)
 
-            ctx = plugins.message.received(reply = reply.message)
-            if retxml:
-                result = ctx.reply
+            if reply.document is not None:
+                result = self.succeeded(binding, reply.document)
             else:
-                result = self.succeeded(binding, ctx.reply)
+                ctx = plugins.message.received(reply = reply.message)
+                if retxml:
+                    result = ctx.reply
+                else:
+                    result = self.succeeded(binding, ctx.reply)
         except TransportError, e:
             if e.httpcode in (202,204):
                 result = None
@@ -695,8 +842,8 @@ class SoapClient:
         Request succeeded, process the reply
         @param binding: The binding to be used to process the reply.
         @type binding: L{bindings.binding.Binding}
-        @param reply: The raw reply text.
-        @type reply: str
+        @param reply: The raw reply text or the (already) parsed reply.
+        @type reply: str|L{Document}
         @return: The method result.
         @rtype: I{builtin}, L{Object}
         @raise WebFault: On server.
@@ -704,7 +851,8 @@ class SoapClient:
         log.debug('http succeeded:\n%s', reply)
         plugins = PluginContainer(self.options.plugins)
         if len(reply) > 0:
-            reply, result = binding.get_reply(self.method, reply)
+            reply, result = binding.get_reply(
+                self.method, reply, self.consumer)
             self.last_received(reply)
         else:
             result = None
@@ -771,6 +919,18 @@ class SimClient(SoapClient):
         """ get whether loopback has been specified in the I{kwargs}. """
         return kwargs.has_key(SimClient.injkey)
 
+    def prepare(self, args, kwargs):
+        """
+        Prepare the simulated invocation of the specified method.
+        @param args: A list of args for the method invoked.
+        @type args: list
+        @param kwargs: Named (keyword) args for the method invoked.
+        @type kwargs: dict
+        @return: A function that runs the simulation and returns a deferred.
+        @rtype: callable
+        """
+        return (lambda: defer.maybeDeferred(self.invoke, args, kwargs))
+
     def invoke(self, args, kwargs):
         """
         Send the required soap message to invoke the specified method
@@ -104,6 +104,75 @@ class Options(Skin):
             instead of sending it.
                 - type: I{bool}
                 - default: False
+        - B{streaming} - Flag that causes the reply to be parsed as it is
+            received (by transports that support it) instead of once the
+            whole reply has been read.  The raw reply text is not kept.
+            Ignored when I{retxml} is set, when message plugins are
+            specified or when a binding reply filter is set, since those
+            need the reply text.
+                - type: I{bool}
+                - default: False
+        - B{maxConcurrent} - The maximum number of requests sent at once
+            by the client (and its clones).  Clones share the limit of the
+            original client.  (0=unlimited).
+                - type: I{int}
+                - default: 0
+        - B{maxPerEndpoint} - The maximum number of requests sent at once
+            to the same endpoint (scheme and host) by the client (and its
+            clones).  Clones share the limit of the original client.
+            (0=unlimited).
+                - type: I{int}
+                - default: 0
+        - B{priority} - The priority of requests waiting to be sent
+            (lowest first).
+                - type: I{int}
+                - default: 0
+        - B{templates} - Flag that causes the soap envelope of
+            I{document/literal} methods with simple parameters to be
+            rendered using a compiled (pre-serialized) template.
+            Ignored when I{prettyxml} is set or message plugins are used.
+            The last sent message is parsed from the rendered envelope
+            when it is requested.
+                - type: I{bool}
+                - default: False
+        - B{maxImports} - The maximum number of imported (and included)
+            WSDL and XSD documents downloaded at once while loading the
+            WSDL.  (0=unlimited).
+                - type: I{int}
+                - default: 10
+        - B{sharedwsdl} - Flag that causes the WSDL to be shared with the
+            other clients (in the process) that open the same URL with the
+            same options.  The WSDL is built once and concurrent connects
+            wait for the same build.  As with cloned clients, the bindings
+            of a shared WSDL use the options of the client that built it.
+            Shared WSDLs are released using L{client.Client.close}.
+                - type: I{bool}
+                - default: False
+        - B{lazyschema} - Flag that defers the dereferencing of the schema
+            types and elements until they are first used.  Each top level
+            type or element (and its contents) is dereferenced when first
+            found by a query or resolved.
+                - type: I{bool}
+                - default: False
+        - B{operations} - The names of the (service) operations that are
+            used.  When specified, the other operations are pruned from the
+            port types and bindings (so no methods are created for them)
+            along with the messages and the schema types and elements that
+            the remaining operations cannot reach.  The schemas, imported
+            and included ones too, are pruned before they are dereferenced.
+                - type: I{list}
+                - default: []
+        - B{directreply} - Flag that causes the (document/literal) replies
+            of methods with a single returned type to be unmarshalled while
+            they are parsed, so that the reply document is never built as a
+            whole.  With I{streaming}, the reply content is unmarshalled as
+            it is received.  Replies that contain a fault or multirefs are
+            processed as usual.  Not used when plugins are specified.  The
+            last received message is the reply document without the
+            (unmarshalled) content.  Implied for a call given an item
+            consumer (the I{__consumer} keyword).
+                - type: I{bool}
+                - default: False
     """
     def __init__(self, **kwargs):
         domain = __name__
@@ -128,5 +197,15 @@ class Options(Skin):
             Definition('cachingpolicy', int, 0),
             Definition('plugins', (list, tuple), []),
             Definition('nosend', bool, False),
+            Definition('streaming', bool, False),
+            Definition('maxConcurrent', int, 0),
+            Definition('maxPerEndpoint', int, 0),
+            Definition('priority', int, 0),
+            Definition('templates', bool, False),
+            Definition('maxImports', int, 10),
+            Definition('sharedwsdl', bool, False),
+            Definition('lazyschema', bool, False),
+            Definition('operations', (list, tuple), []),
+            Definition('directreply', bool, False),
         ]
         Skin.__init__(self, domain, definitions, kwargs)
@@ -19,8 +19,9 @@ Contains xml document reader classes.
 """
 
 
+from hashlib import sha1
 from txsuds.sax.parser import Parser
-from txsuds.transport import Request
+from txsuds.transport import Request, TransportError
 from txsuds.cache import NoCache
 from txsuds.store import DocumentStore
 from txsuds.plugin import PluginContainer
@@ -35,10 +36,15 @@ log = getLogger(__name__)
 class Reader:
     """
     The reader provides integration with cache.
+    @cvar keyed: The names of the options that (in addition to the URL)
+        are part of the cache key.
+    @type keyed: (str,...)
     @ivar options: An options object.
     @type options: I{Options}
     """
 
+    keyed = ()
+
     def __init__(self, options):
         """
         @param options: An options object.
@@ -49,11 +55,54 @@ class Reader:
 
     def mangle(self, name, x):
         """
-        Mangle the name by hashing the I{name} and appending I{x}.
+        Mangle the name by hashing (SHA-1) the I{name} and the I{keyed}
+        options and appending I{x}.  Unlike hash(), the result is the same
+        in every process so the cache may be shared.
         @return: the mangled name.
         """
-        h = abs(hash(name))
-        return '%s-%s' % (h, x)
+        h = sha1()
+        h.update(self.keyvalue(name))
+        for k in self.keyed:
+            v = getattr(self.options, k)
+            h.update('\n%s=%s' % (k, self.keyvalue(v)))
+        return '%s-%s' % (h.hexdigest(), x)
+
+    def keyvalue(self, value, seen=None):
+        """
+        Get a (stable) representation of an option value for the cache key.
+        Simple values are represented by their value, lists and dicts by
+        their (represented) items and other objects by their class and
+        (represented) attributes so that objects configured differently,
+        such as two I{ImportDoctor}s with different imports, are keyed
+        differently.
+        @param value: An option value.
+        @type value: any
+        @param seen: The ids of the objects being represented (cycles).
+        @type seen: set
+        @return: The representation.
+        @rtype: str
+        """
+        if value is None or isinstance(value, (bool, int, long, float, str)):
+            return str(value)
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        if seen is None:
+            seen = set()
+        if isinstance(value, (list, tuple)):
+            return ','.join([self.keyvalue(v, seen) for v in value])
+        if isinstance(value, dict):
+            items = []
+            for k, v in value.items():
+                items.append('%s:%s' % (k, self.keyvalue(v, seen)))
+            items.sort()
+            return '{%s}' % ','.join(items)
+        cls = value.__class__
+        name = '.'.join((cls.__module__, cls.__name__))
+        state = getattr(value, '__dict__', None)
+        if not state or id(value) in seen:
+            return name
+        seen.add(id(value))
+        return '%s(%s)' % (name, self.keyvalue(state, seen))
 
 
 class DocumentReader(Reader):
@@ -77,20 +126,97 @@ class DocumentReader(Reader):
         """
         cache = self.cache()
         id = self.mangle(url, 'document')
-        d = cache.get(id)
+        d = yield cache.aget(id)
         if d is None:
-            d = yield self.download(url)
-            cache.put(id, d)
+            d = yield self.refresh(cache, id, url)
         self.plugins.document.parsed(url=url, document=d.root())
 
         defer.returnValue(d)
 
     @defer.inlineCallbacks
-    def download(self, url):
+    def refresh(self, cache, id, url):
+        """
+        Download the document for a missing (or expired) cache entry and
+        add it to the cache with its validators (I{ETag}, I{Last-Modified}).
+        When the expired entry has validators, the request is conditional
+        and when the document has not been modified (304) the cached entry
+        is refreshed and used instead.
+        @param cache: The cache.
+        @type cache: L{Cache}
+        @param id: The cache entry id.
+        @type id: str
+        @param url: A document url.
+        @type url: str.
+        @return: The specified XML document.
+        @rtype: I{Document}
+        """
+        request = Request(url)
+        meta = yield cache.agetmeta(id)
+        if meta:
+            self.condition(request, meta)
+        try:
+            d = yield self.download(url, request)
+        except TransportError, e:
+            if e.httpcode != 304:
+                raise
+            log.debug('(%s) not modified', url)
+            yield cache.atouch(id)
+            d = yield cache.aget(id)
+            if d is not None:
+                defer.returnValue(d)
+            request = Request(url)
+            d = yield self.download(url, request)
+        yield cache.aput(id, d)
+        meta = dict(url=url)
+        meta.update(self.validators(request))
+        yield cache.aputmeta(id, meta)
+        defer.returnValue(d)
+
+    def condition(self, request, meta):
+        """
+        Make the request conditional using the validators in the
+        cache entry metadata.
+        @param request: A transport request.
+        @type request: L{Request}
+        @param meta: The cache entry metadata.
+        @type meta: dict
+        """
+        etag = meta.get('etag')
+        if etag:
+            request.headers['If-None-Match'] = str(etag)
+        modified = meta.get('last-modified')
+        if modified:
+            request.headers['If-Modified-Since'] = str(modified)
+
+    def validators(self, request):
+        """
+        Get the validators (I{etag}, I{last-modified}) from the reply
+        headers of an opened request.
+        @param request: A transport request.
+        @type request: L{Request}
+        @return: The validators.
+        @rtype: dict
+        """
+        result = {}
+        if request.reply is None:
+            return result
+        for name, value in request.reply.headers.items():
+            name = name.lower()
+            if name not in ('etag', 'last-modified'):
+                continue
+            if isinstance(value, (list, tuple)):
+                value = value[0]
+            result[name] = value
+        return result
+
+    @defer.inlineCallbacks
+    def download(self, url, request=None):
         """
         Download the docuemnt.
         @param url: A document url.
         @type url: str.
+        @param request: The (optional) transport request used.
+        @type request: L{Request}
         @return: A file pointer to the docuemnt.
         @rtype: file-like
         """
@@ -101,7 +227,9 @@ class DocumentReader(Reader):
             content = fp.read()
             fp.close()
         else:
-            content = yield self.options.transport.open(Request(url))
+            if request is None:
+                request = Request(url)
+            content = yield self.options.transport.open(request)
 
         ctx = self.plugins.document.loaded(url=url, document=content)
         content = ctx.document
@@ -129,6 +257,8 @@ class DefinitionsReader(Reader):
     @type fn: I{Constructor}
     """
 
+    keyed = ('autoblend', 'doctor', 'operations')
+
     def __init__(self, options, fn):
         """
         @param options: An options object.
@@ -156,11 +286,12 @@ class DefinitionsReader(Reader):
         """
         cache = self.cache()
         id = self.mangle(url, 'wsdl')
-        d = cache.get(id)
+        d = yield cache.aget(id)
         if d is None:
             d = self.fn(url, self.options)
             yield d.build()
-            cache.put(id, d)
+            yield cache.aput(id, d)
+            yield cache.aputmeta(id, dict(url=url))
         else:
             d.options = self.options
             for imp in d.imports:
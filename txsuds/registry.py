@@ -0,0 +1,182 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+The I{registry} module provides an in-memory registry of WSDL
+definitions shared by the clients of a process.
+"""
+
+from logging import getLogger
+from txsuds import *
+from txsuds.reader import DefinitionsReader
+from txsuds.wsdl import Definitions
+from twisted.internet import defer
+
+log = getLogger(__name__)
+
+
+class Registry:
+    """
+    A reference counted registry of (shared) WSDL definitions keyed by
+    URL and options I{fingerprint}.  The definitions are built (or read
+    from the object cache) once and concurrent opens of the same WSDL
+    wait for the same build.  The definitions are dropped from the
+    registry when the last reference is released.
+    @cvar fingerprinted: The names of the options that affect how the
+        definitions are built and used by the bindings.  Clients share
+        definitions only when these options are the same.
+    @type fingerprinted: (str,...)
+    @ivar definitions: The registered definitions by key.
+    @type definitions: {tuple: L{Definitions}}
+    @ivar refs: The reference counts by key.
+    @type refs: {tuple: int}
+    @ivar pending: The deferreds waiting for a build in progress by key.
+    @type pending: {tuple: [L{defer.Deferred},...]}
+    @ivar keys: The registered keys by definitions object id.
+    @type keys: {int: tuple}
+    """
+
+    fingerprinted = (
+        'doctor',
+        'autoblend',
+        'cachingpolicy',
+        'plugins',
+        'envns',
+        'xstq',
+        'prefixes',
+        'faults',
+        'wsse',
+        'soapheaders',
+        'lazyschema',
+        'operations',
+        'directreply',
+    )
+
+    def __init__(self):
+        self.definitions = {}
+        self.refs = {}
+        self.pending = {}
+        self.keys = {}
+
+    def open(self, url, options):
+        """
+        Open (and reference) the WSDL at the specified I{url}.
+        @param url: A WSDL url.
+        @type url: str
+        @param options: The options of the client opening the WSDL.
+        @type options: L{txsuds.options.Options}
+        @return: A deferred that fires with the definitions.
+        @rtype: L{defer.Deferred}
+        """
+        key = (url, self.fingerprint(options))
+        d = self.definitions.get(key)
+        if d is not None:
+            self.refs[key] += 1
+            log.debug('wsdl (%s) shared, refs=%d', url, self.refs[key])
+            return defer.succeed(d)
+        waiter = defer.Deferred()
+        waiting = self.pending.get(key)
+        if waiting is not None:
+            waiting.append(waiter)
+            return waiter
+        self.pending[key] = [waiter]
+        reader = DefinitionsReader(options, Definitions)
+        opened = reader.open(url)
+        opened.addCallbacks(
+            self.__opened,
+            self.__failed,
+            callbackArgs=(key,),
+            errbackArgs=(key,))
+        return waiter
+
+    def retain(self, d):
+        """
+        Add a reference to registered definitions.
+        @param d: The definitions.
+        @type d: L{Definitions}
+        """
+        key = self.keys.get(id(d))
+        if key is not None:
+            self.refs[key] += 1
+
+    def release(self, d):
+        """
+        Release a reference to registered definitions.  The definitions
+        are dropped when the last reference is released.
+        @param d: The definitions.
+        @type d: L{Definitions}
+        """
+        key = self.keys.get(id(d))
+        if key is None:
+            return
+        self.refs[key] -= 1
+        if self.refs[key] > 0:
+            return
+        del self.refs[key]
+        del self.definitions[key]
+        del self.keys[id(d)]
+        log.debug('wsdl (%s) released', key[0])
+
+    def fingerprint(self, options):
+        """
+        Get the I{fingerprint} of the options.
+        @param options: A client's options.
+        @type options: L{txsuds.options.Options}
+        @return: The values (or object ids) of the fingerprinted options.
+        @rtype: tuple
+        """
+        result = []
+        for name in self.fingerprinted:
+            value = getattr(options, name)
+            if isinstance(value, (list, tuple)):
+                value = tuple([self.ident(v) for v in value])
+            else:
+                value = self.ident(value)
+            result.append((name, value))
+        return tuple(result)
+
+    def ident(self, value):
+        """
+        Get a hashable identity for an option value.
+        @param value: An option value.
+        @type value: any
+        @return: The value when it is a simple value, else its id.
+        @rtype: any
+        """
+        if value is None or isinstance(value, (basestring, int, long, float)):
+            return value
+        return id(value)
+
+    def __opened(self, d, key):
+        waiting = self.pending.pop(key)
+        self.definitions[key] = d
+        self.refs[key] = len(waiting)
+        self.keys[id(d)] = key
+        for waiter in waiting:
+            waiter.callback(d)
+
+    def __failed(self, failure, key):
+        waiting = self.pending.pop(key)
+        for waiter in waiting:
+            waiter.errback(failure)
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def __str__(self):
+        s = ['registry:']
+        for key, d in self.definitions.items():
+            s.append('  %s (refs=%d)' % (key[0], self.refs[key]))
+        return '\n'.join(s)
@@ -20,6 +20,7 @@ provide wsdl/xsd named type resolution.
 """
 
 import re
+from collections import OrderedDict
 from logging import getLogger
 from txsuds import *
 from txsuds.sax import splitPrefix, Namespace
@@ -71,19 +72,35 @@ class PathResolver(Resolver):
     """
     Resolveds the definition object for the schema type located at the specified path.
     The path may contain (.) dot notation to specify nested types.
+    Found types are kept in a (LRU) cache keyed by path and separator.
+    @cvar cachesize: The maximum number of cached paths.
+    @type cachesize: int
     @ivar wsdl: A wsdl object.
     @type wsdl: L{wsdl.Definitions}
+    @ivar ps: The path separator character
+    @type ps: char
+    @ivar cache: The cached types keyed by (path, separator, resolved).
+    @type cache: I{OrderedDict}
     """
 
-    def __init__(self, wsdl, ps='.'):
+    cachesize = 1000
+
+    def __init__(self, wsdl, ps='.', cache=None):
         """
         @param wsdl: A schema object.
         @type wsdl: L{wsdl.Definitions}
         @param ps: The path separator character
         @type ps: char
+        @param cache: An (optional) cache shared with another resolver
+            for the same wsdl.
+        @type cache: I{OrderedDict}
         """
         Resolver.__init__(self, wsdl.schema)
         self.wsdl = wsdl
+        self.ps = ps
+        if cache is None:
+            cache = OrderedDict()
+        self.cache = cache
         self.altp = re.compile('({)(.+)(})(.+)')
         self.splitp = re.compile('({.+})*[^\%s]+' % ps[0])
 
@@ -101,6 +118,19 @@ class PathResolver(Resolver):
         @return: The found schema I{type}
         @rtype: L{xsd.sxbase.SchemaObject}
         """
+        key = (path, self.ps, resolved)
+        result = self.cache.pop(key, None)
+        if result is not None:
+            self.cache[key] = result
+            return result
+        result = self.__find(path, resolved)
+        if result is not None:
+            self.cache[key] = result
+            if len(self.cache) > self.cachesize:
+                self.cache.popitem(last=False)
+        return result
+
+    def __find(self, path, resolved):
         result = None
         parts = self.split(path)
         try:
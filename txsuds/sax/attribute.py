@@ -27,7 +27,7 @@ from txsuds.sax.text import Text
 log = getLogger(__name__)
 
 
-class Attribute:
+class Attribute(object):
     """
     An XML attribute object.
     @ivar parent: The node containing this attribute
@@ -39,6 +39,9 @@ class Attribute:
     @ivar value: The attribute's value
     @type value: basestring
     """
+
+    __slots__ = ('parent', 'prefix', 'name', 'value',)
+
     def __init__(self, name, value=None):
         """
         @param name: The attribute's name with I{optional} namespace prefix.
@@ -180,3 +183,13 @@ class Attribute:
         else:
             v = self.value
         return u'%s="%s"' % (n, v)
+
+    def __getstate__(self):
+        state = {}
+        for k in self.__slots__:
+            state[k] = getattr(self, k)
+        return state
+
+    def __setstate__(self, state):
+        for k in self.__slots__:
+            setattr(self, k, state[k])
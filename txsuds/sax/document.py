@@ -53,13 +53,8 @@ class Document(Element):
         @return: A I{pretty} string.
         @rtype: basestring
         """
-        s = []
-        s.append(self.DECL)
-        root = self.root()
-        if root is not None:
-            s.append('\n')
-            s.append(root.str())
-        return ''.join(s)
+        from txsuds.sax.writer import Writer
+        return Writer(True).tostring(self)
 
     def plain(self):
         """
@@ -67,12 +62,8 @@ class Document(Element):
         @return: A I{plain} string.
         @rtype: basestring
         """
-        s = []
-        s.append(self.DECL)
-        root = self.root()
-        if root is not None:
-            s.append(root.plain())
-        return ''.join(s)
+        from txsuds.sax.writer import Writer
+        return Writer().tostring(self)
 
     def __str__(self):
         return unicode(self).encode('utf-8')
@@ -31,7 +31,7 @@ if sys.version_info < (2, 4, 0):
 log = getLogger(__name__)
 
 
-class Element:
+class Element(object):
     """
     An XML element object.
     @ivar parent: The node containing this attribute
@@ -42,18 +42,44 @@ class Element:
     @type name: basestring
     @ivar expns: An explicit namespace (xmlns="...").
     @type expns: (I{prefix}, I{name})
-    @ivar nsprefixes: A mapping of prefixes to namespaces.
+    @ivar nsprefixes: A mapping of prefixes to namespaces.  Allocated
+        when first used.
     @type nsprefixes: dict
-    @ivar attributes: A list of XML attributes.
+    @ivar attributes: A list of XML attributes.  Allocated when first used.
     @type attributes: [I{Attribute},]
     @ivar text: The element's I{text} content.
     @type text: basestring
     @ivar children: A list of child elements.
     @type children: [I{Element},]
+    @ivar nsscope: The (cached) scoped namespace context, else None when
+        not built (or invalidated).
+    @type nsscope: dict
     @cvar matcher: A collection of I{lambda} for string matching.
     @cvar specialprefixes: A dictionary of builtin-special prefixes.
+    @note: Prefix mappings should be changed using L{addPrefix},
+        L{updatePrefix} and L{clearPrefix} (not by updating I{nsprefixes}
+        directly) and children added or removed using L{append},
+        L{insert} and L{remove} (or L{detach}) so that the cached
+        namespace contexts of the affected branch are invalidated.
+    @note: Elements have no instance dictionary (see I{__slots__}) and
+        most elements have neither attributes nor prefix mappings so the
+        I{nsprefixes} dict and I{attributes} list are only allocated when
+        they are first used.  Use L{getAttributes} to read the attributes
+        without allocating the list.
     """
 
+    __slots__ = (
+        'prefix',
+        'name',
+        'expns',
+        'text',
+        'parent',
+        'children',
+        'nsscope',
+        '_nsprefixes',
+        '_attributes',
+    )
+
     matcher = \
     {
         'eq': lambda a,b: a == b,
@@ -95,8 +121,9 @@ class Element:
 
         self.rename(name)
         self.expns = None
-        self.nsprefixes = {}
-        self.attributes = []
+        self.nsscope = None
+        self._nsprefixes = None
+        self._attributes = None
         self.text = None
         if parent is not None:
             if isinstance(parent, Element):
@@ -108,6 +135,31 @@ class Element:
         self.children = []
         self.applyns(ns)
 
+    def _getNsprefixes(self):
+        """
+        Helper method that lazily allocates the prefix mappings.
+        """
+        if self._nsprefixes is None:
+            self._nsprefixes = {}
+        return self._nsprefixes
+
+    def _setNsprefixes(self, nsprefixes):
+        self._nsprefixes = nsprefixes
+        self.nschanged()
+    nsprefixes = property(_getNsprefixes, _setNsprefixes)
+
+    def _getAttributes(self):
+        """
+        Helper method that lazily allocates the attribute list.
+        """
+        if self._attributes is None:
+            self._attributes = []
+        return self._attributes
+
+    def _setAttributes(self, attributes):
+        self._attributes = attributes
+    attributes = property(_getAttributes, _setAttributes)
+
     def rename(self, name):
         """
         Rename the element.
@@ -165,12 +217,13 @@ class Element:
         @rtype: I{Element}
         """
         root = Element(self.qname(), parent, self.namespace())
-        for a in self.attributes:
+        for a in self.getAttributes():
             root.append(a.clone(self))
         for c in self.children:
             root.append(c.clone(self))
-        for item in self.nsprefixes.items():
-            root.addPrefix(item[0], item[1])
+        if self._nsprefixes:
+            for item in self._nsprefixes.items():
+                root.addPrefix(item[0], item[1])
         return root
 
     def detach(self):
@@ -184,6 +237,7 @@ class Element:
             if self in self.parent.children:
                 self.parent.children.remove(self)
             self.parent = None
+            self.nschanged()
         return self
 
     def set(self, name, value):
@@ -328,6 +382,7 @@ class Element:
             if isinstance(child, Element):
                 self.children.append(child)
                 child.parent = self
+                child.nschanged()
                 continue
             if isinstance(child, Attribute):
                 self.attributes.append(child)
@@ -352,6 +407,7 @@ class Element:
             if isinstance(child, Element):
                 self.children.insert(index, child)
                 child.parent = self
+                child.nschanged()
             else:
                 raise Exception('append %s not-valid' % child.__class__.__name__)
         return self
@@ -387,6 +443,7 @@ class Element:
         for node in content:
             self.children.insert(index, node.detach())
             node.parent = self
+            node.nschanged()
             index += 1
 
     def getAttribute(self, name, ns=None, default=None):
@@ -407,11 +464,19 @@ class Element:
                 ns = None
             else:
                 ns = self.resolvePrefix(prefix)
-        for a in self.attributes:
+        for a in self.getAttributes():
             if a.match(name, ns):
                 return a
         return default
 
+    def getAttributes(self):
+        """
+        Get the attributes without allocating the attribute list.
+        @return: The attributes.
+        @rtype: [L{Attribute},...]
+        """
+        return ( self._attributes or () )
+
     def getChild(self, name, ns=None, default=None):
         """
         Get a child by (optional) name and/or (optional) namespace.
@@ -504,14 +569,14 @@ class Element:
         self.children = []
         for child in detached:
             child.parent = None
+            child.nschanged()
         return detached
 
     def resolvePrefix(self, prefix, default=Namespace.default):
         """
         Resolve the specified prefix to a namespace.  The I{nsprefixes} is
-        searched.  If not found, it walks up the tree until either resolved or
-        the top of the tree is reached.  Searching up the tree provides for
-        inherited mappings.
+        searched.  If not found, the (scoped) namespace context containing
+        the mappings inherited from the ancestors is searched.
         @param prefix: A namespace prefix to resolve.
         @type prefix: basestring
         @param default: An optional value to be returned when the prefix
@@ -520,14 +585,61 @@ class Element:
         @return: The namespace that is mapped to I{prefix} in this context.
         @rtype: (I{prefix},I{URI})
         """
+        if self._nsprefixes and prefix in self._nsprefixes:
+            return (prefix, self._nsprefixes[prefix])
+        if prefix in self.specialprefixes:
+            return (prefix, self.specialprefixes[prefix])
+        context = self.nscontext()
+        if prefix in context:
+            return (prefix, context[prefix])
+        return default
+
+    def nscontext(self):
+        """
+        Get the scoped namespace context.  That is, all of the prefix
+        mappings in effect for this element including those inherited
+        from its ancestors.  The context is built once and cached (along
+        with the contexts of the ancestors) until it is invalidated by
+        L{nschanged}.  Elements that define no mappings share the context
+        of their parent.
+        @return: The mappings as {I{prefix}:I{URI}}.  Must not be modified.
+        @rtype: dict
+        """
+        context = self.nsscope
+        if context is not None:
+            return context
+        pending = []
+        context = {}
         n = self
         while n is not None:
-            if prefix in n.nsprefixes:
-                return (prefix, n.nsprefixes[prefix])
-            if prefix in self.specialprefixes:
-                return (prefix, self.specialprefixes[prefix])
+            if n.nsscope is not None:
+                context = n.nsscope
+                break
+            pending.append(n)
             n = n.parent
-        return default
+        pending.reverse()
+        for n in pending:
+            if n._nsprefixes:
+                context = dict(context)
+                context.update(n._nsprefixes)
+            n.nsscope = context
+        return context
+
+    def nschanged(self):
+        """
+        Invalidate the (cached) scoped namespace contexts of this element
+        and its descendants.  Called whenever the prefix mappings of the
+        element change or it is moved within (or out of) a tree.  Since
+        a context is only cached along with the contexts of the ancestors,
+        the descendants of an element that has none cached are skipped.
+        """
+        pending = [self]
+        while len(pending):
+            n = pending.pop()
+            if n.nsscope is None:
+                continue
+            n.nsscope = None
+            pending.extend(n.children)
 
     def addPrefix(self, p, u):
         """
@@ -540,6 +652,7 @@ class Element:
         @rtype: L{Element}
         """
         self.nsprefixes[p] = u
+        self.nschanged()
         return self
 
     def updatePrefix(self, p, u):
@@ -553,8 +666,9 @@ class Element:
         @rtype: L{Element}
         @note: This method traverses down the entire branch!
         """
-        if p in self.nsprefixes:
-            self.nsprefixes[p] = u
+        if self._nsprefixes and p in self._nsprefixes:
+            self._nsprefixes[p] = u
+            self.nschanged()
         for c in self.children:
             c.updatePrefix(p, u)
         return self
@@ -567,8 +681,9 @@ class Element:
         @return: self
         @rtype: L{Element}
         """
-        if prefix in self.nsprefixes:
-            del self.nsprefixes[prefix]
+        if self._nsprefixes and prefix in self._nsprefixes:
+            del self._nsprefixes[prefix]
+            self.nschanged()
         return self
 
     def findPrefix(self, uri, default=None):
@@ -583,7 +698,7 @@ class Element:
         @return: A mapped prefix.
         @rtype: basestring
         """
-        for item in self.nsprefixes.items():
+        for item in (self._nsprefixes or {}).items():
             if item[1] == uri:
                 prefix = item[0]
                 return prefix
@@ -609,7 +724,7 @@ class Element:
         @rtype: [basestring,...]
         """
         result = []
-        for item in self.nsprefixes.items():
+        for item in (self._nsprefixes or {}).items():
             if self.matcher[match](item[1], uri):
                 prefix = item[0]
                 result.append(prefix)
@@ -634,7 +749,8 @@ class Element:
             c.promotePrefixes()
         if self.parent is None:
             return
-        for p,u in self.nsprefixes.items():
+        changed = False
+        for p,u in (self._nsprefixes or {}).items():
             if p in self.parent.nsprefixes:
                 pu = self.parent.nsprefixes[p]
                 if pu == u:
@@ -643,6 +759,9 @@ class Element:
             if p != self.parent.prefix:
                 self.parent.nsprefixes[p] = u
                 del self.nsprefixes[p]
+                changed = True
+        if changed:
+            self.parent.nschanged()
         return self
 
     def refitPrefixes(self):
@@ -659,7 +778,8 @@ class Element:
             if ns[1] is not None:
                 self.expns = ns[1]
         self.prefix = None
-        self.nsprefixes = {}
+        self._nsprefixes = None
+        self.nschanged()
         return self
 
     def normalizePrefixes(self):
@@ -682,7 +802,7 @@ class Element:
         @return: True when element has not children.
         @rtype: boolean
         """
-        noattrs = not len(self.attributes)
+        noattrs = not self._attributes
         nochildren = not len(self.children)
         notext = ( self.text is None )
         nocontent = ( nochildren and notext )
@@ -739,6 +859,7 @@ class Element:
         else:
             self.prefix = ns[0]
             self.nsprefixes[ns[0]] = ns[1]
+            self.nschanged()
 
     def str(self, indent=0):
         """
@@ -748,26 +869,8 @@ class Element:
         @return: A I{pretty} string.
         @rtype: basestring
         """
-        tab = '%*s'%(indent*3,'')
-        result = []
-        result.append('%s<%s' % (tab, self.qname()))
-        result.append(self.nsdeclarations())
-        for a in [unicode(a) for a in self.attributes]:
-            result.append(' %s' % a)
-        if self.isempty():
-            result.append('/>')
-            return ''.join(result)
-        result.append('>')
-        if self.hasText():
-            result.append(self.text.escape())
-        for c in self.children:
-            result.append('\n')
-            result.append(c.str(indent+1))
-        if len(self.children):
-            result.append('\n%s' % tab)
-        result.append('</%s>' % self.qname())
-        result = ''.join(result)
-        return result
+        from txsuds.sax.writer import Writer
+        return Writer(True).tostring(self, indent)
 
     def plain(self):
         """
@@ -775,22 +878,8 @@ class Element:
         @return: A I{plain} string.
         @rtype: basestring
         """
-        result = []
-        result.append('<%s' % self.qname())
-        result.append(self.nsdeclarations())
-        for a in [unicode(a) for a in self.attributes]:
-            result.append(' %s' % a)
-        if self.isempty():
-            result.append('/>')
-            return ''.join(result)
-        result.append('>')
-        if self.hasText():
-            result.append(self.text.escape())
-        for c in self.children:
-            result.append(c.plain())
-        result.append('</%s>' % self.qname())
-        result = ''.join(result)
-        return result
+        from txsuds.sax.writer import Writer
+        return Writer().tostring(self)
 
     def nsdeclarations(self):
         """
@@ -809,7 +898,7 @@ class Element:
             if self.expns is not None:
                 d = ' xmlns="%s"' % self.expns
                 s.append(d)
-        for item in self.nsprefixes.items():
+        for item in (self._nsprefixes or {}).items():
             (p,u) = item
             if self.parent is not None:
                 ns = self.parent.resolvePrefix(p)
@@ -912,6 +1001,21 @@ class Element:
             result = child.getChildren(leaf)
         return result
 
+    def __getstate__(self):
+        nopickle = ('nsscope',)
+        state = dict(getattr(self, '__dict__', {}))
+        for k in Element.__slots__:
+            state[k] = getattr(self, k)
+        for k in nopickle:
+            if k in state:
+                del state[k]
+        return state
+
+    def __setstate__(self, state):
+        self.nsscope = None
+        for k, v in state.items():
+            setattr(self, k, v)
+
     def __len__(self):
         return len(self.children)
 
@@ -930,7 +1034,7 @@ class Element:
         else:
             if index < len(self.children) and \
                 isinstance(value, Element):
-                self.children.insert(index, value)
+                self.insert(value, index)
 
     def __eq__(self, rhs):
         return  rhs is not None and \
@@ -1041,7 +1145,7 @@ class PrefixNormalizer:
         @rtype: set
         """
         s = set()
-        for ns in n.nsprefixes.items():
+        for ns in (n._nsprefixes or {}).items():
             if self.permit(ns):
                 s.add(ns[1])
         return s
@@ -1084,7 +1188,7 @@ class PrefixNormalizer:
         @param n: A node.
         @type n: L{Element}
         """
-        for a in n.attributes:
+        for a in n.getAttributes():
             self.refitAddr(a)
 
     def refitAddr(self, a):
@@ -1118,7 +1222,8 @@ class PrefixNormalizer:
         Refit (normalize) all of the nsprefix mappings.
         """
         for n in self.branch:
-            n.nsprefixes = {}
+            n.nsprefixes = None
+        self.node.nschanged()
         n = self.node
         for u, p in self.prefixes.items():
             n.addPrefix(p, u)
@@ -42,10 +42,17 @@ log = getLogger(__name__)
 
 
 class Handler(ContentHandler):
-    """ sax hanlder """
+    """
+    sax hanlder
+    @ivar nodes: The stack of open nodes.
+    @type nodes: [L{Element},...]
+    @ivar buffers: The stack of character buffers (one for each open node).
+    @type buffers: [[unicode,...],...]
+    """
 
     def __init__(self):
         self.nodes = [Document()]
+        self.buffers = [[]]
 
     def startElement(self, name, attrs):
         top = self.top()
@@ -57,7 +64,6 @@ class Handler(ContentHandler):
             if self.mapPrefix(node, attribute):
                 continue
             node.append(attribute)
-        node.charbuffer = []
         top.append(node)
         self.push(node)
 
@@ -69,16 +75,16 @@ class Handler(ContentHandler):
             skip = True
         elif attribute.prefix == 'xmlns':
             prefix = attribute.name
-            node.nsprefixes[prefix] = unicode(attribute.value)
+            node.addPrefix(prefix, unicode(attribute.value))
             skip = True
         return skip
 
     def endElement(self, name):
         name = unicode(name)
         current = self.top()
-        if len(current.charbuffer):
-            current.text = Text(u''.join(current.charbuffer))
-        del current.charbuffer
+        charbuffer = self.buffers[-1]
+        if len(charbuffer):
+            current.text = Text(u''.join(charbuffer))
         if len(current):
             current.trim()
         currentqname = current.qname()
@@ -89,14 +95,15 @@ class Handler(ContentHandler):
 
     def characters(self, content):
         text = unicode(content)
-        node = self.top()
-        node.charbuffer.append(text)
+        self.buffers[-1].append(text)
 
     def push(self, node):
         self.nodes.append(node)
+        self.buffers.append([])
         return node
 
     def pop(self):
+        self.buffers.pop()
         return self.nodes.pop()
 
     def top(self):
@@ -107,24 +114,41 @@ class Parser:
     """ SAX Parser """
 
     @classmethod
-    def saxparser(cls):
+    def saxparser(cls, handler=None):
         p = make_parser()
         p.setFeature(feature_external_ges, 0)
-        h = Handler()
+        if handler is None:
+            h = Handler()
+        else:
+            h = handler
         p.setContentHandler(h)
         return (p, h)
 
-    def parse(self, file=None, string=None):
+    def feeder(self, handler=None):
+        """
+        Get an incremental parser.  The XML text is pushed into it in
+        chunks (as it is received) and the document is built as the
+        chunks are parsed.
+        @param handler: An (optional) handler used instead of L{Handler}.
+        @type handler: L{Handler}
+        @return: An incremental parser.
+        @rtype: L{Feeder}
+        """
+        return Feeder(*self.saxparser(handler))
+
+    def parse(self, file=None, string=None, handler=None):
         """
         SAX parse XML text.
         @param file: Parse a python I{file-like} object.
         @type file: I{file-like} object.
         @param string: Parse string XML.
         @type string: str
+        @param handler: An (optional) handler used instead of L{Handler}.
+        @type handler: L{Handler}
         """
         timer = metrics.Timer()
         timer.start()
-        sax, handler = self.saxparser()
+        sax, handler = self.saxparser(handler)
         if file is not None:
             sax.parse(file)
             timer.stop()
@@ -136,4 +160,53 @@ class Parser:
             sax.parse(source)
             timer.stop()
             metrics.log.debug('%s\nsax duration: %s', string, timer)
-            return handler.nodes[0]
\ No newline at end of file
+            return handler.nodes[0]
+
+
+class Feeder:
+    """
+    An incremental SAX parse.
+    @ivar sax: The (incremental) sax parser.
+    @type sax: I{xml.sax.xmlreader.IncrementalParser}
+    @ivar handler: The content handler building the document.
+    @type handler: L{Handler}
+    @ivar timer: Measures the time spent parsing.
+    @type timer: L{metrics.Timer}
+    """
+
+    def __init__(self, sax, handler):
+        """
+        @param sax: The (incremental) sax parser.
+        @type sax: I{xml.sax.xmlreader.IncrementalParser}
+        @param handler: The content handler building the document.
+        @type handler: L{Handler}
+        """
+        self.sax = sax
+        self.handler = handler
+        self.timer = metrics.Timer()
+        self.duration = 0
+
+    def feed(self, data):
+        """
+        Parse the next chunk of XML text.
+        @param data: A chunk of XML text.
+        @type data: str
+        """
+        self.timer.start()
+        self.sax.feed(data)
+        self.timer.stop()
+        self.duration += self.timer.duration()
+
+    def close(self):
+        """
+        Finish the parse.
+        @return: The parsed document.
+        @rtype: L{Document}
+        """
+        self.timer.start()
+        self.sax.close()
+        self.timer.stop()
+        self.duration += self.timer.duration()
+        metrics.log.debug('sax (incremental) duration: %d (ms)',
+            self.duration*1000)
+        return self.handler.nodes[0]
@@ -0,0 +1,161 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+Provides the XML I{writer} used to serialize element trees.
+"""
+
+from logging import getLogger
+from cStringIO import StringIO
+from txsuds import *
+from txsuds.sax.element import Element
+from txsuds.sax.document import Document
+
+log = getLogger(__name__)
+
+
+class Writer:
+    """
+    Serializes an element tree (or document) without recursion.  The tree
+    is walked using an explicit stack and the XML text is produced as a
+    flat sequence of fragments so that no subtree text is ever copied into
+    the text of its parent.  Subclasses of L{Element} that provide their
+    own (pretty) L{Element.str} are serialized by calling it.
+    @cvar batch: The number of fragments encoded (and written) at once.
+    @type batch: int
+    @ivar pretty: Produce I{pretty} (indented) XML.
+    @type pretty: bool
+    """
+
+    batch = 512
+
+    def __init__(self, pretty=False):
+        """
+        @param pretty: Produce I{pretty} (indented) XML.
+        @type pretty: bool
+        """
+        self.pretty = pretty
+
+    def fragments(self, node, indent=0):
+        """
+        Generate the XML text for a node as a sequence of fragments.
+        @param node: The node (or document) to serialize.
+        @type node: L{Element}
+        @param indent: The indent of I{node} (pretty XML only).
+        @type indent: int
+        @return: A generator of text fragments.
+        @rtype: generator
+        """
+        pretty = self.pretty
+        if isinstance(node, Document):
+            yield node.DECL
+            node = node.root()
+            if node is None:
+                return
+            if pretty:
+                yield '\n'
+        stack = [(node, indent, False)]
+        while len(stack):
+            n, depth, end = stack.pop()
+            if end:
+                if pretty and len(n.children):
+                    yield '\n%*s' % (depth*3, '')
+                yield '</%s>' % n.qname()
+                continue
+            if pretty:
+                if n is not node:
+                    yield '\n'
+                if self.custom(n):
+                    yield n.str(depth)
+                    continue
+                tab = '%*s' % (depth*3, '')
+            else:
+                tab = ''
+            start = [tab, '<', n.qname(), n.nsdeclarations()]
+            for a in n.getAttributes():
+                start.append(' ')
+                start.append(unicode(a))
+            if n.isempty():
+                start.append('/>')
+                yield ''.join(start)
+                continue
+            start.append('>')
+            if n.hasText():
+                start.append(n.text.escape())
+            yield ''.join(start)
+            stack.append((n, depth, True))
+            children = n.children
+            for i in range(len(children)-1, -1, -1):
+                stack.append((children[i], depth+1, False))
+
+    def custom(self, node):
+        """
+        Get whether a node provides its own (pretty) serialization.
+        @param node: A node.
+        @type node: L{Element}
+        @return: True when the node class overrides L{Element.str}.
+        @rtype: bool
+        """
+        cls = node.__class__
+        if cls is Element:
+            return False
+        return ( cls.str.im_func is not Element.str.im_func )
+
+    def tostring(self, node, indent=0):
+        """
+        Get the XML text for a node.
+        @param node: The node (or document) to serialize.
+        @type node: L{Element}
+        @param indent: The indent of I{node} (pretty XML only).
+        @type indent: int
+        @return: The XML text.
+        @rtype: basestring
+        """
+        return ''.join(self.fragments(node, indent))
+
+    def write(self, node, out, encoding='utf-8'):
+        """
+        Write the encoded XML text for a node.  The fragments are encoded
+        and written in batches so the text is never held (twice) as a whole.
+        @param node: The node (or document) to serialize.
+        @type node: L{Element}
+        @param out: An object with a write() method such as a file or a
+            twisted I{IConsumer}.
+        @type out: I{file-like}
+        @param encoding: The text encoding.
+        @type encoding: str
+        """
+        pending = []
+        for f in self.fragments(node):
+            pending.append(f)
+            if len(pending) == self.batch:
+                out.write(''.join(pending).encode(encoding))
+                pending = []
+        if len(pending):
+            out.write(''.join(pending).encode(encoding))
+
+    def encode(self, node, encoding='utf-8'):
+        """
+        Get the encoded XML text for a node.
+        @param node: The node (or document) to serialize.
+        @type node: L{Element}
+        @param encoding: The text encoding.
+        @type encoding: str
+        @return: The encoded XML text.
+        @rtype: str
+        """
+        out = StringIO()
+        self.write(node, out, encoding)
+        return out.getvalue()
@@ -0,0 +1,217 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+The I{scheduler} module provides classes used to bound the number
+of requests sent concurrently by a client.
+"""
+
+import time
+import urlparse
+from heapq import heapify, heappush, heappop
+from logging import getLogger
+from txsuds import *
+from txsuds import metrics
+from twisted.internet import defer
+
+log = getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Schedules the sending of requests.  Requests to the same endpoint
+    (scheme and host) and all requests are limited by counts.  Requests
+    waiting for a slot are queued (by endpoint) and started in I{priority}
+    order; requests with the same priority are started in the order they
+    were queued.  A queued request holds no slot until it is started and
+    cancelling it removes it from the queue.  The
+    limits are taken from the options of the client that created the
+    scheduler (and are shared by its clones):
+        - B{maxConcurrent} - The maximum number of requests sent at once.
+        - B{maxPerEndpoint} - The maximum number of requests sent to the
+            same endpoint at once.
+    The priority is taken from the options of the client sending the
+    request:
+        - B{priority} - The priority of the request (lowest first).
+    @ivar options: The options of the client that created the scheduler.
+    @type options: L{txsuds.options.Options}
+    @ivar endpoints: The number of requests being sent by endpoint.
+    @type endpoints: {str: int}
+    @ivar queues: The requests waiting for a slot by endpoint.
+    @type queues: {str: [(int, int, L{defer.Deferred}),...]}
+    @ivar active: The number of requests being sent.
+    @type active: int
+    @ivar waiting: The number of requests waiting to be sent.
+    @type waiting: int
+    @ivar started: The total number of requests started.
+    @type started: int
+    @ivar waited: The total time (seconds) requests have waited.
+    @type waited: float
+    @ivar maxwait: The longest time (seconds) a request has waited.
+    @type maxwait: float
+    """
+
+    def __init__(self, options):
+        """
+        @param options: The options of the client that creates the scheduler.
+        @type options: L{txsuds.options.Options}
+        """
+        self.options = options
+        self.endpoints = {}
+        self.queues = {}
+        self.sequence = 0
+        self.active = 0
+        self.waiting = 0
+        self.started = 0
+        self.waited = 0.0
+        self.maxwait = 0.0
+
+    def schedule(self, options, location, f, *args, **kwargs):
+        """
+        Schedule a call to I{f} that sends a request to I{location}.
+        @param options: The options of the client sending the request.
+        @type options: L{txsuds.options.Options}
+        @param location: The URL the request is sent to.
+        @type location: str
+        @param f: The function that sends the request.
+        @type f: callable
+        @return: A deferred that fires with the result of I{f}.
+        @rtype: L{defer.Deferred}
+        """
+        queued = time.time()
+        self.waiting += 1
+        key = self.endpoint(location)
+        d = self.__acquire(key, options.priority)
+        d.addCallback(self.__send, key, queued, f, args, kwargs)
+        return d
+
+    def endpoint(self, location):
+        """
+        Get the endpoint (scheme and host) of I{location}.
+        @param location: The URL the request is sent to.
+        @type location: str
+        @return: The endpoint.
+        @rtype: str
+        """
+        return '://'.join(urlparse.urlparse(location)[:2])
+
+    def depth(self):
+        """
+        Get the number of requests waiting to be sent.
+        @return: The queue depth.
+        @rtype: int
+        """
+        return self.waiting
+
+    def avgwait(self):
+        """
+        Get the average time requests have waited to be sent.
+        @return: The average wait (seconds).
+        @rtype: float
+        """
+        if self.started:
+            return self.waited / self.started
+        return 0.0
+
+    def __acquire(self, key, priority):
+        if self.available(key):
+            self.__start(key)
+            return defer.succeed(None)
+        d = defer.Deferred(lambda d: self.__cancel(key, d))
+        self.sequence += 1
+        queue = self.queues.setdefault(key, [])
+        heappush(queue, (priority, self.sequence, d))
+        return d
+
+    def __start(self, key):
+        self.active += 1
+        self.endpoints[key] = self.endpoints.get(key, 0)+1
+
+    def __cancel(self, key, d):
+        queue = self.queues[key]
+        queue[:] = [entry for entry in queue if entry[2] is not d]
+        heapify(queue)
+        if not len(queue):
+            del self.queues[key]
+        self.waiting -= 1
+
+    def __send(self, ignored, key, queued, f, args, kwargs):
+        self.__started(queued)
+        d = defer.maybeDeferred(f, *args, **kwargs)
+        d.addBoth(self.__release, key)
+        return d
+
+    def __started(self, queued):
+        wait = time.time()-queued
+        self.waiting -= 1
+        self.started += 1
+        self.waited += wait
+        self.maxwait = max(self.maxwait, wait)
+        metrics.log.debug('request waited %d (ms), %d waiting',
+            wait*1000, self.waiting)
+
+    def __release(self, result, key):
+        self.active -= 1
+        self.endpoints[key] -= 1
+        if not self.endpoints[key]:
+            del self.endpoints[key]
+        while True:
+            key = self.next()
+            if key is None:
+                break
+            queue = self.queues[key]
+            d = heappop(queue)[2]
+            if not len(queue):
+                del self.queues[key]
+            self.__start(key)
+            d.callback(None)
+        return result
+
+    def next(self):
+        """
+        Get the endpoint of the next (queued) request to be started: the
+        request with the lowest priority (then sequence) among those that
+        have a slot available.
+        @return: The endpoint, else None when no request can be started.
+        @rtype: str
+        """
+        found = None
+        for key, queue in self.queues.items():
+            if not self.available(key):
+                continue
+            if found is None or queue[0] < self.queues[found][0]:
+                found = key
+        return found
+
+    def available(self, key):
+        """
+        Get whether a slot is available for a request to an endpoint.
+        @param key: The endpoint.
+        @type key: str
+        @return: True when a slot is available.
+        @rtype: bool
+        """
+        limit = self.options.maxConcurrent
+        if limit and self.active >= limit:
+            return False
+        limit = self.options.maxPerEndpoint
+        if limit and self.endpoints.get(key, 0) >= limit:
+            return False
+        return True
+
+    def __str__(self):
+        return 'active: %d, waiting: %d, started: %d, avgwait: %d (ms), maxwait: %d (ms)' % \
+            (self.active, self.waiting, self.started,
+             self.avgwait()*1000, self.maxwait*1000)
@@ -0,0 +1,448 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+The I{snapshot} module provides a compact serialization of object graphs
+(such as built WSDL definitions) that contain XML element trees.
+"""
+
+import gc
+import struct
+import marshal
+import threading
+from logging import getLogger
+from cStringIO import StringIO
+from txsuds import *
+from txsuds.sax.element import Element
+from txsuds.sax.attribute import Attribute
+from txsuds.sax.document import Document
+from txsuds.sax.text import Text
+try:
+    import cPickle as pickle
+except:
+    import pickle
+
+log = getLogger(__name__)
+
+current = threading.local()
+
+
+class Snapshot:
+    """
+    A compact serialization (snapshot) of an object graph that contains
+    XML element trees such as built L{txsuds.wsdl.Definitions}.  The
+    element trees are flattened into node tables (tuples of string indexes)
+    with a single table of interned strings, which are marshalled.  The
+    rest of the graph is pickled and refers to the nodes by (tree, index).
+    When loaded, a tree is materialized when one of its nodes is first
+    needed.  The I{root} of the schema and WSDL objects (see L{getstate})
+    is a lazy L{Ref} so that the trees are not materialized at all until
+    a I{root} is used.  The node table of a tree is dropped when the tree
+    is materialized and the strings when the last tree is materialized.
+    @cvar magic: The snapshot format marker.
+    @type magic: str
+    @cvar protocol: The pickling protocol.
+    @type protocol: int
+    @ivar strings: The interned strings (None once all trees have
+        been materialized).
+    @type strings: [basestring,...]
+    @ivar trees: The flattened trees (None once materialized).
+    @type trees: [tuple,...]
+    @ivar interned: The index of the interned strings (dump).
+    @type interned: {(type, basestring): int}
+    @ivar index: The (tree, index) of the nodes by id (dump).
+    @type index: {int: tuple}
+    @ivar nodes: The materialized nodes by tree (load).
+    @type nodes: {int: [L{Element},...]}
+    """
+
+    magic = 'SUDSNAP1'
+    protocol = 2
+
+    def __init__(self):
+        self.strings = [None]
+        self.trees = []
+        self.interned = {}
+        self.index = {}
+        self.nodes = {}
+
+    def dumps(self, object):
+        """
+        Get the snapshot of an object graph.
+        @param object: The (root) object.
+        @type object: any
+        @return: The snapshot.
+        @rtype: str
+        """
+        f = StringIO()
+        p = pickle.Pickler(f, self.protocol)
+        p.persistent_id = self.persistent_id
+        current.snapshot = self
+        try:
+            p.dump(object)
+        finally:
+            current.snapshot = None
+        tables = marshal.dumps((self.strings, self.trees))
+        self.interned = {}
+        self.index = {}
+        header = struct.pack('!8sI', self.magic, len(tables))
+        return ''.join((header, tables, f.getvalue()))
+
+    def loads(self, bfr):
+        """
+        Load an object graph from a snapshot.
+        @param bfr: The snapshot.
+        @type bfr: str
+        @return: The (root) object.
+        @rtype: any
+        """
+        n = struct.calcsize('!8sI')
+        magic, length = struct.unpack('!8sI', bfr[:n])
+        if magic != self.magic:
+            raise Exception('not a snapshot')
+        self.strings, self.trees = marshal.loads(bfr[n:n+length])
+        u = pickle.Unpickler(StringIO(bfr[n+length:]))
+        u.persistent_load = self.persistent_load
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return u.load()
+        finally:
+            if collecting:
+                gc.enable()
+
+    def ref(self, node):
+        """
+        Get the (tree, index) of a node, flattening its tree as needed.
+        @param node: A node.
+        @type node: L{Element}
+        @return: The (tree, index) else None when the tree cannot
+            be flattened (contains subclasses of the sax classes).
+        @rtype: tuple
+        """
+        key = id(node)
+        result = self.index.get(key)
+        if result is None:
+            top = node
+            while top.parent is not None:
+                top = top.parent
+            self.flatten(top)
+            result = self.index[key]
+        return result
+
+    def flatten(self, top):
+        """
+        Flatten a tree into a node table.  Each row is a tuple of:
+        (document, parent, prefix, name, expns, text, attributes, prefixes)
+        where the strings are (interned) string indexes.
+        @param top: The top node of a tree.
+        @type top: L{Element}
+        """
+        t = len(self.trees)
+        rows = []
+        nodes = []
+        stack = [(top, -1)]
+        try:
+            while len(stack):
+                node, parent = stack.pop()
+                nodes.append(node)
+                rows.append(self.row(node, parent))
+                n = len(rows)-1
+                children = node.children
+                for i in range(len(children)-1, -1, -1):
+                    stack.append((children[i], n))
+        except ValueError:
+            log.debug('tree not flattened', exc_info=1)
+            self.__index(top, False)
+            return
+        for n, node in enumerate(nodes):
+            self.index[id(node)] = (t, n)
+        self.trees.append(tuple(rows))
+
+    def row(self, node, parent):
+        """
+        Get the node table row for a node.
+        @param node: A node.
+        @type node: L{Element}
+        @param parent: The row (index) of the parent node.
+        @type parent: int
+        @return: The row.
+        @rtype: tuple
+        @raise ValueError: When the node cannot be flattened.
+        """
+        if node.__class__ is Document:
+            if getattr(node, '__dict__', None):
+                raise ValueError(node)
+            document = 1
+        elif node.__class__ is Element:
+            document = 0
+        else:
+            raise ValueError(node)
+        value = self.value
+        attributes = []
+        for a in node.getAttributes():
+            if a.__class__ is not Attribute:
+                raise ValueError(a)
+            attributes.append(value(a.prefix))
+            attributes.append(value(a.name))
+            attributes.append(value(a.value))
+        prefixes = []
+        for p, u in (node._nsprefixes or {}).items():
+            prefixes.append(value(p))
+            prefixes.append(value(u))
+        return (
+            document,
+            parent,
+            value(node.prefix),
+            value(node.name),
+            value(node.expns),
+            value(node.text),
+            tuple(attributes),
+            tuple(prefixes),)
+
+    def value(self, s):
+        """
+        Get the table value of a string.  Strings are interned and the
+        value is: 0 for None, the (positive) string index, the negative
+        (~index) for a L{Text} or a tuple of (index, lang, escaped) for a
+        L{Text} with flags.
+        @param s: A string.
+        @type s: basestring
+        @return: The table value.
+        @rtype: int|tuple
+        @raise ValueError: When the string cannot be flattened.
+        """
+        if s is None:
+            return 0
+        cls = s.__class__
+        if cls is Text:
+            i = self.intern(unicode(s))
+            if s.lang is None and not s.escaped:
+                return ~i
+            return (i, self.value(s.lang), s.escaped)
+        if cls is str or cls is unicode:
+            return self.intern(s)
+        raise ValueError(s)
+
+    def intern(self, s):
+        """
+        Get the index of an interned string.
+        @param s: A string.
+        @type s: basestring
+        @return: The string index.
+        @rtype: int
+        """
+        key = (s.__class__, s)
+        result = self.interned.get(key)
+        if result is None:
+            result = len(self.strings)
+            self.strings.append(s)
+            self.interned[key] = result
+        return result
+
+    def tree(self, t):
+        """
+        Get the (materialized) nodes of a tree.
+        @param t: The tree index.
+        @type t: int
+        @return: The nodes.
+        @rtype: [L{Element},...]
+        """
+        nodes = self.nodes.get(t)
+        if nodes is None:
+            nodes = self.materialize(self.trees[t])
+            self.nodes[t] = nodes
+            self.trees[t] = None
+            if len(self.nodes) == len(self.trees):
+                self.strings = None
+        return nodes
+
+    def materialize(self, rows):
+        """
+        Build the nodes of a flattened tree.
+        @param rows: The node table.
+        @type rows: tuple
+        @return: The nodes.
+        @rtype: [L{Element},...]
+        """
+        value = self.__value
+        nodes = []
+        for document, parent, prefix, name, expns, text, attrs, pfx in rows:
+            if document:
+                node = Document.__new__(Document)
+            else:
+                node = Element.__new__(Element)
+            node.prefix = value(prefix)
+            node.name = value(name)
+            node.expns = value(expns)
+            node.nsscope = None
+            node.text = value(text)
+            node.children = []
+            if len(attrs):
+                attributes = []
+                for i in range(0, len(attrs), 3):
+                    a = Attribute.__new__(Attribute)
+                    a.parent = node
+                    a.prefix = value(attrs[i])
+                    a.name = value(attrs[i+1])
+                    a.value = value(attrs[i+2])
+                    attributes.append(a)
+                node._attributes = attributes
+            else:
+                node._attributes = None
+            if len(pfx):
+                prefixes = {}
+                for i in range(0, len(pfx), 2):
+                    prefixes[value(pfx[i])] = value(pfx[i+1])
+                node._nsprefixes = prefixes
+            else:
+                node._nsprefixes = None
+            node.parent = None
+            if parent >= 0:
+                nodes[parent].append(node)
+            nodes.append(node)
+        return nodes
+
+    def persistent_id(self, object):
+        cls = type(object)
+        if cls is Element or cls is Document:
+            ref = self.ref(object)
+            if ref:
+                return ('n',)+ref
+            return None
+        if cls is Ref:
+            return ('r', object.tree, object.index)
+        return None
+
+    def persistent_load(self, pid):
+        if pid[0] == 'n':
+            return self.tree(pid[1])[pid[2]]
+        if pid[0] == 'r':
+            return Ref(self, pid[1], pid[2])
+        raise pickle.UnpicklingError('invalid persistent id: %s' % str(pid))
+
+    def __value(self, value):
+        if value.__class__ is int:
+            if value >= 0:
+                return self.strings[value]
+            lang = None
+            escaped = False
+            value = ~value
+        else:
+            value, lang, escaped = value
+            lang = self.__value(lang)
+        result = unicode.__new__(Text, self.strings[value])
+        result.lang = lang
+        result.escaped = escaped
+        return result
+
+    def __index(self, top, value):
+        stack = [top]
+        while len(stack):
+            node = stack.pop()
+            self.index[id(node)] = value
+            stack.extend(node.children)
+
+
+class Ref(object):
+    """
+    A (lazy) reference to a node in a snapshot.
+    @ivar snapshot: The loaded snapshot (None when dumping).
+    @type snapshot: L{Snapshot}
+    @ivar tree: The tree index.
+    @type tree: int
+    @ivar index: The node index.
+    @type index: int
+    """
+
+    def __init__(self, snapshot, tree, index):
+        """
+        @param snapshot: The loaded snapshot (None when dumping).
+        @type snapshot: L{Snapshot}
+        @param tree: The tree index.
+        @type tree: int
+        @param index: The node index.
+        @type index: int
+        """
+        self.snapshot = snapshot
+        self.tree = tree
+        self.index = index
+
+    def resolve(self):
+        """
+        Get the referenced node (materializing its tree as needed).
+        @return: The node.
+        @rtype: L{Element}
+        """
+        return self.snapshot.tree(self.tree)[self.index]
+
+
+class Lazy(object):
+    """
+    A (non-data) descriptor that resolves an attribute that was stored as
+    a L{Ref} in a snapshot.  The node replaces the reference in the object
+    I{__dict__} when first used.
+    @ivar name: The attribute name.
+    @type name: str
+    @ivar key: The name of the reference in the object I{__dict__}.
+    @type key: str
+    """
+
+    def __init__(self, name):
+        """
+        @param name: The attribute name.
+        @type name: str
+        """
+        self.name = name
+        self.key = '%s.ref' % name
+
+    def __get__(self, object, cls=None):
+        if object is None:
+            return self
+        ref = object.__dict__.pop(self.key, None)
+        if ref is None:
+            raise AttributeError(self.name)
+        node = ref.resolve()
+        object.__dict__[self.name] = node
+        return node
+
+
+def getstate(object, names=('root',)):
+    """
+    Get the state (to be pickled) of an object that has (lazy) node
+    attributes.  When dumping a L{Snapshot}, the nodes are replaced by
+    references that are resolved by a L{Lazy} descriptor when loaded.
+    @param object: An object.
+    @type object: any
+    @param names: The names of the (lazy) node attributes.
+    @type names: (str,...)
+    @return: The state.
+    @rtype: dict
+    """
+    state = object.__dict__
+    snapshot = getattr(current, 'snapshot', None)
+    if snapshot is None:
+        return state
+    state = state.copy()
+    for name in names:
+        node = state.get(name)
+        if node.__class__ is not Element:
+            continue
+        ref = snapshot.ref(node)
+        if not ref:
+            continue
+        del state[name]
+        state['%s.ref' % name] = Ref(None, ref[0], ref[1])
+    return state
@@ -35,6 +35,12 @@ class Request:
     @type message: str
     @ivar headers: The http headers to be used for the request.
     @type headers: dict
+    @ivar feeder: An (optional) incremental parser that transports may
+        feed the reply to as it is received.
+    @type feeder: L{txsuds.sax.parser.Feeder}
+    @ivar reply: The reply (code and headers) to an opened url when
+        provided by the transport.
+    @type reply: L{Reply}
     """
 
     def __init__(self, url, message=None):
@@ -47,6 +53,8 @@ class Request:
         self.url = url
         self.headers = {}
         self.message = message
+        self.feeder = None
+        self.reply = None
 
     def __str__(self):
         s = []
@@ -66,6 +74,9 @@ class Reply:
     @type message: str
     @ivar headers: The http headers to be used for the request.
     @type headers: dict
+    @ivar document: The reply document when it was parsed by the
+        request I{feeder} instead of being returned as text.
+    @type document: L{txsuds.sax.document.Document}
     """
 
     def __init__(self, code, headers, message):
@@ -80,6 +91,7 @@ class Reply:
         self.code = code
         self.headers = headers
         self.message = message
+        self.document = None
 
     def __str__(self):
         s = []
@@ -105,7 +117,10 @@ class Transport:
 
     def open(self, request):
         """
-        Open the url in the specified request.
+        Open the url in the specified request.  Transports that support
+        conditional requests (the request has I{If-None-Match} or
+        I{If-Modified-Since} headers) raise a L{TransportError} with
+        httpcode 304 when the document has not been modified.
         @param request: A transport request.
         @type request: L{Request}
         @return: An input stream.
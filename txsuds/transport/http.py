@@ -57,10 +57,15 @@ class HttpTransport(Transport):
         try:
             url = request.url
             log.debug('opening (%s)', url)
-            u2request = u2.Request(url)
+            u2request = u2.Request(url, None, request.headers)
             self.proxy = self.options.proxy
-            return self.u2open(u2request)
+            fp = self.u2open(u2request)
+            request.reply = Reply(fp.code, fp.headers.dict, None)
+            return fp
         except u2.HTTPError, e:
+            request.reply = Reply(e.code, getattr(e.hdrs, 'dict', {}), None)
+            if e.code == 304:
+                raise TransportError('not modified', 304, e.fp)
             raise TransportError(str(e), e.code, e.fp)
 
     def send(self, request):
@@ -52,6 +52,26 @@ class Options(Skin):
                            that contains the certificate.
                 - type: {basestring}
                 - default: None
+        - B{persistent} - Keep connections alive and reuse them across
+                          requests to the same host.
+                - type: I{bool}
+                - default: True
+        - B{maxPersistentPerHost} - The maximum number of idle connections
+                          kept open per host.
+                - type: I{int}
+                - default: 2
+        - B{cachedConnectionTimeout} - The number of seconds an idle
+                          connection is kept open before it is closed.
+                - type: I{float}
+                - default: 240
+        - B{retryAutomatically} - Retry idempotent requests that failed
+                          on a cached connection the server had closed.
+                - type: I{bool}
+                - default: True
+        - B{maxBodySize} - The maximum size (bytes) of a reply body.  The
+                          connection is aborted when it is exceeded.
+                - type: I{int}
+                - default: 0 (unlimited)
 
         @see twisted.internet._sslverify.OpenSSLCertificateOptions
     """
@@ -74,6 +94,11 @@ class Options(Skin):
             Definition('enableSingleUseKeys', bool, True),
             Definition('enableSessions', bool, True),
             Definition('fixBrokenPeers', bool, False),
-            Definition('enableSessionTickets', bool, False)
+            Definition('enableSessionTickets', bool, False),
+            Definition('persistent', bool, True),
+            Definition('maxPersistentPerHost', int, 2),
+            Definition('cachedConnectionTimeout', (int,float), 240),
+            Definition('retryAutomatically', bool, True),
+            Definition('maxBodySize', int, 0),
         ]
         Skin.__init__(self, domain, definitions, kwargs)
@@ -2,6 +2,8 @@ import logging
 import os
 import urllib
 import urlparse
+from copy import deepcopy
+from cStringIO import StringIO
 
 log = logging.getLogger(__name__)
 
@@ -10,44 +12,150 @@ from twisted.internet.endpoints import TCP4ClientEndpoint
 from twisted.internet.protocol  import Protocol
 from twisted.internet.ssl       import CertificateOptions
 from twisted.web.client         import Agent, ProxyAgent, WebClientContextFactory
+from twisted.web.client         import HTTPConnectionPool
 from twisted.web.http_headers   import Headers
-from twisted.web.iweb           import IBodyProducer
+from twisted.web.iweb           import IBodyProducer, UNKNOWN_LENGTH
 from OpenSSL                    import crypto
 from zope.interface             import implements
 
-from txsuds.transport import Reply, Transport
+from txsuds.transport import Reply, Transport, TransportError
+from txsuds.properties import Unskin
 
 
 class StringResponseConsumer(Protocol):
     """
-    Protocol that consumes the entire response body into a string and provides
-    a simple callback interface for the user to be triggered when the response
-    is complete.
-
-    @ivar response:  The response that filled us.
-    @ivar _finished: Deferred that is triggered when the body is completed.
+    Protocol that consumes the entire response body and provides a simple
+    callback interface for the user to be triggered when the response is
+    complete.  The body is collected as a list of the chunks received so
+    it is copied only once, when (and if) it is joined by L{getBody}.
+
+    @ivar response:    The response that filled us.
+    @ivar chunks:      The body chunks received, in order.
+    @ivar length:      The number of body bytes received.
+    @ivar maxBodySize: The maximum number of body bytes accepted (0=unlimited).
+    @ivar _finished:   Deferred that is triggered when the body is completed.
+    @ivar _error:      The error that caused the body to be abandoned.
     """
-    def __init__(self):
-        self._finished = defer.Deferred()
-        self.response  = None
-        self.body      = ""
+    def __init__(self, maxBodySize=0, expected=UNKNOWN_LENGTH):
+        """
+        @param maxBodySize: The maximum number of body bytes accepted.  The
+                            connection is aborted once it is exceeded.
+        @type  maxBodySize: int
+        @param expected:    The body length announced by the server.
+        @type  expected:    int
+        """
+        self._finished   = defer.Deferred()
+        self._error      = None
+        self.response    = None
+        self.chunks      = []
+        self.length      = 0
+        self.maxBodySize = maxBodySize
+        self.expected    = expected
 
     def getDeferred(self):
         """ Return the deferred that is triggered after full completion. """
         return self._finished
 
+    def getBody(self):
+        """
+        Get the complete response body.  The chunks are joined on the
+        first call and replaced by the result.
+
+        @return: The response body.
+        @rtype:  str
+        """
+        if len(self.chunks) != 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0]
+
+    def connectionMade(self):
+        """ Abort as soon as the announced length is known to be too big. """
+        if self.expected is not UNKNOWN_LENGTH:
+            self._checkLength(self.expected)
+
     def dataReceived(self, data):
-        self.body = self.body + data
+        if self._error is not None:
+            return
+        self.length += len(data)
+        if self._checkLength(self.length):
+            self.consume(data)
+
+    def consume(self, data):
+        """ Keep a received chunk of the body. """
+        self.chunks.append(data)
+
+    def abort(self, error):
+        """
+        Abandon the body and abort the connection.
+
+        @param error: The error the request fails with.
+        @type  error: Exception
+        """
+        self._error = error
+        self.chunks = []
+        self.transport.stopProducing()
+
+    def _checkLength(self, length):
+        """
+        Abort the connection when I{length} exceeds the maximum body size.
+
+        @return: True when the length is acceptable.
+        @rtype:  bool
+        """
+        if not self.maxBodySize or length <= self.maxBodySize:
+            return True
+        reason = "reply body exceeds %d bytes" % self.maxBodySize
+        log.error(reason)
+        self.abort(TransportError(reason, 413, StringIO()))
+        return False
 
     def connectionLost(self, reason):
         """ Callback to finished with copy of ourselves. """
-        self._finished.callback(self)
+        if self._error is not None:
+            self._finished.errback(self._error)
+        else:
+            self._finished.callback(self)
 
     def responseWithoutBody(self):
         """ Called when the response does not contain a body. """
         self._finished.callback(self)
 
 
+class FeedingResponseConsumer(StringResponseConsumer):
+    """
+    Protocol that pushes each chunk of the response body into an incremental
+    parser as it is received, so the document is built while the rest of the
+    body is still on the wire and the body text is never kept.
+
+    @ivar feeder:   The incremental parser.
+    @ivar document: The parsed document (None when the body is empty).
+    """
+    def __init__(self, feeder, maxBodySize=0, expected=UNKNOWN_LENGTH):
+        """
+        @param feeder: The incremental parser the body is fed to.
+        @type  feeder: L{txsuds.sax.parser.Feeder}
+        """
+        StringResponseConsumer.__init__(self, maxBodySize, expected)
+        self.feeder   = feeder
+        self.document = None
+
+    def consume(self, data):
+        try:
+            self.feeder.feed(data)
+        except Exception, e:
+            log.error("reply parsing failed: %s", e)
+            self.abort(e)
+
+    def connectionLost(self, reason):
+        """ Complete the parse and callback to finished. """
+        if self._error is None and self.length > 0:
+            try:
+                self.document = self.feeder.close()
+            except Exception, e:
+                self._error = e
+        StringResponseConsumer.connectionLost(self, reason)
+
+
 class StringProducer(object):
     """
     Simple wrapper around a string that will produce that string with the correct
@@ -87,8 +195,17 @@ class ContextFactory(CertificateOptions, WebClientContextFactory):
 
 class TwistedTransport(Transport):
     """
-    Custom transport that uses the Twisted REST client.
+    Custom transport that uses the Twisted REST client.  Connections are
+    taken from an L{HTTPConnectionPool} owned by the transport so that
+    requests to the same host reuse open (and already negotiated)
+    connections.  The pool is shared by copies of the transport made
+    by L{txsuds.client.Client.clone} until their pool options differ.
+
+    @cvar poolOptions: The names of the options the pool is built from.
     """
+    poolOptions = ('persistent', 'maxPersistentPerHost',
+                   'cachedConnectionTimeout', 'retryAutomatically')
+
     def __init__(self):
         """
         Constructor.
@@ -98,6 +215,9 @@ class TwistedTransport(Transport):
         self.options = Options()
         del Options
         self._contextFactory = None
+        self._pool = None
+        self._poolKey = None
+        self._agents = {}
 
     def _getContextFactory(self):
         """
@@ -137,6 +257,63 @@ class TwistedTransport(Transport):
         return self._contextFactory
     contextFactory = property(_getContextFactory)
 
+    def _getPool(self):
+        """
+        Helper method that lazily constructs the connection pool for this
+        transport.  The pool is rebuilt (and the agents using it dropped)
+        when the pool options have changed since it was constructed.
+        """
+        key = tuple([getattr(self.options, n) for n in self.poolOptions])
+        if self._pool is not None and self._poolKey == key:
+            return self._pool
+
+        (persistent, maxPersistentPerHost,
+         cachedConnectionTimeout, retryAutomatically) = key
+        pool = HTTPConnectionPool(reactor, persistent = persistent)
+        pool.maxPersistentPerHost = maxPersistentPerHost
+        pool.cachedConnectionTimeout = cachedConnectionTimeout
+        pool.retryAutomatically = retryAutomatically
+        self._pool = pool
+        self._poolKey = key
+        self._agents = {}
+        return self._pool
+    pool = property(_getPool)
+
+    def _getAgent(self, proxy):
+        """
+        Helper method that returns the (cached) agent used to send requests
+        either directly or through the given proxy.  Agents are cached by
+        proxy and connect timeout.
+        """
+        pool = self.pool
+        key = (proxy, self.options.timeout)
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+
+        if proxy is not None:
+            (hostname, port) = proxy.split(":")
+            endpoint = TCP4ClientEndpoint(reactor, hostname, int(port),
+                                          timeout = self.options.timeout)
+            agent = ProxyAgent(endpoint, pool = pool)
+        else:
+            agent = Agent(reactor, self.contextFactory,
+                          connectTimeout = self.options.timeout,
+                          pool = pool)
+        self._agents[key] = agent
+        return agent
+
+    def close(self):
+        """
+        Close the idle connections held in the connection pool.
+
+        @return: A deferred that fires when the connections are closed.
+        @rtype:  L{defer.Deferred}
+        """
+        if self._pool is None:
+            return defer.succeed(None)
+        return self._pool.closeCachedConnections()
+
     @defer.inlineCallbacks
     def _request(self, request, method):
         """
@@ -158,22 +335,23 @@ class TwistedTransport(Transport):
         url_parts = urlparse.urlparse(request.url)
         proxy = self.options.proxy.get(url_parts.scheme, None)
 
-        # Construct an agent to send the request.
-        if proxy is not None:
-            (hostname, port) = proxy.split(":")
-            endpoint = TCP4ClientEndpoint(reactor, hostname, int(port),
-                                          timeout = self.options.timeout)
-            agent = ProxyAgent(endpoint)
-        else:
-            agent = Agent(reactor, self.contextFactory,
-                          connectTimeout = self.options.timeout)
+        # Get the agent to send the request.
+        agent = self._getAgent(proxy)
 
         url = request.url.encode("utf-8")
         producer = StringProducer(request.message or "")
         response = yield agent.request(method, url, headers, producer)
 
-        # Construct a simple response consumer and give it the response body.
-        consumer = StringResponseConsumer()
+        # Construct a response consumer and give it the response body.  When
+        # the request carries an incremental parser, the body is parsed as
+        # it is received instead of being collected.
+        if request.feeder is not None:
+            consumer = FeedingResponseConsumer(request.feeder,
+                                               self.options.maxBodySize,
+                                               response.length)
+        else:
+            consumer = StringResponseConsumer(self.options.maxBodySize,
+                                              response.length)
         response.deliverBody(consumer)
         yield consumer.getDeferred()
         consumer.response = response
@@ -182,7 +360,9 @@ class TwistedTransport(Transport):
     @defer.inlineCallbacks
     def open(self, request):
         """
-        Open the url in the specified request.
+        Open the url in the specified request.  The reply code and headers
+        are set on the request.  A conditional request for a document that
+        has not been modified raises a L{TransportError} with httpcode 304.
 
         @param request: A transport request.
         @type  request: L{Request}
@@ -202,7 +382,13 @@ class TwistedTransport(Transport):
             defer.returnValue(content)
 
         consumer = yield self._request(request, "GET")
-        defer.returnValue(consumer.body)
+        response = consumer.response
+        request.reply = Reply(response.code,
+                              dict(response.headers.getAllRawHeaders()),
+                              None)
+        if response.code == 304:
+            raise TransportError('not modified', 304, StringIO())
+        defer.returnValue(consumer.getBody())
 
     @defer.inlineCallbacks
     def send(self, request):
@@ -222,5 +408,23 @@ class TwistedTransport(Transport):
         """
         consumer = yield self._request(request, "POST")
         res_headers = dict(consumer.response.headers.getAllRawHeaders())
-        result = Reply(consumer.response.code, res_headers, consumer.body)
+        result = Reply(consumer.response.code, res_headers,
+                       consumer.getBody())
+        if request.feeder is not None:
+            result.document = consumer.document
         defer.returnValue(result)
+
+    def __deepcopy__(self, memo={}):
+        """
+        Copy the transport.  The options are copied deeply (the CA
+        certificates, which cannot be copied, are shared) and only the
+        connection pool is shared with the copy.
+        """
+        clone = self.__class__()
+        p = Unskin(self.options)
+        cp = Unskin(clone.options)
+        certs = dict([(id(c), c) for c in self.options.caCerts or ()])
+        cp.update(deepcopy(p.defined, certs))
+        clone._pool = self.pool
+        clone._poolKey = self._poolKey
+        return clone
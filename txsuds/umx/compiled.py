@@ -0,0 +1,361 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the (LGPL) GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Library Lesser General Public License for more details at
+# ( http://www.gnu.org/licenses/lgpl.html ).
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+
+"""
+Provides the compiled (planned) typed unmarshaller.
+"""
+
+from logging import getLogger
+from txsuds import *
+from txsuds.umx.typed import Typed
+from txsuds.umx.core import reserved
+from txsuds.umx.attrlist import AttrList
+from txsuds.sax import Namespace
+from txsuds.sax.text import Text
+from txsuds.sudsobject import Factory, Object, merge
+from txsuds.xsd.query import BlindQuery, qualify
+
+log = getLogger(__name__)
+
+
+class Plan:
+    """
+    A compiled unmarshalling plan for a schema type.  The plan holds what
+    the L{Typed} unmarshaller would resolve for each node of the type so
+    that it is resolved once rather than for every node.
+    @ivar type: The schema type of the node.
+    @type type: L{xsd.sxbase.SchemaObject}
+    @ivar real: The I{true} (resolved) type of the node.
+    @type real: L{xsd.sxbase.SchemaObject}
+    @ivar cls: The class of the unmarshalled object, else None when the
+        real type is not named.
+    @type cls: I{class}
+    @ivar unbounded: The node is unbounded (a list).
+    @type unbounded: bool
+    @ivar nillable: The node is nillable.
+    @type nillable: bool
+    @ivar translate: The text (value) translator of the real type.
+    @type translate: I{function}
+    @ivar children: The (compiled) plans of the children by name or by
+        (name, xsi:type).
+    @type children: {str|tuple: L{Plan}}
+    @ivar attributes: The value translators of the attributes by name,
+        None when the attribute is not found.
+    @type attributes: {str: I{function}}
+    """
+
+    def __init__(self, type, known=None):
+        """
+        @param type: The schema type of the node.
+        @type type: L{xsd.sxbase.SchemaObject}
+        @param known: The type specified by I{xsi:type}.
+        @type known: L{xsd.sxbase.SchemaObject}
+        """
+        self.type = type
+        resolved = type.resolve()
+        if known is None:
+            self.real = resolved.resolve()
+        else:
+            self.real = known.resolve()
+        if self.real.name is None:
+            self.cls = None
+        else:
+            self.cls = Factory.subclass(self.real.name, Object)
+        self.unbounded = type.unbounded()
+        self.nillable = \
+            ( type.nillable or (resolved.builtin() and resolved.nillable) )
+        self.translate = self.real.resolve().translate
+        self.children = {}
+        self.attributes = {}
+
+    def attribute(self, name):
+        """
+        Get the value translator of an attribute.
+        @param name: An attribute name.
+        @type name: str
+        @return: The translator, else None when not found.
+        @rtype: I{function}
+        """
+        if name in self.attributes:
+            return self.attributes[name]
+        attr, ancestry = self.real.get_attribute(name)
+        if attr is None:
+            translate = None
+        else:
+            translate = attr.resolve().resolve().translate
+        self.attributes[name] = translate
+        return translate
+
+
+class Compiled(Typed):
+    """
+    A I{typed} XML unmarshaller that runs compiled L{Plan}s.  The plans
+    are compiled when a type is first unmarshalled and (when a I{plans}
+    cache is shared) are reused by later replies.  The result is the same
+    as produced by the L{Typed} unmarshaller.
+    @ivar plans: The (root) plans by (type, xsi:type).
+    @type plans: dict
+    """
+
+    def __init__(self, schema, plans=None):
+        """
+        @param schema: A schema object.
+        @type schema: L{xsd.schema.Schema}
+        @param plans: The (shared) plans cache.
+        @type plans: dict
+        """
+        Typed.__init__(self, schema)
+        if plans is None:
+            plans = {}
+        self.plans = plans
+
+    def process(self, node, type=None):
+        """
+        Process an object graph representation of the xml L{node}.
+        @param node: An XML tree.
+        @type node: L{sax.element.Element}
+        @param type: The I{optional} schema type.
+        @type type: L{xsd.sxbase.SchemaObject}
+        @return: A suds object.
+        @rtype: L{Object}
+        """
+        if type is None:
+            return Typed.process(self, node, type)
+        return self.run(node, self.plan(node, type))
+
+    def plan(self, node, type):
+        """
+        Get the (compiled) plan of a (root) node.
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @param type: The schema type of the node.
+        @type type: L{xsd.sxbase.SchemaObject}
+        @return: The plan of the node.
+        @rtype: L{Plan}
+        """
+        ref = self.xsitype(node)
+        key = (type, ref)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = Plan(type, self.known(ref))
+            self.plans[key] = plan
+        return plan
+
+    def run(self, node, plan):
+        """
+        Unmarshal a node using its plan.
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @param plan: The plan for the node.
+        @type plan: L{Plan}
+        @return: The unmarshalled value.
+        @rtype: any
+        """
+        data, attributes = self.begin(node, plan)
+        for child in node.children:
+            cplan = self.child(child, plan)
+            self.add(data, child, cplan, self.run(child, cplan))
+        return self.finish(node, data, plan, attributes)
+
+    def begin(self, node, plan):
+        """
+        Begin unmarshalling a node: create the data object and set the
+        (unmarshalled) attributes.  The children are then added using
+        L{add} and the node finished using L{finish}.
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @param plan: The plan for the node.
+        @type plan: L{Plan}
+        @return: The data object and the node attributes.
+        @rtype: (L{Object}, L{AttrList})
+        """
+        if plan.cls is None:
+            data = Factory.object(node.name)
+        else:
+            data = plan.cls()
+        data.__metadata__.sxtype = plan.real
+        attributes = AttrList(node.getAttributes())
+        for attr in attributes.real():
+            name = attr.name
+            value = attr.value
+            translate = plan.attribute(name)
+            if translate is None:
+                log.warn('attribute (%s) type, not-found', name)
+            elif value is not None:
+                value = translate(value)
+            key = '_%s' % reserved.get(name, name)
+            setattr(data, key, value)
+        return (data, attributes)
+
+    def add(self, data, child, cplan, cval):
+        """
+        Add the unmarshalled value of a child node to the data object.
+        @param data: The data object of the parent node.
+        @type data: L{Object}
+        @param child: The child node.
+        @type child: L{sax.element.Element}
+        @param cplan: The plan of the child node.
+        @type cplan: L{Plan}
+        @param cval: The unmarshalled value of the child node.
+        @type cval: any
+        """
+        key = reserved.get(child.name, child.name)
+        if key in data:
+            v = getattr(data, key)
+            if isinstance(v, list):
+                v.append(cval)
+            else:
+                setattr(data, key, [v, cval])
+            return
+        if cplan.unbounded:
+            if cval is None:
+                setattr(data, key, [])
+            else:
+                setattr(data, key, [cval,])
+        else:
+            setattr(data, key, cval)
+
+    def finish(self, node, data, plan, attributes):
+        """
+        Finish unmarshalling a node (started using L{begin}).
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @param data: The data object.
+        @type data: L{Object}
+        @param plan: The plan for the node.
+        @type plan: L{Plan}
+        @param attributes: The node attributes.
+        @type attributes: L{AttrList}
+        @return: The unmarshalled value.
+        @rtype: any
+        """
+        text = None
+        if node.hasText():
+            text = plan.translate(node.getText())
+        return self.result(node, data, text, plan, attributes)
+
+    def leaf(self, node, plan):
+        """
+        Unmarshal a node that has neither children nor attributes (without
+        creating the data object).  The result is the same as L{run}.
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @param plan: The plan for the node.
+        @type plan: L{Plan}
+        @return: The unmarshalled value.
+        @rtype: any
+        """
+        text = None
+        if node.hasText():
+            text = plan.translate(node.getText())
+        if text is None:
+            if plan.nillable:
+                return None
+            else:
+                return Text('')
+        if isinstance(text, basestring):
+            return Text(text)
+        else:
+            return text
+
+    def child(self, node, plan):
+        """
+        Get the (compiled) plan of a child node.
+        @param node: A child node.
+        @type node: L{sax.element.Element}
+        @param plan: The plan of the parent node.
+        @type plan: L{Plan}
+        @return: The plan of the child.
+        @rtype: L{Plan}
+        @raise TypeNotFound: When the child is not found.
+        """
+        ref = self.xsitype(node)
+        if ref is None:
+            key = node.name
+        else:
+            key = (node.name, ref)
+        cplan = plan.children.get(key)
+        if cplan is None:
+            type, ancestry = plan.real.get_child(node.name)
+            if type is None:
+                log.error(self.resolver.schema)
+                raise TypeNotFound(node.qname())
+            cplan = Plan(type, self.known(ref))
+            plan.children[key] = cplan
+        return cplan
+
+    def xsitype(self, node):
+        """
+        Get the (qualified) I{xsi:type} of a node.
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @return: The qref, else None.
+        @rtype: qref
+        """
+        ref = node.get('type', Namespace.xsins)
+        if ref is None:
+            return None
+        return qualify(ref, node, node.namespace())
+
+    def known(self, ref):
+        """
+        Get the type referenced by I{xsi:type}.
+        @param ref: The I{xsi:type} qref.
+        @type ref: qref
+        @return: The type, else None.
+        @rtype: L{xsd.sxbase.SchemaObject}
+        """
+        if ref is None:
+            return None
+        query = BlindQuery(ref)
+        return query.execute(self.resolver.schema)
+
+    def result(self, node, data, text, plan, attributes):
+        """
+        Get the unmarshalled value of a node.  See: L{Core.postprocess}.
+        @param node: An XML node.
+        @type node: L{sax.element.Element}
+        @param data: The unmarshalled object.
+        @type data: L{Object}
+        @param text: The (translated) text.
+        @type text: any
+        @param plan: The plan for the node.
+        @type plan: L{Plan}
+        @param attributes: The node attributes.
+        @type attributes: L{AttrList}
+        @return: The unmarshalled value.
+        @rtype: any
+        """
+        if len(node.children) and node.hasText():
+            return node
+        if attributes.rlen() and \
+            not len(node.children) and \
+            node.hasText():
+                p = Factory.property(node.name, node.getText())
+                return merge(data, p)
+        if len(data):
+            return data
+        lang = attributes.lang()
+        if node.isnil():
+            return None
+        if not len(node.children) and text is None:
+            if plan.nillable:
+                return None
+            else:
+                return Text('', lang=lang)
+        if isinstance(text, basestring):
+            return Text(text, lang=lang)
+        else:
+            return text
@@ -81,7 +81,7 @@ class Core:
         node = content.node
         if len(node.children) and node.hasText():
             return node
-        attributes = AttrList(node.attributes)
+        attributes = AttrList(node.getAttributes())
         if attributes.rlen() and \
             not len(node.children) and \
             node.hasText():
@@ -109,7 +109,7 @@ class Core:
         @param content: The current content being unmarshalled.
         @type content: L{Content}
         """
-        attributes = AttrList(content.node.attributes)
+        attributes = AttrList(content.node.getAttributes())
         for attr in attributes.real():
             name = attr.name
             value = attr.value
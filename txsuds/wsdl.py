@@ -30,6 +30,7 @@ from txsuds.xsd.schema import Schema, SchemaCollection
 from txsuds.xsd.query import ElementQuery
 from txsuds.sudsobject import Object, Facade, Metadata
 from txsuds.reader import DocumentReader
+from txsuds.snapshot import Lazy, getstate
 from urlparse import urljoin
 import re
 
@@ -49,6 +50,8 @@ class WObject(Object):
     @type root: L{Element}
     """
 
+    root = Lazy('root')
+
     def __init__(self, root, definitions=None):
         """
         @param root: An XML root element.
@@ -71,6 +74,9 @@ class WObject(Object):
         """
         pass
 
+    def __getstate__(self):
+        return getstate(self)
+
 
 class NamedObject(WObject):
     """
@@ -121,20 +127,29 @@ class Definitions(WObject):
     @type bindings: [L{Binding},...]
     @ivar service: The service object.
     @type service: L{Service}
+    @ivar semaphore: Limits the number of documents downloaded at once
+        while loading (shared with the imported definitions), else None.
+    @type semaphore: L{defer.DeferredSemaphore}
     """
 
     Tag = 'definitions'
 
-    def __init__(self, url, options):
+    def __init__(self, url, options, semaphore=None):
         """
         @param url: A URL to the WSDL.
         @type url: str
         @param options: An options dictionary.
         @type options: L{options.Options}
+        @param semaphore: The download semaphore of the importing
+            definitions.  A new one is created when not specified.
+        @type semaphore: L{defer.DeferredSemaphore}
         """
         WObject.__init__(self, root = None)
         self.id = objid(self)
         self.options = options
+        if semaphore is None and options.maxImports:
+            semaphore = defer.DeferredSemaphore(options.maxImports)
+        self.semaphore = semaphore
         self.types = []
         self.schema = None
         self.children = []
@@ -150,10 +165,15 @@ class Definitions(WObject):
         pmd.wrappers['schema'] = repr
 
     @defer.inlineCallbacks
-    def build(self):
+    def build(self, imported=False):
+        """
+        Read and build the definitions.
+        @param imported: The definitions are imported by another WSDL and
+            are not pruned (see: L{prune}).
+        @type imported: bool
+        """
         log.debug('reading wsdl at: %s ...', self.url)
-        reader = DocumentReader(self.options)
-        d = yield reader.open(self.url)
+        d = yield self.download(self.url)
         root = d.root()
         WObject.__init__(self, root)
         self.root = root
@@ -162,12 +182,30 @@ class Definitions(WObject):
         self.children.sort()
         yield self.open_imports()
         self.resolve()
-        yield self.build_schema()
+        roots = None
+        if self.options.operations and not imported:
+            roots = self.prune(self.options.operations)
+        yield self.build_schema(roots)
         self.set_wrapped()
         for s in self.services:
             self.add_methods(s)
         log.debug("wsdl at '%s' loaded:\n%s", self.url, self)
 
+    def download(self, url):
+        """
+        Download a (WSDL or XSD) document.  At most I{maxImports}
+        documents are downloaded at once by the definitions (and the
+        definitions they import) being loaded.
+        @param url: The document URL.
+        @type url: str
+        @return: A deferred that fires with the document.
+        @rtype: L{defer.Deferred}
+        """
+        reader = DocumentReader(self.options)
+        if self.semaphore is None:
+            return reader.open(url)
+        return self.semaphore.run(reader.open, url)
+
     def mktns(self, root):
         """ Get/create the target namespace """
         tns = root.get('targetNamespace')
@@ -204,18 +242,85 @@ class Definitions(WObject):
 
     @defer.inlineCallbacks
     def open_imports(self):
-        """ Import the I{imported} WSDLs. """
-        for imp in self.imports:
-            yield imp.load(self)
+        """
+        Import the I{imported} WSDLs.  The imported documents are opened
+        concurrently and then merged in document order.  The downloads
+        are limited by the (shared) L{semaphore} rather than the imports
+        so that nested imports never wait for a slot held by their parent.
+        """
+        opened = [imp.open(self) for imp in self.imports]
+        results = yield defer.DeferredList(opened, consumeErrors=True)
+        for imp, (success, result) in zip(self.imports, results):
+            if not success:
+                result.raiseException()
+            imp.merge(self, result)
 
     def resolve(self):
         """ Tell all children to resolve themselves """
         for c in self.children:
             c.resolve(self)
 
+    def prune(self, names):
+        """
+        Prune the operations (of the port types and bindings) that are not
+        named and the messages that are no longer used.
+        @param names: The names of the operations to keep.
+        @type names: [str,...]
+        @return: The references (qref) of the schema elements and types
+            used by the message parts of the remaining operations.
+        @rtype: [qref,...]
+        @raise L{MethodNotFound}: When a named operation is not found.
+        """
+        names = set(names)
+        found = set()
+        messages = set()
+        parts = []
+        for pt in self.port_types.values():
+            for name, op in pt.operations.items():
+                if name not in names:
+                    del pt.operations[name]
+                    continue
+                found.add(name)
+                used = [op.input, op.output]
+                used += [f.message for f in op.faults]
+                for m in used:
+                    messages.add(id(m))
+                    parts += m.parts
+        for b in self.bindings.values():
+            for name, op in b.operations.items():
+                if name not in names:
+                    del b.operations[name]
+                    continue
+                soap = op.soap
+                for header in soap.input.headers + soap.output.headers:
+                    parts.append(header.part)
+        missing = names - found
+        if len(missing):
+            raise MethodNotFound(', '.join(sorted(missing)))
+        used = set([id(p) for p in parts])
+        for qref, m in self.messages.items():
+            if id(m) in messages:
+                continue
+            if [p for p in m.parts if id(p) in used]:
+                continue
+            del self.messages[qref]
+        roots = []
+        for p in parts:
+            if p.element is not None:
+                roots.append(p.element)
+            if p.type is not None:
+                roots.append(p.type)
+        log.debug('pruned to operations: %s', sorted(found))
+        return roots
+
     @defer.inlineCallbacks
-    def build_schema(self):
-        """ Process L{Types} objects and create the schema collection """
+    def build_schema(self, roots=None):
+        """
+        Process L{Types} objects and create the schema collection.
+        @param roots: The references (qref) of the elements and types that
+            are used, else None (all).
+        @type roots: [qref,...]
+        """
         container = SchemaCollection(self)
         for t in [t for t in self.types if t.local()]:
             for root in t.contents():
@@ -225,7 +330,7 @@ class Definitions(WObject):
             root = Element.buildPath(self.root, 'types/schema')
             schema = Schema(root, self.url, self.options, container)
             container.add(schema)
-        self.schema = yield container.load(self.options)
+        self.schema = yield container.load(self.options, roots)
         for s in [t.schema() for t in self.types if t.imported()]:
             self.schema.merge(s)
         defer.returnValue(self.schema)
@@ -276,8 +381,8 @@ class Definitions(WObject):
                         body.wrapped = True
 
     def __getstate__(self):
-        nopickle = ('options',)
-        state = self.__dict__.copy()
+        nopickle = ('options', 'semaphore')
+        state = dict(getstate(self))
         for k in nopickle:
             if k in state:
                 del state[k]
@@ -315,20 +420,42 @@ class Import(WObject):
     @defer.inlineCallbacks
     def load(self, definitions):
         """ Load the object by opening the URL """
+        d = yield self.open(definitions)
+        self.merge(definitions, d)
+
+    @defer.inlineCallbacks
+    def open(self, definitions):
+        """
+        Open (download and build) the imported document.
+        @param definitions: The importing definitions.
+        @type definitions: L{Definitions}
+        @return: The imported definitions.
+        @rtype: L{Definitions}
+        """
         url = self.location
         log.debug('importing (%s)', url)
         if '://' not in url:
             url = urljoin(definitions.url, url)
         options = definitions.options
-        d = Definitions(url, options)
-        yield d.build()
+        d = Definitions(url, options, definitions.semaphore)
+        yield d.build(imported=True)
+        defer.returnValue(d)
+
+    def merge(self, definitions, d):
+        """
+        Merge the imported document into the importing definitions.
+        @param definitions: The importing definitions.
+        @type definitions: L{Definitions}
+        @param d: The imported definitions.
+        @type d: L{Definitions}
+        """
         if d.root.match(Definitions.Tag, wsdlns):
             self.import_definitions(definitions, d)
             return
         if d.root.match(Schema.Tag, Namespace.xsdns):
             self.import_schema(definitions, d)
             return
-        raise Exception('document at "%s" is unknown' % url)
+        raise Exception('document at "%s" is unknown' % d.url)
 
     def import_definitions(self, definitions, d):
         """ import/merge wsdl definitions """
@@ -80,6 +80,7 @@ class Query(Object):
         if result is None:
             log.debug('%s, not-found', self.ref)
             return
+        result.dereference()
         if self.resolved:
             result = result.resolve()
         log.debug('%s, found as: %s', self.ref, Repr(result))
@@ -160,14 +161,10 @@ class AttrQuery(Query):
 
     def __deepsearch(self, schema):
         from txsuds.xsd.sxbasic import Attribute
-        result = None
-        for e in schema.all:
-            result = e.find(self.ref, (Attribute,))
-            if self.filter(result):
-                result = None
-            else:
-                break
-        return result
+        for result in schema.nested(self.ref, Attribute):
+            if not self.filter(result):
+                return result
+        return None
 
 
 class AttrGroupQuery(Query):
@@ -198,11 +195,7 @@ class ElementQuery(Query):
 
     def __deepsearch(self, schema):
         from txsuds.xsd.sxbasic import Element
-        result = None
-        for e in schema.all:
-            result = e.find(self.ref, (Element,))
-            if self.filter(result):
-                result = None
-            else:
-                break
-        return result
+        for result in schema.nested(self.ref, Element):
+            if not self.filter(result):
+                return result
+        return None
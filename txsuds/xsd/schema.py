@@ -27,9 +27,13 @@ from txsuds import *
 from txsuds.xsd import *
 from txsuds.xsd.sxbuiltin import *
 from txsuds.xsd.sxbasic import Factory as BasicFactory
-from txsuds.xsd.deplist import DepList
+from txsuds.xsd.sxbasic import Import, Extension, Restriction
+from txsuds.xsd.sxbase import dereference
 from txsuds.sax.element import Element
 from txsuds.sax import splitPrefix, Namespace
+from txsuds.snapshot import Lazy, getstate
+from urlparse import urljoin
+from copy import deepcopy
 from logging import getLogger
 from twisted.internet import defer
 
@@ -48,6 +52,13 @@ class SchemaCollection:
     @ivar namespaces: A dictionary of contained schemas by namespace.
     @type namespaces: {str:L{Schema}}
     @ivar importCache: Dictionary that stores Schema instances by URL.
+    @ivar imported: The imported and included schemas in the order they
+        were built (the schemas they import first).  They are pruned and
+        dereferenced along with the contained schemas.
+    @type imported: [L{Schema},...]
+    @ivar documents: The downloaded (imported and included) schema
+        documents by URL.
+    @type documents: {str:L{sax.document.Document}}
     """
 
     def __init__(self, wsdl):
@@ -59,6 +70,8 @@ class SchemaCollection:
         self.children = []
         self.namespaces = {}
         self.importCache = {}
+        self.imported = []
+        self.documents = {}
 
     def add(self, schema):
         """
@@ -73,28 +86,47 @@ class SchemaCollection:
             self.children.append(schema)
             self.namespaces[key] = schema
         else:
+            #
+            # The merged nodes keep their parent so that prefixes are
+            # resolved as declared in their own schema.
+            #
             existing.root.children += schema.root.children
-            existing.root.nsprefixes.update(schema.root.nsprefixes)
+            existing.root.nschanged()
+            for p,u in schema.root.nsprefixes.items():
+                existing.root.addPrefix(p, u)
 
     @defer.inlineCallbacks
-    def load(self, options):
+    def load(self, options, roots=None):
         """
         Load the schema objects for the root nodes.
-            - de-references schemas
+            - open (and build) the imported and included schemas
+            - prune schemas (when I{roots} are specified)
+            - de-references schemas (the imported ones first)
             - merge schemas
         @param options: An options dictionary.
         @type options: L{options.Options}
+        @param roots: The references (qref) of the elements and types
+            that are used.  See: L{prune}.
+        @type roots: [qref,...]
         @return: The merged schema.
         @rtype: L{Schema}
         """
         if options.autoblend:
             self.autoblend()
+        yield Prefetcher(self).fetch()
         for child in self.children:
             child.build()
         for child in self.children:
             yield child.open_imports(options)
-        for child in self.children:
-            child.dereference()
+        #
+        # All imports and includes are opened, the documents are not
+        # needed (or cached) with the loaded schema.
+        #
+        self.documents = {}
+        if roots is not None:
+            self.prune(roots)
+        for child in self.imported + self.children:
+            child.dereference(options.lazyschema)
         log.debug('loaded:\n%s', self)
 
         # Merge all of our child Schemas into a single object.
@@ -102,6 +134,63 @@ class SchemaCollection:
         log.debug('MERGED:\n%s', merged)
         defer.returnValue(merged)
 
+    def prune(self, roots):
+        """
+        Prune the (top level) schema objects that cannot be reached from
+        the specified references.  The objects of the contained and the
+        I{imported} schemas are pruned before they are dereferenced.  Types
+        derived (by extension or restriction) from a reachable type are also
+        reachable since they may be used (xsi:type) in place of the base
+        type.  The item type (wsdl:arrayType) of a reachable soap encoded
+        array is also reachable.
+        @param roots: The references (qref) of the elements and types
+            that are used.
+        @type roots: [qref,...]
+        """
+        index = {}
+        derived = {}
+        for s in self.children:
+            for d in (s.elements, s.types, s.groups, s.agrps, s.attributes):
+                for qref, x in d.items():
+                    index.setdefault(qref, []).append(x)
+            for x in s.types.values():
+                for c in x.content():
+                    if c.ref is None:
+                        continue
+                    if not isinstance(c, (Extension, Restriction)):
+                        continue
+                    c.qualify()
+                    derived.setdefault(c.ref, []).append(x.qname)
+        reachable = set()
+        stack = list(roots)
+        while len(stack):
+            qref = stack.pop()
+            if qref in reachable:
+                continue
+            reachable.add(qref)
+            stack.extend(derived.get(qref, ()))
+            for x in index.get(qref, ()):
+                for c in x.content():
+                    c.qualify()
+                    if c.type is not None:
+                        stack.append(c.type)
+                    if c.ref is not None:
+                        stack.append(c.ref)
+                    aty = getattr(c, 'aty', None)
+                    if aty is not None:
+                        stack.append(aty)
+        pruned = 0
+        for s in self.imported + self.children:
+            for d in (s.elements, s.types, s.groups, s.agrps, s.attributes):
+                for qref in d.keys():
+                    if qref in reachable:
+                        continue
+                    del d[qref]
+                    pruned += 1
+            s.children = [x for x in s.children if x.qname in reachable]
+            s.all = [x for x in s.all if x.qname in reachable]
+        log.debug('pruned %d schema objects', pruned)
+
     def autoblend(self):
         """
         Ensure that all schemas within the collection
@@ -123,6 +212,30 @@ class SchemaCollection:
                 s.root.append(imp)
         return self
 
+    def document(self, url, options):
+        """
+        Open an (imported or included) schema document.  Each URL is
+        downloaded once (or prefetched) and kept in L{documents} while the
+        collection is loaded.  A copy is returned because the opened
+        document is modified (and merged) by the importing schema.
+        @param url: The document URL.
+        @type url: str
+        @param options: An options dictionary.
+        @type options: L{options.Options}
+        @return: A deferred that fires with the document.
+        @rtype: L{defer.Deferred}
+        """
+        document = self.documents.get(url)
+        if document is not None:
+            return defer.succeed(deepcopy(document))
+        d = self.wsdl.download(url)
+        d.addCallback(self.__downloaded, url)
+        return d
+
+    def __downloaded(self, document, url):
+        self.documents[url] = document
+        return deepcopy(document)
+
     def locate(self, ns):
         """
         Find a schema by namespace.  Only the URI portion of
@@ -161,6 +274,94 @@ class SchemaCollection:
         return '\n'.join(result)
 
 
+class Prefetcher:
+    """
+    Downloads the schema documents referenced by the I{import} and
+    I{include} nodes of the schemas in a collection and (recursively) by
+    the downloaded documents.  The documents are downloaded concurrently
+    (at most I{maxImports} at once by the loading WSDL, see:
+    L{wsdl.Definitions.download}) and each URL is downloaded once.  The
+    documents are stored in the collection and used when the imports are
+    opened.  Download errors are ignored here and are reported when the
+    imports are opened.
+    @ivar collection: The schema collection.
+    @type collection: L{SchemaCollection}
+    @ivar urls: The URLs downloaded (or being downloaded).
+    @type urls: set
+    """
+
+    def __init__(self, collection):
+        """
+        @param collection: The schema collection.
+        @type collection: L{SchemaCollection}
+        """
+        self.collection = collection
+        self.urls = set()
+
+    def fetch(self):
+        """
+        Download the documents referenced by the schemas in the collection.
+        @return: A deferred that fires when all documents are downloaded.
+        @rtype: L{defer.Deferred}
+        """
+        fetched = []
+        for s in self.collection.children:
+            fetched.append(self.references(s.root, s.baseurl, s.tns[1]))
+        return defer.DeferredList(fetched)
+
+    def references(self, root, baseurl, tns):
+        """
+        Download the documents referenced by a schema node.
+        @param root: A schema root node.
+        @type root: L{sax.element.Element}
+        @param baseurl: The URL of the schema.
+        @type baseurl: str
+        @param tns: The schema target namespace (URI).
+        @type tns: str
+        @return: A deferred that fires when all documents are downloaded.
+        @rtype: L{defer.Deferred}
+        """
+        fetched = []
+        for node in root.getChildren(ns=Namespace.xsdns):
+            if node.name not in ('import', 'include'):
+                continue
+            location = node.get('schemaLocation')
+            if node.name == 'import':
+                ns = node.get('namespace')
+                if location is None:
+                    location = Import.locations.get(ns)
+                if ns != tns and ns in self.collection.namespaces:
+                    continue
+            if location is None:
+                continue
+            url = location
+            if '://' not in url:
+                url = urljoin(baseurl, url)
+            if url in self.urls:
+                continue
+            self.urls.add(url)
+            fetched.append(self.download(url))
+        return defer.DeferredList(fetched)
+
+    @defer.inlineCallbacks
+    def download(self, url):
+        """
+        Download a document and the documents it references.
+        @param url: The document URL.
+        @type url: str
+        """
+        try:
+            document = yield self.collection.wsdl.download(url)
+        except Exception, e:
+            log.debug('prefetch (%s) failed: %s', url, e)
+            return
+        root = document.root()
+        if root is None:
+            return
+        self.collection.documents[url] = document
+        yield self.references(root, url, root.get('targetNamespace'))
+
+
 class Schema:
     """
     The schema is an objectification of a <schema/> (xsd) definition.
@@ -187,13 +388,23 @@ class Schema:
     @type groups: [L{SchemaObject},...]
     @ivar agrps: A list of attribute group objects.
     @type agrps: [L{SchemaObject},...]
+    @ivar index: The index of the (nested) objects by class and qname,
+        else None when not (yet) built.  See: L{reindex}.
+    @type index: {(I{class}, qref): [L{SchemaObject},...]}
     @ivar form_qualified: The flag indicating:
         (@elementFormDefault).
     @type form_qualified: bool
+    @ivar dereferenced: The schema has been dereferenced (or marked for
+        lazy dereferencing) so the name indexes of its objects may be kept.
+    @type dereferenced: bool
     """
 
     Tag = 'schema'
 
+    dereferenced = False
+
+    root = Lazy('root')
+
     def __init__(self, root, baseurl, options, container=None):
         """
         @param root: The xml root.
@@ -218,6 +429,7 @@ class Schema:
         self.attributes = {}
         self.groups = {}
         self.agrps = {}
+        self.index = None
         if options.doctor is not None:
             options.doctor.examine(root)
         form = self.root.get('elementFormDefault')
@@ -289,8 +501,64 @@ class Schema:
             self.all.append(item[1])
             self.agrps[item[0]] = item[1]
         schema.merged = True
+        self.index = None
         return self
 
+    def reindex(self):
+        """
+        Build the index of the (nested) named objects, such as elements
+        and attributes, contained by the merged objects (L{all}) by class
+        and qname.  Only the first match within each merged object is
+        indexed, in the order that the I{deep} queries search.  The
+        objects are indexed as they are: those pending (lazy) dereferencing
+        are not dereferenced, and the index is dropped once they are.
+        See: L{unindex}.
+        @return: self
+        @rtype: L{Schema}
+        """
+        index = {}
+        for x in self.all:
+            first = set()
+            for c in x.content():
+                if c.name is None:
+                    continue
+                key = (c.__class__, c.qname)
+                if key in first:
+                    continue
+                first.add(key)
+                index.setdefault(key, []).append(c)
+        self.index = index
+        return self
+
+    def unindex(self):
+        """
+        Drop the index of the (nested) objects of this schema and of the
+        other schemas in its collection (which have its objects merged
+        in).  Called when the content of one of its objects changes, as
+        when it is (lazily) dereferenced.
+        """
+        schemas = [self]
+        if self.container is not None:
+            schemas += self.container.children
+            schemas += self.container.importCache.values()
+        for schema in schemas:
+            schema.index = None
+
+    def nested(self, qref, cls):
+        """
+        Get the (nested) objects that match a qname from the index
+        (built as needed).  See: L{reindex}.
+        @param qref: A qualified reference.
+        @type qref: qref
+        @param cls: The class of the objects.
+        @type cls: I{class}
+        @return: The matching objects.
+        @rtype: [L{sxbase.SchemaObject},...]
+        """
+        if self.index is None:
+            self.reindex()
+        return self.index.get((cls, qref), ())
+
     @defer.inlineCallbacks
     def open_imports(self, options):
         """
@@ -314,27 +582,23 @@ class Schema:
             # we need to merge them into ourselves after they are opened.
             self.merge(imported)
 
-    def dereference(self):
+    def dereference(self, lazy=False):
         """
         Instruct all children to perform dereferencing.
-        """
-        all = []
-        indexes = {}
-        for child in self.children:
-            child.content(all)
-        deplist = DepList()
-        for x in all:
-            x.qualify()
-            midx, deps = x.dependencies()
-            item = (x, tuple(deps))
-            deplist.add(item)
-            indexes[x] = midx
-        for x, deps in deplist.sort():
-            midx = indexes.get(x)
-            if midx is None: continue
-            d = deps[midx]
-            log.debug('(%s) merging %s <== %s', self.tns[1], Repr(x), Repr(d))
-            x.merge(d)
+        @param lazy: Defer the dereferencing of each top level object
+            (and its contents) until it is first used.
+        @type lazy: bool
+        """
+        if lazy:
+            for child in self.children:
+                for x in child.content():
+                    x.pending = child
+        else:
+            all = []
+            for child in self.children:
+                child.content(all)
+            dereference(all, self.tns)
+        self.dereferenced = True
 
     def locate(self, ns):
         """
@@ -417,6 +681,9 @@ class Schema:
         result.append('')
         return '\n'.join(result)
 
+    def __getstate__(self):
+        return getstate(self)
+
     def __repr__(self):
         myrep = '<%s tns="%s"/>' % (self.id, self.tns[1])
         return myrep.encode('utf-8')
@@ -24,6 +24,8 @@ from txsuds import *
 from txsuds.xsd import *
 from txsuds.sax.element import Element
 from txsuds.sax import Namespace
+from txsuds.xsd.deplist import DepList
+from txsuds.snapshot import Lazy, getstate
 
 log = getLogger(__name__)
 
@@ -46,8 +48,14 @@ class SchemaObject(object):
     @type default: object
     @ivar rawchildren: A list raw of all children.
     @type rawchildren: [L{SchemaObject},...]
+    @ivar pending: The (top level) object whose (lazy) dereferencing is
+        pending, else None.  See: L{dereference}.
+    @type pending: L{SchemaObject}
     """
 
+    root = Lazy('root')
+    pending = None
+
     @classmethod
     def prepend(cls, d, s, filter=Filter()):
         """
@@ -134,29 +142,54 @@ class SchemaObject(object):
 
     def get_attribute(self, name):
         """
-        Get (find) a I{non-attribute} attribute by name.
+        Get (find) a I{non-attribute} attribute by name.  The attributes
+        are indexed by name when first searched once the schema is
+        dereferenced.
         @param name: A attribute name.
         @type name: str
         @return: A tuple: the requested (attribute, ancestry).
         @rtype: (L{SchemaObject}, [L{SchemaObject},..])
         """
-        for child, ancestry in self.attributes():
-            if child.name == name:
-                return (child, ancestry)
-        return (None, [])
+        index = self.cache.get('attributes')
+        if index is None:
+            index = {}
+            for child, ancestry in self.attributes():
+                index.setdefault(child.name, (child, ancestry))
+            if self.schema.dereferenced:
+                self.cache['attributes'] = index
+        result = index.get(name)
+        if result is None:
+            return (None, [])
+        return result
 
     def get_child(self, name):
         """
-        Get (find) a I{non-attribute} child by name.
+        Get (find) a I{non-attribute} child by name.  The children are
+        indexed by name when first searched once the schema is
+        dereferenced.  Names that follow an I{any} child are not indexed
+        since the I{any} child matches first.
         @param name: A child name.
         @type name: str
         @return: A tuple: the requested (child, ancestry).
         @rtype: (L{SchemaObject}, [L{SchemaObject},..])
         """
-        for child, ancestry in self.children():
-            if child.any() or child.name == name:
-                return (child, ancestry)
-        return (None, [])
+        index = self.cache.get('children')
+        if index is None:
+            names = {}
+            wildcard = None
+            for child, ancestry in self.children():
+                if child.any():
+                    wildcard = (child, ancestry)
+                    break
+                names.setdefault(child.name, (child, ancestry))
+            index = (names, wildcard)
+            if self.schema.dereferenced:
+                self.cache['children'] = index
+        names, wildcard = index
+        result = names.get(name, wildcard)
+        if result is None:
+            return (None, [])
+        return result
 
     def namespace(self, prefix=None):
         """
@@ -216,6 +249,8 @@ class SchemaObject(object):
         @return: The resolved (true) type.
         @rtype: L{SchemaObject}
         """
+        if self.pending is not None:
+            self.dereference()
         return self.cache.get(nobuiltin, self)
 
     def sequence(self):
@@ -399,6 +434,25 @@ class SchemaObject(object):
                 continue
             setattr(self, n, v)
 
+    def dereference(self):
+        """
+        Complete the (lazy) dereferencing of this object.  When the schema
+        is dereferenced lazily, the contents of each top level object are
+        dereferenced (all at once) when one of them is first used.
+        @return: self
+        @rtype: L{SchemaObject}
+        """
+        top = self.pending
+        if top is None:
+            return self
+        content = [x for x in top.content() if x.pending is top]
+        for x in content:
+            x.pending = None
+        log.debug('(%s) dereferencing %s', top.schema.tns[1], Repr(top))
+        dereference(content, top.schema.tns)
+        top.schema.unindex()
+        return self
+
 
     def content(self, collection=None, filter=Filter(), history=None):
         """
@@ -469,6 +523,9 @@ class SchemaObject(object):
         """
         return ()
 
+    def __getstate__(self):
+        return getstate(self)
+
     def __str__(self):
         return unicode(self).encode('utf-8')
 
@@ -495,6 +552,8 @@ class SchemaObject(object):
         return n
 
     def __iter__(self):
+        if self.pending is not None:
+            self.dereference()
         return Iter(self)
 
     def __getitem__(self, index):
@@ -504,6 +563,31 @@ class SchemaObject(object):
                 return c
 
 
+def dereference(objects, tns):
+    """
+    Dereference schema objects.  The references are qualified and the
+    objects are merged with their dependencies in dependency order.
+    @param objects: The objects to dereference.
+    @type objects: [L{SchemaObject},...]
+    @param tns: The target namespace of the containing schema.
+    @type tns: (prefix,URI)
+    """
+    indexes = {}
+    deplist = DepList()
+    for x in objects:
+        x.qualify()
+        midx, deps = x.dependencies()
+        item = (x, tuple(deps))
+        deplist.add(item)
+        indexes[x] = midx
+    for x, deps in deplist.sort():
+        midx = indexes.get(x)
+        if midx is None: continue
+        d = deps[midx]
+        log.debug('(%s) merging %s <== %s', tns[1], Repr(x), Repr(d))
+        x.merge(d)
+
+
 class Iter:
     """
     The content iterator - used to iterate the L{Content} children.  The iterator
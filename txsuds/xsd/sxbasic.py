@@ -26,7 +26,6 @@ from txsuds.xsd.sxbase import *
 from txsuds.xsd.query import *
 from txsuds.sax import Namespace
 from txsuds.transport import TransportError
-from txsuds.reader import DocumentReader
 from urlparse import urljoin
 
 from twisted.internet import defer
@@ -47,6 +46,8 @@ class TypedContent(Content):
     Represents any I{typed} content.
     """
     def resolve(self, nobuiltin=False):
+        if self.pending is not None:
+            self.dereference()
         qref = self.qref()
         if qref is None:
             return self
@@ -498,8 +499,10 @@ class Reference(SchemaObject):
     @defer.inlineCallbacks
     def build_schema(self, root, options):
         """
-        Helper method that builds and resolves a Schema object for the
-        given elements with the specified options.
+        Helper method that builds a Schema object (and opens its imports)
+        for the given elements with the specified options.  The schema is
+        added to the I{imported} schemas of the collection, which prunes
+        and dereferences it once the collection is loaded.
 
         @type  root:    suds.sax.element.Element
         @param root:    Element that is referenced and should be resolved.
@@ -510,8 +513,7 @@ class Reference(SchemaObject):
         schema.build()
         yield schema.open_imports(options)
         log.debug('built:\n%s', schema)
-        schema.dereference()
-        log.debug('dereferenced:\n%s', schema)
+        self.schema.container.imported.append(schema)
         defer.returnValue(schema)
 
 
@@ -591,8 +593,7 @@ class Import(Reference):
     def download(self, options):
         """ download the schema """
         try:
-            reader = DocumentReader(options)
-            d = yield reader.open(self.url)
+            d = yield self.schema.container.document(self.url, options)
             root = d.root()
             root.set('url', self.url)
 
@@ -649,8 +650,7 @@ class Include(Reference):
     def download(self, options):
         """ download the schema """
         try:
-            reader = DocumentReader(options)
-            d = yield reader.open(self.url)
+            d = yield self.schema.container.document(self.url, options)
             root = d.root()
             root.set('url', self.url)
             self.__applytns(root)